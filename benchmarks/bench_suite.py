@@ -0,0 +1,297 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import io
+import os
+import sys
+import bs4
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+import typing as t
+import concurrent.futures
+import core.utils as utils
+import core.http_fetcher as hf
+import exporters.exporter_registry as er
+import exporters.animal_exporter_html as aeh
+import extractors.animals_wiki_extractor as awe
+import extractors.animal_page_extractor as ape
+import extractors.page_parse_pool as ppp
+import downloaders.animal_image_downloader as aid
+import benchmarks.stub_http_server as shs
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+MOCKS_DIR = os.path.join(BENCHMARKS_DIR, '..', 'test', 'extractors', 'mocks')
+ANIMALS_PAGE_PATH = os.path.join(MOCKS_DIR, 'animals_page.txt')
+ANIMAL_PAGE_PATHS = [os.path.join(MOCKS_DIR, 'animal_main_page_with_image_in_main_table.txt'),
+                     os.path.join(MOCKS_DIR, 'animal_main_page_without_image_in_main_table.txt')]
+DEFAULT_THRESHOLDS_PATH = os.path.join(BENCHMARKS_DIR, 'thresholds.json')
+DEFAULT_OUTPUT_PATH = 'benchmark_results.json'
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_REPEAT = 3
+DEFAULT_REQUESTS = 100
+DEFAULT_WORKERS = 16
+BENCH_IMAGE_CONTENT = bytes(range(256)) * 256
+
+
+class BenchResult:
+
+    def __init__(self, name: str, scale: int, items: int, durations: t.List[float], peak_memory_bytes: int):
+        self._name = name
+        self._scale = scale
+        self._items = items
+        self._durations = durations
+        self._peak_memory_bytes = peak_memory_bytes
+
+    def get_key(self) -> str:
+        return f'{self._name}@{self._scale}'
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_best_seconds(self) -> float:
+        return min(self._durations)
+
+    def get_peak_memory_bytes(self) -> int:
+        return self._peak_memory_bytes
+
+    def to_dict(self) -> dict:
+        return {'name': self._name, 'scale': self._scale, 'items': self._items,
+                'best_seconds': min(self._durations), 'median_seconds': statistics.median(self._durations),
+                'peak_memory_bytes': self._peak_memory_bytes}
+
+
+def scale_animals_page(webpage: str, scale: int) -> str:
+    # Repeats the animal rows of the animals table scale times, every copy renamed so it stays a distinct animal
+    if scale == 1:
+        return webpage
+    soup = bs4.BeautifulSoup(webpage, 'html.parser')
+    tables = soup.find_all('table', {'class': ['wikitable', 'sortable', 'sticky-header', 'jquery-tablesorter']})
+    table_body = tables[1].find('tbody')
+    animal_items = [row for row in table_body.find_all('tr') if row.find('td')]
+    for copy_index in range(1, scale):
+        for animal_item in animal_items:
+            animal_item_copy = bs4.BeautifulSoup(str(animal_item), 'html.parser').find('tr')
+            if name_item := animal_item_copy.find('td').find('a'):
+                name_item.string = f'{name_item.get_text()} {copy_index}'
+                name_item['href'] = f'{name_item.get("href", "")}_{copy_index}'
+            table_body.append(animal_item_copy)
+    return str(soup)
+
+
+def measure(name: str, scale: int, run: t.Callable[[], int], repeat: int) -> BenchResult:
+    # Timed runs first, then a separate run under tracemalloc, which slows the code it traces. Memory allocated in
+    # worker processes is not traced.
+    durations = list()
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = run()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return BenchResult(name=name, scale=scale, items=items, durations=durations, peak_memory_bytes=peak_memory_bytes)
+
+
+def check_regressions(results: t.Dict[str, dict], thresholds: dict,
+                      baseline: t.Optional[t.Dict[str, dict]] = None) -> t.List[str]:
+    # thresholds: {"default": {...}, "cases": {"<name>" or "<name>@<scale>": {...}}} with the optional limits
+    # max_seconds / max_peak_memory_bytes (absolute) and max_time_ratio / max_memory_ratio (against the baseline)
+    regressions = list()
+    for key, result in results.items():
+        limits = dict(thresholds.get('default', dict()))
+        limits.update(thresholds.get('cases', dict()).get(result['name'], dict()))
+        limits.update(thresholds.get('cases', dict()).get(key, dict()))
+        if (max_seconds := limits.get('max_seconds')) is not None and result['best_seconds'] > max_seconds:
+            regressions.append(f'{key}: {result["best_seconds"]:.3f}s exceeds {max_seconds:.3f}s')
+        if (max_memory := limits.get('max_peak_memory_bytes')) is not None and \
+                result['peak_memory_bytes'] > max_memory:
+            regressions.append(f'{key}: peak memory {result["peak_memory_bytes"]} exceeds {max_memory} bytes')
+        if not baseline or not (baseline_result := baseline.get(key)):
+            continue
+        if (max_time_ratio := limits.get('max_time_ratio')) is not None and \
+                result['best_seconds'] > baseline_result['best_seconds'] * max_time_ratio:
+            regressions.append(f'{key}: {result["best_seconds"]:.3f}s is more than x{max_time_ratio} the baseline '
+                               f'{baseline_result["best_seconds"]:.3f}s')
+        if (max_memory_ratio := limits.get('max_memory_ratio')) is not None and \
+                result['peak_memory_bytes'] > baseline_result['peak_memory_bytes'] * max_memory_ratio:
+            regressions.append(f'{key}: peak memory {result["peak_memory_bytes"]} is more than x{max_memory_ratio} '
+                               f'the baseline {baseline_result["peak_memory_bytes"]} bytes')
+    return regressions
+
+
+def _bench_wiki_extractor(animals_page: str, scales: t.List[int], repeat: int) -> t.Iterator[BenchResult]:
+    for scale in scales:
+        webpage = scale_animals_page(webpage=animals_page, scale=scale)
+        for html_parser in utils.HTML_PARSER_TO_MODULE:
+            if utils.resolve_html_parser(parser=html_parser) != html_parser:
+                continue
+            yield measure(name=f'wiki_extractor[{html_parser}]', scale=scale, repeat=repeat,
+                          run=lambda: len(awe.create_wiki_animal_extractor(
+                              webpage=webpage, parser=html_parser).extract_animals(extended=True).get_list_of_animals()))
+
+
+def _bench_page_extractor(animal_pages: t.List[str], scales: t.List[int], repeat: int) -> t.Iterator[BenchResult]:
+    # The scale of the page extractor is the number of pages extracted
+    for streaming in (False, True):
+        for scale in scales:
+            webpages = [animal_pages[index % len(animal_pages)] for index in range(scale)]
+
+            def run() -> int:
+                for webpage in webpages:
+                    ape.create_animal_page_extractor(webpage=webpage, streaming=streaming).extract_image_url()
+                return len(webpages)
+
+            yield measure(name='page_extractor[streaming]' if streaming else 'page_extractor', scale=scale,
+                          repeat=repeat, run=run)
+    # The same pages handed to the parse pool from concurrent threads, as the pipeline does, to show how the
+    # parsing scales with the cores
+    for streaming in (False, True):
+        page_parse_pool = ppp.create_page_parse_pool(streaming=streaming)
+        try:
+            for scale in scales:
+                page_contents = [animal_pages[index % len(animal_pages)].encode('utf-8') for index in range(scale)]
+
+                def run_pool() -> int:
+                    with concurrent.futures.ThreadPoolExecutor(max_workers=DEFAULT_WORKERS) as executor:
+                        return len(list(executor.map(
+                            lambda content: page_parse_pool.extract_image_url(content=content), page_contents)))
+
+                yield measure(name='page_parse_pool[streaming]' if streaming else 'page_parse_pool', scale=scale,
+                              repeat=repeat, run=run_pool)
+        finally:
+            page_parse_pool.close()
+
+
+def _bench_exporters(animals_page: str, scales: t.List[int], repeat: int) -> t.Iterator[BenchResult]:
+    for scale in scales:
+        webpage = scale_animals_page(webpage=animals_page, scale=scale)
+        animals = awe.create_wiki_animal_extractor(webpage=webpage).extract_animals(extended=True).get_list_of_animals()
+        for animal in animals:
+            animal.set_image_path(image_path=os.path.join('images', f'{animal.get_name()}.jpg'))
+
+        def export_to_stream() -> int:
+            aeh.AnimalExporterHTML.export_to_stream(animals=animals, stream=io.StringIO())
+            return len(animals)
+
+        yield measure(name='html_exporter', scale=scale, repeat=repeat, run=export_to_stream)
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_prefix = os.path.join(output_dir, 'animal_list')
+            format_to_output_path = {export_format: er.resolve_output_path(export_format=export_format,
+                                                                           output_prefix=output_prefix)
+                                     for export_format in ('html-sharded', 'jsonl', 'csv')}
+            for export_format, output_path in format_to_output_path.items():
+
+                def export_to_file() -> int:
+                    er.export_animals(animals=animals, format_to_output_path={export_format: output_path})
+                    return len(animals)
+
+                yield measure(name=f'exporter[{export_format}]', scale=scale, repeat=repeat, run=export_to_file)
+
+
+def _bench_network(animal_pages: t.List[str], requests_count: int, workers: int, latency: float,
+                   repeat: int) -> t.Iterator[BenchResult]:
+    routes = {'/wiki': ('text/html; charset=utf-8', animal_pages[0].encode('utf-8')),
+              '/images': ('image/jpeg', BENCH_IMAGE_CONTENT)}
+    with shs.create_stub_http_server(routes=routes, latency=latency) as server, \
+            tempfile.TemporaryDirectory() as images_dir:
+        page_urls = [server.get_url(path=f'/wiki/Animal{index}') for index in range(requests_count)]
+        image_urls = [server.get_url(path=f'/images/Animal{index}.jpg') for index in range(requests_count)]
+        image_paths = [os.path.join(images_dir, f'Animal{index}.jpg') for index in range(requests_count)]
+        fetcher = hf.create_http_fetcher(pool_size=workers, per_host_limit=workers, requests_per_second=None,
+                                         max_retries=0)
+        try:
+            def fetch_pages() -> int:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                    return sum(len(response.content) for response in executor.map(fetcher.get, page_urls))
+
+            yield measure(name='http_fetcher', scale=requests_count, repeat=repeat, run=fetch_pages)
+            image_downloader = aid.create_image_downloader(fetcher=fetcher)
+
+            def download_images() -> int:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                    return len(list(executor.map(lambda url_and_path: image_downloader.download(
+                        image_url=url_and_path[0], file_path=url_and_path[1]), zip(image_urls, image_paths))))
+
+            yield measure(name='image_downloader', scale=requests_count, repeat=repeat, run=download_images)
+        finally:
+            fetcher.close()
+        if aid.aiohttp is None:
+            return
+
+        async def download_images_async() -> int:
+            async with aid.create_async_image_downloader(concurrency=workers, per_host_limit=workers,
+                                                         requests_per_second=None, max_retries=0) as downloader:
+                await asyncio.gather(*[downloader.download(image_url=image_url, file_path=image_path)
+                                       for image_url, image_path in zip(image_urls, image_paths)])
+            return len(image_urls)
+
+        yield measure(name='async_image_downloader', scale=requests_count, repeat=repeat,
+                      run=lambda: asyncio.run(download_images_async()))
+
+
+def _load_json(path: t.Optional[str]) -> t.Optional[dict]:
+    if not path:
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark the extraction, download and export stages')
+    parser.add_argument('--stages', nargs='+', choices=['extract', 'page', 'export', 'network'],
+                        default=['extract', 'page', 'export', 'network'], help='Stages to benchmark')
+    parser.add_argument('--scales', nargs='+', type=int, default=DEFAULT_SCALES,
+                        help='Multipliers of the animals table rows, and numbers of animal pages')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Timed runs per case, the best is gated')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help='Requests per network case')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Concurrent requests per network case')
+    parser.add_argument('--latency', type=float, default=shs.DEFAULT_LATENCY,
+                        help='Latency of the stub HTTP server in seconds')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help='Path of the JSON results')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS_PATH, help='JSON regression thresholds')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+    with open(ANIMALS_PAGE_PATH, 'r') as file:
+        animals_page = file.read()
+    animal_pages = list()
+    for animal_page_path in ANIMAL_PAGE_PATHS:
+        with open(animal_page_path, 'r') as file:
+            animal_pages.append(file.read())
+    stage_to_results = {
+        'extract': lambda: _bench_wiki_extractor(animals_page=animals_page, scales=args.scales, repeat=args.repeat),
+        'page': lambda: _bench_page_extractor(animal_pages=animal_pages, scales=args.scales, repeat=args.repeat),
+        'export': lambda: _bench_exporters(animals_page=animals_page, scales=args.scales, repeat=args.repeat),
+        'network': lambda: _bench_network(animal_pages=animal_pages, requests_count=args.requests,
+                                          workers=args.workers, latency=args.latency, repeat=args.repeat),
+    }
+    results = dict()
+    for stage in args.stages:
+        for result in stage_to_results[stage]():
+            results[result.get_key()] = result.to_dict()
+            print(f'{result.get_key():<40} {result.get_best_seconds() * 1000:10.1f} ms '
+                  f'{result.get_peak_memory_bytes() / 2 ** 20:8.1f} MB')
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump({'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                                   'bs4': bs4.__version__, 'latency': args.latency, 'workers': args.workers},
+                   'results': results}, file, indent=2)
+    baseline_results = baseline['results'] if (baseline := _load_json(path=args.baseline)) else None
+    if regressions := check_regressions(results=results, thresholds=_load_json(path=args.thresholds) or dict(),
+                                        baseline=baseline_results):
+        print('\n'.join(regressions))
+        sys.exit(1)
@@ -0,0 +1,44 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import time
+import argparse
+import core.utils as utils
+import extractors.animals_wiki_extractor as awe
+
+ANIMALS_PAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test', 'extractors', 'mocks',
+                                 'animals_page.txt')
+
+
+def _bench_parser(webpage: str, parser: str, repeat: int) -> float:
+    durations = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        awe.create_wiki_animal_extractor(webpage=webpage, parser=parser).extract_animals(extended=True)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark the wiki animals extractor parser backends')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs per parser, the best run is reported')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+    with open(ANIMALS_PAGE_PATH, 'r') as file:
+        animals_page = file.read()
+    baseline_duration = _bench_parser(webpage=animals_page, parser=utils.DEFAULT_HTML_PARSER, repeat=args.repeat)
+    print(f'{utils.DEFAULT_HTML_PARSER:<12} {baseline_duration * 1000:8.1f} ms')
+    for html_parser in utils.HTML_PARSER_TO_MODULE:
+        if html_parser == utils.DEFAULT_HTML_PARSER:
+            continue
+        if utils.resolve_html_parser(parser=html_parser) != html_parser:
+            print(f'{html_parser:<12} not installed')
+            continue
+        duration = _bench_parser(webpage=animals_page, parser=html_parser, repeat=args.repeat)
+        print(f'{html_parser:<12} {duration * 1000:8.1f} ms (x{baseline_duration / duration:.2f})')
@@ -0,0 +1,69 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import time
+import threading
+import typing as t
+import http.server
+
+DEFAULT_LATENCY = 0.02
+
+
+class _StubRequestHandler(http.server.BaseHTTPRequestHandler):
+    # Set on the per-server subclass created by StubHttpServer
+    latency: float = 0
+    routes: t.Dict[str, t.Tuple[str, bytes]] = dict()
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        # Every /<prefix>/<anything> path is served by the /<prefix> route, so many distinct urls share one body
+        route = self.routes.get('/' + self.path.lstrip('/').split('/', 1)[0])
+        if route is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        content_type, body = route
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+class _ThreadingHTTPServer(http.server.ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections of concurrent clients, which then wait for a SYN retransmit
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StubHttpServer:
+    # A local server answering every request after a fixed latency, to benchmark the network stages without the
+    # network
+
+    def __init__(self, routes: t.Dict[str, t.Tuple[str, bytes]], latency: float = DEFAULT_LATENCY):
+        handler_class = type('_StubRequestHandlerWithRoutes', (_StubRequestHandler,),
+                             {'latency': latency, 'routes': routes})
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+        self._server_thread: t.Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'StubHttpServer':
+        self._server_thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._server_thread.start()
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def get_url(self, path: str) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}{path}'
+
+
+def create_stub_http_server(routes: t.Dict[str, t.Tuple[str, bytes]], latency: float = DEFAULT_LATENCY):
+    return StubHttpServer(routes=routes, latency=latency)
@@ -0,0 +1,95 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import typing as t
+import core.common as co
+import init.conf as conf
+
+
+class AnimalState:
+
+    def __init__(self, name: str, row_hash: str, page_url: str = None, page_revision: int = None,
+                 image_url: str = None, image_hash: str = None, image_path: str = None):
+        self._name = name
+        self._row_hash = row_hash
+        self._page_url = page_url
+        self._page_revision = page_revision
+        self._image_url = image_url
+        self._image_hash = image_hash
+        self._image_path = image_path
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_row_hash(self) -> str:
+        return self._row_hash
+
+    def get_page_url(self) -> t.Optional[str]:
+        return self._page_url
+
+    def get_page_revision(self) -> t.Optional[int]:
+        return self._page_revision
+
+    def get_image_url(self) -> t.Optional[str]:
+        return self._image_url
+
+    def get_image_hash(self) -> t.Optional[str]:
+        return self._image_hash
+
+    def get_image_path(self) -> t.Optional[str]:
+        return self._image_path
+
+
+class AnimalStateStore:
+
+    def __init__(self, path: str = conf.DEFAULT_STATE_PATH):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS animals (name TEXT PRIMARY KEY, row_hash TEXT NOT NULL, '
+                                 'page_url TEXT, page_revision INTEGER, image_url TEXT, image_hash TEXT, '
+                                 'image_path TEXT, updated_at REAL NOT NULL)')
+        self._connection.commit()
+
+    def get_state(self, name: str) -> t.Optional[AnimalState]:
+        with self._lock:
+            row = self._connection.execute('SELECT name, row_hash, page_url, page_revision, image_url, image_hash, '
+                                           'image_path FROM animals WHERE name = ?', (name.lower(),)).fetchone()
+        if row:
+            return AnimalState(*row)
+
+    def save_states(self, states: t.Iterable[AnimalState]) -> None:
+        with self._lock:
+            self._connection.executemany('INSERT OR REPLACE INTO animals VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                         [(state.get_name().lower(), state.get_row_hash(), state.get_page_url(),
+                                           state.get_page_revision(), state.get_image_url(), state.get_image_hash(),
+                                           state.get_image_path(), time.time()) for state in states])
+            self._connection.commit()
+
+    def is_unchanged(self, animal: co.Animal, page_revision: t.Optional[int]) -> bool:
+        # An animal is reused when its table row and page revision did not change and its image is still on disk
+        if not (state := self.get_state(name=animal.get_name())) or page_revision is None:
+            return False
+        return state.get_row_hash() == compute_row_hash(animal=animal) and \
+            state.get_page_revision() == page_revision and \
+            bool(state.get_image_path()) and os.path.exists(state.get_image_path())
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def compute_row_hash(animal: co.Animal) -> str:
+    row = [animal.get_name(), animal.get_collateral_adjectives_list(), animal.get_page_url()]
+    return hashlib.sha256(json.dumps(row).encode()).hexdigest()
+
+
+def create_animal_state_store(path: str = conf.DEFAULT_STATE_PATH):
+    return AnimalStateStore(path=path)
@@ -3,50 +3,378 @@
 # Author:  Ohad ELiyahou
 # Date:    September 2024
 # Summary:
-import requests
+import os
+import sys
+import json
+import argparse
+import functools
+import urllib.parse
+import typing as t
 import core.common as co
-import extractors.animals_wiki_extractor as awe
-import extractors.animal_page_extractor as ape
-import downloaders.animal_image_downloader as aid
-from exporters.animal_exporter_html import AnimalExporterHTML
+import core.metrics as metrics
+import core.lazy_import as li
+import core.http_cache as hc
+import core.request_coalescer as rc
+import core.animals_pipeline as ap
+import core.animal_state_store as ass
+import core.pipeline_checkpoint as pc
+import core.utils as utils
+import init.conf as conf
+import extractors.table_layout_cache as tlc
+import exporters.animal_exporter_html as aeh
+import exporters.animal_exporter_jsonl as aej
+import exporters.exporter_registry as er
+import exporters.animal_exporter_html_sharded as aehs
 
-image_downloader = aid.create_image_downloader()
+# The modules below pull requests, bs4 and aiohttp in, they are imported only by the commands that use them
+hf = li.lazy_import(module_name='core.http_fetcher')
+awe = li.lazy_import(module_name='extractors.animals_wiki_extractor')
+apae = li.lazy_import(module_name='extractors.animal_page_api_extractor')
+ppp = li.lazy_import(module_name='extractors.page_parse_pool')
+aid = li.lazy_import(module_name='downloaders.animal_image_downloader')
+aip = li.lazy_import(module_name='downloaders.animal_image_processor')
+
+# Set up by the commands that fetch pages or images
+http_fetcher: t.Optional['hf.HttpFetcher'] = None
+image_downloader: t.Optional['aid.ImageDownloader'] = None
+# Width the images are requested at from the Wikimedia thumbnailer, None for the width embedded in the page
+image_width = conf.DEFAULT_THUMBNAIL_WIDTH
+# Parses the animal pages, in worker processes unless it is created with no workers
+page_parse_pool: t.Optional['ppp.PageParsePool'] = None
+# Image URLs resolved in batches through the wiki API, None when the image URLs are scraped from every page
+page_url_to_image_url: t.Optional[t.Dict[str, t.Optional[str]]] = None
+
+IMAGE_SOURCE_PAGE = 'page'
+IMAGE_SOURCE_API = 'api'
+
+COMMAND_RUN = 'run'
+COMMAND_FROM_CACHE = 'from-cache'
+COMMAND_EXTRACT = 'extract'
+COMMAND_DOWNLOAD = 'download'
+COMMAND_EXPORT = 'export'
+COMMANDS = [COMMAND_RUN, COMMAND_FROM_CACHE, COMMAND_EXTRACT, COMMAND_DOWNLOAD, COMMAND_EXPORT]
 
 
 def _extract_main_page():
-    main_webpage_response = requests.get(url='https://en.wikipedia.org/wiki/List_of_animal_names')
-    if main_webpage_response.status_code != 200:
-        raise ValueError(f'Failed to get main animals page, status code: {main_webpage_response.status_code}')
-    return main_webpage_response.text
+    with metrics.timer(stage='extract_main_page'):
+        main_webpage_response = http_fetcher.get(url=conf.MAIN_PAGE_URL)
+        if main_webpage_response.status_code != 200:
+            raise ValueError(f'Failed to get main animals page, status code: {main_webpage_response.status_code}')
+        return main_webpage_response.text
 
 
-def _download_image(animal: co.Animal) -> str:
+def _download_image(animal: co.Animal, page_coalescer: rc.RequestCoalescer, image_coalescer: rc.RequestCoalescer,
+                    animal_name_to_image_url: t.Dict[str, str]) -> str:
+    with metrics.timer(stage='download_animal_image'):
+        return _download_animal_image(animal=animal, page_coalescer=page_coalescer, image_coalescer=image_coalescer,
+                                      animal_name_to_image_url=animal_name_to_image_url)
+
+
+def _download_animal_image(animal: co.Animal, page_coalescer: rc.RequestCoalescer,
+                           image_coalescer: rc.RequestCoalescer, animal_name_to_image_url: t.Dict[str, str]) -> str:
     name = animal.get_name()
     if not (page_url := animal.get_page_url()):
         raise ValueError(f'No page url found for {name}')
-    response = requests.get(page_url)
+    if page_url_to_image_url is not None:
+        if not (image_url := page_url_to_image_url.get(page_url)):
+            raise ValueError(f'Failed to get image url for animal:{name} from the wiki API')
+    else:
+        # The fragment of the "see X" links is never sent, so it does not make another page
+        image_url = page_coalescer.run(key=urllib.parse.urldefrag(page_url).url,
+                                       request=lambda: _extract_image_url(page_url=page_url))
+    animal_name_to_image_url[name] = image_url
+    # The downloaded file is shared by the animals of the image, the image processor stores it once for all of them
+    return image_coalescer.run(key=image_url, request=lambda: image_downloader.download(image_url=image_url))
+
+
+def _extract_image_url(page_url: str) -> str:
+    # Shared by every animal of the page, so the errors name the page rather than the animal
+    response = http_fetcher.get(url=page_url)
     if response.status_code != 200:
-        raise ValueError(f'Failed to get page for animal:{name}, status code: {response.status_code}')
-    webpage = response.text
-    extractor = ape.create_animal_page_extractor(webpage=webpage)
-    image_url = extractor.extract_image_url()
+        raise ValueError(f'Failed to get animal page: {page_url}, status code: {response.status_code}')
+    # A page stored in the on disk cache is handed to the parse workers as its cached body file
+    body_path = page_cache.get_body_path(entry=entry) \
+        if (page_cache := http_fetcher.get_cache()) and (entry := page_cache.get_entry(url=page_url)) else None
+    image_url = page_parse_pool.extract_image_url(content=response.content, encoding=response.encoding,
+                                                  body_path=body_path)
     if not image_url:
-        raise ValueError(f'Failed to get image url for animal:{name}, status code: {response.status_code}')
-    return image_downloader.download(image_url=image_url,
-                                     headers={
-                                         'User-Agent': 'CoolBot/0.0 (https://example.org/coolbot/; '
-                                                       'coolbot@example.org)'})
+        raise ValueError(f'Failed to get image url from animal page: {page_url}')
+    return image_url
 
 
-if __name__ == '__main__':
+def _select_changed_animals(animals: t.List[co.Animal], state_store: ass.AnimalStateStore,
+                            page_url_to_revision: t.Dict[str, t.Optional[int]]) -> t.List[co.Animal]:
+    changed_animals = list()
+    for animal in animals:
+        page_revision = page_url_to_revision.get(animal.get_page_url())
+        if state_store.is_unchanged(animal=animal, page_revision=page_revision):
+            animal.set_image_path(image_path=state_store.get_state(name=animal.get_name()).get_image_path())
+        else:
+            changed_animals.append(animal)
+    return changed_animals
+
+
+def _save_animal_states(animals: t.List[co.Animal], state_store: ass.AnimalStateStore,
+                        page_url_to_revision: t.Dict[str, t.Optional[int]],
+                        animal_name_to_image_url: t.Dict[str, str]) -> None:
+    state_store.save_states(states=[
+        ass.AnimalState(name=animal.get_name(), row_hash=ass.compute_row_hash(animal=animal),
+                        page_url=animal.get_page_url(), page_revision=page_url_to_revision.get(animal.get_page_url()),
+                        image_url=animal_name_to_image_url.get(animal.get_name()),
+                        image_hash=utils.hash_file(file_path=animal.get_image_path()),
+                        image_path=animal.get_image_path()) for animal in animals if animal.get_image_path()])
+
+
+def _write_failure_report(failures: t.List[ap.AnimalFailure], failure_report_path: str) -> None:
+    with open(failure_report_path, 'w', encoding='utf-8') as file:
+        json.dump([{'name': failure.get_animal().get_name(), 'page_url': failure.get_animal().get_page_url(),
+                    'error': str(failure.get_error())} for failure in failures], file, indent=4)
+
+
+def _write_metrics(run_metrics: metrics.Metrics, metrics_output: t.Optional[str],
+                   prometheus_output: t.Optional[str]) -> None:
+    if metrics_output:
+        with open(metrics_output, 'w', encoding='utf-8') as file:
+            json.dump(run_metrics.to_summary(), file, indent=4)
+    if prometheus_output:
+        with open(prometheus_output, 'w', encoding='utf-8') as file:
+            file.write(run_metrics.to_prometheus())
+
+
+def _setup_fetcher(args: argparse.Namespace) -> None:
+    global http_fetcher, image_downloader
+    if args.no_cache and args.offline:
+        raise ValueError('Offline mode requires the on disk cache')
+    http_cache = None if args.no_cache else hc.create_http_cache(cache_dir=args.cache_dir,
+                                                                 max_size=args.cache_max_size, offline=args.offline)
+    # The connection pool is sized by the number of workers so every worker can keep its connection alive. Every
+    # request (main page, animal pages, wiki API and images) identifies the tool with its User-Agent.
+    http_fetcher = hf.create_http_fetcher(pool_size=args.workers, default_headers=conf.DEFAULT_HEADERS,
+                                          per_host_limit=args.per_host_limit,
+                                          requests_per_second=args.requests_per_second, max_retries=args.max_retries,
+                                          cache=http_cache)
+    image_downloader = aid.create_image_downloader(fetcher=http_fetcher)
+
+
+def _extract_animals(args: argparse.Namespace) -> t.Iterator[co.Animal]:
     main_webpage = _extract_main_page()
-    wiki_animal_extractor = awe.create_wiki_animal_extractor(webpage=main_webpage)
-    animal_extractor_output = wiki_animal_extractor.extract_animals(extended=True)
-    for animal_obj in animal_extractor_output.get_list_of_animals():
-        file_path = _download_image(animal=animal_obj)
-        animal_obj.set_image_path(image_path=file_path)
+    wiki_animal_extractor = awe.create_wiki_animal_extractor(
+        webpage=main_webpage, layout_cache=tlc.create_table_layout_cache(path=args.layout_cache_path))
+    if args.columnar:
+        return wiki_animal_extractor.extract_animals(extended=True, columnar=True).iter_animals()
+    return wiki_animal_extractor.iter_animals(extended=True)
+
+
+def _download_animals(args: argparse.Namespace, animals: t.Iterable[co.Animal]) -> t.List[co.Animal]:
+    global image_width, page_parse_pool, page_url_to_image_url
+    image_width = args.thumbnail_width
+    page_parse_pool = ppp.create_page_parse_pool(workers=args.parse_workers, image_width=image_width)
+    animals_to_process = animals
+    api_extractor = apae.create_animal_page_api_extractor(fetcher=http_fetcher, image_width=image_width)
+    state_store = None
+    page_url_to_revision = dict()
+    if args.incremental:
+        animals = list(animals)
+        state_store = ass.create_animal_state_store(path=args.state_path)
+        page_url_to_revision = api_extractor.extract_page_revisions(
+            page_urls=[animal.get_page_url() for animal in animals if animal.get_page_url()])
+        animals_to_process = _select_changed_animals(animals=animals, state_store=state_store,
+                                                     page_url_to_revision=page_url_to_revision)
+        print(f'Incremental run, processing {len(animals_to_process)} changed animals out of {len(animals)}')
+    if args.image_source == IMAGE_SOURCE_API:
+        animals_to_process = list(animals_to_process)
+        page_url_to_image_url = api_extractor.extract_image_urls(
+            page_urls=[animal.get_page_url() for animal in animals_to_process if animal.get_page_url()])
+    checkpoint = pc.create_pipeline_checkpoint(path=args.checkpoint_path, resume=args.resume)
+    if args.resume:
+        print(f'Resuming run, {checkpoint.get_completed_count()} animals already completed')
+    # Aliases and "see X" rows link to the same pages and images, each of them is fetched (and stored) once per run.
+    # The coalescers live for this run only, the files they hand out are removed by the image processor below.
+    page_coalescer = rc.create_request_coalescer(stage='animal_page')
+    image_coalescer = rc.create_request_coalescer(stage='animal_image')
+    # Image URL each animal has been downloaded from in this run
+    animal_name_to_image_url: t.Dict[str, str] = dict()
+    process_animal = functools.partial(_download_image, page_coalescer=page_coalescer, image_coalescer=image_coalescer,
+                                       animal_name_to_image_url=animal_name_to_image_url)
+    pipeline = ap.create_animals_pipeline(process_animal=process_animal, workers=args.workers, checkpoint=checkpoint)
+    # The animals are streamed so page fetches start while the rest of the table is still parsed
+    pipeline_output = pipeline.run(animals=animals_to_process)
+    page_parse_pool.close()
+    print(f'Coalesced requests saved {page_coalescer.get_saved_count()} page fetches and '
+          f'{image_coalescer.get_saved_count()} image downloads')
+    image_processor = aip.create_image_processor(images_dir=args.images_dir, thumbnail_width=args.thumbnail_width)
+    with metrics.timer(stage='process_images'):
+        image_processor.process(animals=pipeline_output.get_list_of_animals())
+    # The processed images replace the downloaded ones, so the checkpoint points at the images that remain on disk
+    for animal_obj in pipeline_output.get_list_of_animals():
+        if animal_obj.get_image_path():
+            checkpoint.record_completed(animal=animal_obj, image_path=animal_obj.get_image_path())
+    checkpoint.close()
+    if state_store:
+        _save_animal_states(animals=pipeline_output.get_list_of_animals(), state_store=state_store,
+                            page_url_to_revision=page_url_to_revision,
+                            animal_name_to_image_url=animal_name_to_image_url)
+        state_store.close()
+    all_animals = animals if args.incremental else pipeline_output.get_list_of_animals()
+    for animal_obj in all_animals:
         print(f'Animal name: {animal_obj.get_name()},'
               f' collateral_adjectives: {animal_obj.get_collateral_adjectives_list()},'
-              f' Image local file path: {file_path}')
-    AnimalExporterHTML.export(animal_list=animal_extractor_output.get_list_of_animals())
+              f' Image local file path: {animal_obj.get_image_path()}')
+    for failure in pipeline_output.get_failures():
+        print(f'Failed to process animal: {failure.get_animal().get_name()}, error: {failure.get_error()}')
+    _write_failure_report(failures=pipeline_output.get_failures(), failure_report_path=args.failure_report)
+    if pipeline_output.get_failures():
+        print(f'{len(pipeline_output.get_failures())} animals failed, see {args.failure_report}, '
+              f'rerun with --resume to retry only them')
+    return all_animals
+
+
+def _export_animals(args: argparse.Namespace, animals: t.Iterable[co.Animal]) -> None:
+    output_prefix = os.path.splitext(args.output)[0]
+    format_to_output_path = {export_format: args.output if export_format == 'html' else
+                             er.resolve_output_path(export_format=export_format, output_prefix=output_prefix)
+                             for export_format in args.formats}
+    with metrics.timer(stage='export'):
+        er.export_animals(animals=animals, format_to_output_path=format_to_output_path,
+                          format_to_options={'html-sharded': {'page_size': args.html_page_size}})
+    print(f'Exported animals to: {", ".join(format_to_output_path.values())}')
+
+
+def _save_animals(animals: t.Iterable[co.Animal], animals_path: str) -> None:
+    er.export_animals(animals=animals, format_to_output_path={'jsonl': animals_path})
+    print(f'Saved animals to: {animals_path}')
+
+
+def _run_command(args: argparse.Namespace) -> None:
+    _setup_fetcher(args=args)
+    all_animals = _download_animals(args=args, animals=_extract_animals(args=args))
+    _export_animals(args=args, animals=all_animals)
     print('r')
+
+
+def _extract_command(args: argparse.Namespace) -> None:
+    _setup_fetcher(args=args)
+    _save_animals(animals=_extract_animals(args=args), animals_path=args.animals_path)
+
+
+def _download_command(args: argparse.Namespace) -> None:
+    _setup_fetcher(args=args)
+    all_animals = _download_animals(args=args, animals=aej.read_animals(input_path=args.animals_path))
+    _save_animals(animals=all_animals, animals_path=args.animals_path)
+
+
+def _export_command(args: argparse.Namespace) -> None:
+    _export_animals(args=args, animals=aej.read_animals(input_path=args.animals_path))
+
+
+COMMAND_TO_HANDLER: t.Dict[str, t.Callable[[argparse.Namespace], None]] = {
+    COMMAND_RUN: _run_command,
+    COMMAND_FROM_CACHE: _run_command,
+    COMMAND_EXTRACT: _extract_command,
+    COMMAND_DOWNLOAD: _download_command,
+    COMMAND_EXPORT: _export_command,
+}
+
+
+def _parse_args(argv: t.Optional[t.List[str]] = None) -> argparse.Namespace:
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument('--metrics-output',
+                               help='Path of a JSON summary of the per stage latencies, bytes, cache hits, retries '
+                                    'and errors')
+    common_parser.add_argument('--prometheus-output', help='Path of the same metrics in the Prometheus text format')
+    fetch_parser = argparse.ArgumentParser(add_help=False)
+    fetch_parser.add_argument('--workers', type=int, default=conf.DEFAULT_WORKERS,
+                              help='Number of animals processed concurrently')
+    fetch_parser.add_argument('--per-host-limit', type=int, default=conf.DEFAULT_PER_HOST_LIMIT,
+                              help='Max number of concurrent requests against a single host')
+    fetch_parser.add_argument('--requests-per-second', type=float, default=conf.DEFAULT_REQUESTS_PER_SECOND,
+                              help='Global requests per second budget shared by all the workers')
+    fetch_parser.add_argument('--max-retries', type=int, default=conf.DEFAULT_MAX_RETRIES,
+                              help='Number of retries for throttled (429), server error (5xx) and failed requests')
+    fetch_parser.add_argument('--cache-dir', default=conf.DEFAULT_CACHE_DIR,
+                              help='Directory of the on disk cache for pages and images')
+    fetch_parser.add_argument('--cache-max-size', type=int, default=conf.DEFAULT_CACHE_MAX_SIZE,
+                              help='Max size (bytes) of the cached bodies, least recently used entries are evicted '
+                                   'first')
+    fetch_parser.add_argument('--no-cache', action='store_true', help='Do not use the on disk cache')
+    fetch_parser.add_argument('--offline', action='store_true',
+                              help='Serve pages and images only from the on disk cache')
+    extract_parser = argparse.ArgumentParser(add_help=False)
+    extract_parser.add_argument('--layout-cache-path', default=conf.DEFAULT_LAYOUT_CACHE_PATH,
+                                help='Path of the cached animals table layout, reused while the page layout is '
+                                     'unchanged')
+    extract_parser.add_argument('--columnar', action='store_true',
+                                help='Merge the rows of the same animal into one, held in the compact columnar output, '
+                                     'instead of streaming every row')
+    download_parser = argparse.ArgumentParser(add_help=False)
+    download_parser.add_argument('--images-dir', default=conf.DEFAULT_IMAGES_DIR,
+                                 help='Directory of the deduplicated and resized animals images')
+    download_parser.add_argument('--thumbnail-width', type=int, default=conf.DEFAULT_THUMBNAIL_WIDTH,
+                                 help='Width (pixels) the animals images are requested at and resized to')
+    download_parser.add_argument('--image-source', choices=[IMAGE_SOURCE_PAGE, IMAGE_SOURCE_API],
+                                 default=IMAGE_SOURCE_PAGE,
+                                 help='Resolve the image URLs by scraping every animal page, or in batches with the '
+                                      'wiki API')
+    download_parser.add_argument('--incremental', action='store_true',
+                                 help='Process only the animals whose table row or page changed since the previous '
+                                      'run')
+    download_parser.add_argument('--state-path', default=conf.DEFAULT_STATE_PATH,
+                                 help='Path of the animals state store used by the incremental mode')
+    download_parser.add_argument('--resume', action='store_true',
+                                 help='Skip the animals completed by a previous (crashed, killed or partially failed) '
+                                      'run')
+    download_parser.add_argument('--checkpoint-path', default=conf.DEFAULT_CHECKPOINT_PATH,
+                                 help='Path of the checkpoint the completed animals are appended to')
+    download_parser.add_argument('--failure-report', default=conf.DEFAULT_FAILURE_REPORT_PATH,
+                                 help='Path of the report of the animals that failed and still need attention')
+    download_parser.add_argument('--parse-workers', type=int, default=conf.DEFAULT_PARSE_WORKERS,
+                                 help='Number of processes parsing the animal pages, 0 to parse them in process, '
+                                      'by default one per core')
+    export_parser = argparse.ArgumentParser(add_help=False)
+    export_parser.add_argument('--output', default=aeh.DEFAULT_OUTPUT_PATH,
+                               help='Path of the exported HTML page, the other formats are written next to it')
+    export_parser.add_argument('--formats', nargs='+', choices=er.get_export_formats(), default=['html'],
+                               help='Export formats, all of them are written in a single pass over the animals')
+    export_parser.add_argument('--html-page-size', type=int, default=aehs.DEFAULT_PAGE_SIZE,
+                               help='Number of animals per page of the html-sharded format')
+    animals_parser = argparse.ArgumentParser(add_help=False)
+    animals_parser.add_argument('--animals-path', default=conf.DEFAULT_ANIMALS_PATH,
+                                help='Path of the JSONL animals file the split stages hand over to each other')
+
+    parser = argparse.ArgumentParser(description='Extract the wiki animals list, download the animals images and '
+                                                 'export them to an HTML page')
+    subparsers = parser.add_subparsers(dest='command', metavar='{' + ','.join(COMMANDS) + '}')
+    run_parents = [common_parser, fetch_parser, extract_parser, download_parser, export_parser]
+    subparsers.add_parser(COMMAND_RUN, parents=run_parents,
+                          help='Extract, download and export in a single run (the default command)')
+    subparsers.add_parser(COMMAND_FROM_CACHE, parents=run_parents,
+                          help='The full run, with every page and image served from the on disk cache')
+    subparsers.add_parser(COMMAND_EXTRACT, parents=[common_parser, fetch_parser, extract_parser, animals_parser],
+                          help='Only extract the animals table into the animals file')
+    subparsers.add_parser(COMMAND_DOWNLOAD, parents=[common_parser, fetch_parser, download_parser, animals_parser],
+                          help='Only download the images of the animals file, and record them in it')
+    subparsers.add_parser(COMMAND_EXPORT, parents=[common_parser, export_parser, animals_parser],
+                          help='Only export the animals file, without any network access')
+    argv = sys.argv[1:] if argv is None else argv
+    # Invocations without a command (the options only) keep running the whole tool
+    if not argv or argv[0] not in COMMANDS + ['-h', '--help']:
+        argv = [COMMAND_RUN] + argv
+    args = parser.parse_args(argv)
+    if args.command == COMMAND_FROM_CACHE:
+        args.offline = True
+    return args
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> None:
+    args = _parse_args(argv=argv)
+    # Without an output for them the metrics are not recorded at all
+    run_metrics = metrics.create_metrics() if args.metrics_output or args.prometheus_output else None
+    metrics.set_active_metrics(metrics=run_metrics)
+    COMMAND_TO_HANDLER[args.command](args)
+    if run_metrics:
+        _write_metrics(run_metrics=run_metrics, metrics_output=args.metrics_output,
+                       prometheus_output=args.prometheus_output)
+
+
+if __name__ == '__main__':
+    main()
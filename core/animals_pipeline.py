@@ -0,0 +1,89 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import logging
+import typing as t
+import concurrent.futures
+import core.common as co
+import core.pipeline_checkpoint as pc
+import init.conf as conf
+
+
+class AnimalFailure:
+
+    def __init__(self, animal: co.Animal, error: Exception):
+        self._animal = animal
+        self._error = error
+
+    def get_animal(self) -> co.Animal:
+        return self._animal
+
+    def get_error(self) -> Exception:
+        return self._error
+
+
+class AnimalsPipelineOutput:
+
+    def __init__(self, list_of_animals: t.List[co.Animal], failures: t.List[AnimalFailure]):
+        self._list_of_animals = list_of_animals
+        self._failures = failures
+
+    def get_list_of_animals(self) -> t.List[co.Animal]:
+        return self._list_of_animals
+
+    def get_failures(self) -> t.List[AnimalFailure]:
+        return self._failures
+
+
+class AnimalsPipeline:
+
+    def __init__(self, process_animal: t.Callable[[co.Animal], str], workers: int = conf.DEFAULT_WORKERS,
+                 checkpoint: pc.PipelineCheckpoint = None):
+        if workers < 1:
+            raise ValueError(f'Number of workers must be positive, got: {workers}')
+        self._process_animal = process_animal
+        self._workers = workers
+        self._checkpoint = checkpoint
+
+    def run(self, animals: t.Iterable[co.Animal]) -> AnimalsPipelineOutput:
+        list_of_animals = list()
+        failures = list()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._workers) as executor:
+            # Results are collected in submission order so the output order does not depend on the workers timing
+            animal_futures = list()
+            for animal in animals:
+                if self._checkpoint and (image_path := self._checkpoint.get_completed_image_path(animal=animal)):
+                    animal.set_image_path(image_path=image_path)
+                    animal_futures.append((animal, None))
+                else:
+                    animal_futures.append((animal, executor.submit(self._run_animal, animal)))
+            for animal, future in animal_futures:
+                list_of_animals.append(animal)
+                if not future:
+                    continue
+                try:
+                    animal.set_image_path(image_path=future.result())
+                except Exception as e:
+                    logging.debug(f'Failed to process animal: {animal.get_name()}, error: {e}')
+                    failures.append(AnimalFailure(animal=animal, error=e))
+        return AnimalsPipelineOutput(list_of_animals=list_of_animals, failures=failures)
+
+    def _run_animal(self, animal: co.Animal) -> str:
+        # The checkpoint is written by the worker as soon as the animal finishes, not in output order, so a killed
+        # run keeps everything that completed
+        try:
+            image_path = self._process_animal(animal)
+        except Exception as e:
+            if self._checkpoint:
+                self._checkpoint.record_failed(animal=animal, error=e)
+            raise
+        if self._checkpoint:
+            self._checkpoint.record_completed(animal=animal, image_path=image_path)
+        return image_path
+
+
+def create_animals_pipeline(process_animal: t.Callable[[co.Animal], str], workers: int = conf.DEFAULT_WORKERS,
+                            checkpoint: pc.PipelineCheckpoint = None):
+    return AnimalsPipeline(process_animal=process_animal, workers=workers, checkpoint=checkpoint)
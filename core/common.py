@@ -3,7 +3,10 @@
 # Author:  Ohad ELiyahou
 # Date:    September 2024
 # Summary:
+import sys
+import array
 import typing as t
+import core.utils as utils
 
 
 class AnimalExtractorException(Exception):
@@ -11,6 +14,7 @@ class AnimalExtractorException(Exception):
 
 
 class Animal(object):
+    __slots__ = ('_name', '_collateral_adjectives_list', '_page_url', '_image_path')
 
     def __init__(self, name: str, collateral_adjectives_list: t.List[str] = None, page_url: str = None,
                  image_path: str = None) -> None:
@@ -42,6 +46,129 @@ class AnimalsExtractorOutput(object):
 
     def __init__(self, list_of_animals: t.List[Animal]) -> None:
         self._list_of_animals = list_of_animals
+        self._name_to_animal: t.Optional[t.Dict[str, Animal]] = None
 
     def get_list_of_animals(self) -> t.List[Animal]:
         return self._list_of_animals
+
+    def get_animal(self, name: str) -> t.Optional[Animal]:
+        if self._name_to_animal is None:
+            self._name_to_animal = {animal.get_name().lower(): animal for animal in self._list_of_animals}
+        return self._name_to_animal.get(name.lower())
+
+
+class ColumnarAnimal(object):
+    # A view of a single row of a ColumnarAnimalsExtractorOutput, with the same getters and setters as Animal
+    __slots__ = ('_output', '_index')
+
+    def __init__(self, output: 'ColumnarAnimalsExtractorOutput', index: int) -> None:
+        self._output = output
+        self._index = index
+
+    def get_name(self) -> str:
+        return self._output._names[self._index]
+
+    def get_collateral_adjectives_list(self) -> t.Optional[t.List[str]]:
+        return self._output._resolve_collateral_adjectives_list(index=self._index)
+
+    def get_page_url(self) -> t.Optional[str]:
+        return self._output._resolve_page_url(index=self._index)
+
+    def get_image_path(self) -> t.Optional[str]:
+        return self._output._image_paths[self._index]
+
+    def set_collateral_adjectives_list(self, collateral_adjectives_list: t.List[str]) -> None:
+        self._output._store_collateral_adjectives_list(index=self._index,
+                                                       collateral_adjectives_list=collateral_adjectives_list)
+
+    def set_image_path(self, image_path: str) -> None:
+        self._output._image_paths[self._index] = image_path
+
+
+class ColumnarAnimalsExtractorOutput(object):
+    # Stores the animals column by column instead of one object per animal. Every distinct collateral adjective is
+    # interned once in a pool, and each animal refers to its adjectives by pool id through array backed indexes.
+    # Wiki page URLs are stored without their common prefix. Adding an animal whose (lowercase) name already exists
+    # replaces its row, so several source tables can be merged into one output.
+    NO_ADJECTIVES = 0xFFFFFFFF
+
+    def __init__(self, list_of_animals: t.Iterable[Animal] = ()) -> None:
+        self._names: t.List[str] = list()
+        self._page_urls: t.List[t.Optional[str]] = list()
+        self._image_paths: t.List[t.Optional[str]] = list()
+        self._name_to_index: t.Dict[str, int] = dict()
+        self._adjectives: t.List[str] = list()
+        self._adjective_to_id: t.Dict[str, int] = dict()
+        self._adjective_ids = array.array('I')
+        # Start (in _adjective_ids) and count of every animal adjectives, the start is NO_ADJECTIVES for None
+        self._adjective_starts = array.array('I')
+        self._adjective_counts = array.array('I')
+        self.extend(animals=list_of_animals)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def extend(self, animals: t.Iterable[Animal]) -> None:
+        for animal in animals:
+            self.add_animal(animal=animal)
+
+    def add_animal(self, animal: Animal) -> ColumnarAnimal:
+        name = sys.intern(animal.get_name())
+        if (index := self._name_to_index.get(name.lower())) is None:
+            index = len(self._names)
+            self._name_to_index[name.lower()] = index
+            self._names.append(name)
+            self._page_urls.append(self._compact_page_url(page_url=animal.get_page_url()))
+            self._image_paths.append(animal.get_image_path())
+            self._adjective_starts.append(self.NO_ADJECTIVES)
+            self._adjective_counts.append(0)
+        else:
+            self._names[index] = name
+            self._page_urls[index] = self._compact_page_url(page_url=animal.get_page_url())
+            self._image_paths[index] = animal.get_image_path()
+        self._store_collateral_adjectives_list(index=index,
+                                               collateral_adjectives_list=animal.get_collateral_adjectives_list())
+        return ColumnarAnimal(output=self, index=index)
+
+    def get_list_of_animals(self) -> t.List[ColumnarAnimal]:
+        return list(self.iter_animals())
+
+    def iter_animals(self) -> t.Iterator[ColumnarAnimal]:
+        for index in range(len(self._names)):
+            yield ColumnarAnimal(output=self, index=index)
+
+    def get_animal(self, name: str) -> t.Optional[ColumnarAnimal]:
+        if (index := self._name_to_index.get(name.lower())) is not None:
+            return ColumnarAnimal(output=self, index=index)
+
+    def _resolve_page_url(self, index: int) -> t.Optional[str]:
+        if (page_url := self._page_urls[index]) and page_url.startswith(utils.WIKI_PAGE_PATH_PREFIX):
+            return utils.get_wiki_url(postfix=page_url)
+        return page_url
+
+    @staticmethod
+    def _compact_page_url(page_url: t.Optional[str]) -> t.Optional[str]:
+        if page_url and page_url.startswith(utils.PREFIX_WIKI_URL + utils.WIKI_PAGE_PATH_PREFIX):
+            return page_url[len(utils.PREFIX_WIKI_URL):]
+        return page_url
+
+    def _resolve_collateral_adjectives_list(self, index: int) -> t.Optional[t.List[str]]:
+        if (start := self._adjective_starts[index]) == self.NO_ADJECTIVES:
+            return
+        return [self._adjectives[adjective_id]
+                for adjective_id in self._adjective_ids[start:start + self._adjective_counts[index]]]
+
+    def _store_collateral_adjectives_list(self, index: int, collateral_adjectives_list: t.Optional[t.List[str]]) -> None:
+        if collateral_adjectives_list is None:
+            self._adjective_starts[index] = self.NO_ADJECTIVES
+            self._adjective_counts[index] = 0
+            return
+        # The ids are appended, the previous ids of a replaced list are left unused
+        self._adjective_starts[index] = len(self._adjective_ids)
+        self._adjective_counts[index] = len(collateral_adjectives_list)
+        for adjective in collateral_adjectives_list:
+            if (adjective_id := self._adjective_to_id.get(adjective)) is None:
+                adjective_id = len(self._adjectives)
+                self._adjective_to_id[adjective] = adjective_id
+                self._adjectives.append(sys.intern(adjective))
+            self._adjective_ids.append(adjective_id)
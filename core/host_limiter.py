@@ -0,0 +1,37 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import contextlib
+import threading
+import typing as t
+import urllib.parse
+import init.conf as conf
+
+
+class HostLimiter:
+
+    def __init__(self, per_host_limit: int = conf.DEFAULT_PER_HOST_LIMIT):
+        if per_host_limit < 1:
+            raise ValueError(f'Per host limit must be positive, got: {per_host_limit}')
+        self._per_host_limit = per_host_limit
+        self._host_to_semaphore: t.Dict[str, threading.BoundedSemaphore] = dict()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def limit(self, url: str) -> t.Iterator[None]:
+        semaphore = self._resolve_semaphore(host=urllib.parse.urlsplit(url).netloc)
+        with semaphore:
+            yield
+
+    def _resolve_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if not (semaphore := self._host_to_semaphore.get(host)):
+                semaphore = threading.BoundedSemaphore(self._per_host_limit)
+                self._host_to_semaphore[host] = semaphore
+            return semaphore
+
+
+def create_host_limiter(per_host_limit: int = conf.DEFAULT_PER_HOST_LIMIT):
+    return HostLimiter(per_host_limit=per_host_limit)
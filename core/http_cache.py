@@ -0,0 +1,174 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import time
+import hashlib
+import sqlite3
+import logging
+import tempfile
+import threading
+import typing as t
+import init.conf as conf
+
+
+class CacheEntry:
+
+    def __init__(self, url: str, body_hash: str, size: int, etag: str = None, last_modified: str = None,
+                 content_type: str = None):
+        self._url = url
+        self._body_hash = body_hash
+        self._size = size
+        self._etag = etag
+        self._last_modified = last_modified
+        self._content_type = content_type
+
+    def get_url(self) -> str:
+        return self._url
+
+    def get_body_hash(self) -> str:
+        return self._body_hash
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_etag(self) -> t.Optional[str]:
+        return self._etag
+
+    def get_last_modified(self) -> t.Optional[str]:
+        return self._last_modified
+
+    def get_content_type(self) -> t.Optional[str]:
+        return self._content_type
+
+    def get_conditional_headers(self) -> dict:
+        conditional_headers = dict()
+        if self._etag:
+            conditional_headers['If-None-Match'] = self._etag
+        if self._last_modified:
+            conditional_headers['If-Modified-Since'] = self._last_modified
+        return conditional_headers
+
+
+class HttpCache:
+    # Bodies are stored once per content hash (objects/<hash[:2]>/<hash>), the sqlite index maps every URL to its
+    # body hash and validators. The least recently used URLs are evicted once the bodies exceed max_size bytes.
+
+    def __init__(self, cache_dir: str = conf.DEFAULT_CACHE_DIR, max_size: int = conf.DEFAULT_CACHE_MAX_SIZE,
+                 offline: bool = False):
+        self._cache_dir = cache_dir
+        self._objects_dir = os.path.join(cache_dir, 'objects')
+        self._max_size = max_size
+        self._offline = offline
+        self._lock = threading.Lock()
+        os.makedirs(self._objects_dir, exist_ok=True)
+        self._connection = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS entries (url TEXT PRIMARY KEY, body_hash TEXT NOT NULL, '
+                                 'size INTEGER NOT NULL, etag TEXT, last_modified TEXT, content_type TEXT, '
+                                 'last_access REAL NOT NULL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS entries_body_hash ON entries (body_hash)')
+        self._connection.commit()
+        self._total_size = self._resolve_total_size()
+
+    def is_offline(self) -> bool:
+        return self._offline
+
+    def get_total_size(self) -> int:
+        return self._total_size
+
+    def get_entry(self, url: str) -> t.Optional[CacheEntry]:
+        with self._lock:
+            row = self._connection.execute('SELECT url, body_hash, size, etag, last_modified, content_type '
+                                           'FROM entries WHERE url = ?', (url,)).fetchone()
+            if not row:
+                return
+            if not os.path.exists(self._resolve_object_path(body_hash=row[1])):
+                logging.debug(f'Cached body for {url} is missing, dropping the entry')
+                self._delete_entry(url=url, body_hash=row[1])
+                return
+            self._connection.execute('UPDATE entries SET last_access = ? WHERE url = ?', (time.time(), url))
+            self._connection.commit()
+            return CacheEntry(*row)
+
+    def get_body_path(self, entry: CacheEntry) -> str:
+        return self._resolve_object_path(body_hash=entry.get_body_hash())
+
+    def read_body(self, entry: CacheEntry) -> bytes:
+        with open(self.get_body_path(entry=entry), 'rb') as file:
+            return file.read()
+
+    def store(self, url: str, content: bytes, headers: t.Mapping[str, str]) -> CacheEntry:
+        body_hash = hashlib.sha256(content).hexdigest()
+        entry = CacheEntry(url=url, body_hash=body_hash, size=len(content), etag=headers.get('ETag'),
+                           last_modified=headers.get('Last-Modified'), content_type=headers.get('Content-Type'))
+        with self._lock:
+            object_path = self._resolve_object_path(body_hash=body_hash)
+            if not os.path.exists(object_path):
+                self._write_object(object_path=object_path, content=content)
+                self._total_size += len(content)
+            previous_row = self._connection.execute('SELECT body_hash FROM entries WHERE url = ?', (url,)).fetchone()
+            self._connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                     (url, body_hash, len(content), entry.get_etag(), entry.get_last_modified(),
+                                      entry.get_content_type(), time.time()))
+            if previous_row and previous_row[0] != body_hash:
+                self._release_object(body_hash=previous_row[0])
+            self._evict()
+            self._connection.commit()
+        return entry
+
+    def refresh(self, entry: CacheEntry, headers: t.Mapping[str, str]) -> None:
+        # A 304 response may carry updated validators
+        with self._lock:
+            self._connection.execute('UPDATE entries SET etag = COALESCE(?, etag), '
+                                     'last_modified = COALESCE(?, last_modified), last_access = ? WHERE url = ?',
+                                     (headers.get('ETag'), headers.get('Last-Modified'), time.time(),
+                                      entry.get_url()))
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _evict(self) -> None:
+        while self._total_size > self._max_size:
+            if not (row := self._connection.execute('SELECT url, body_hash FROM entries '
+                                                    'ORDER BY last_access LIMIT 1').fetchone()):
+                return
+            logging.debug(f'Evicting {row[0]} from the http cache')
+            self._delete_entry(url=row[0], body_hash=row[1])
+
+    def _delete_entry(self, url: str, body_hash: str) -> None:
+        self._connection.execute('DELETE FROM entries WHERE url = ?', (url,))
+        self._release_object(body_hash=body_hash)
+        self._connection.commit()
+
+    def _release_object(self, body_hash: str) -> None:
+        # The same body may be shared by several URLs, it is removed only when no entry references it
+        if self._connection.execute('SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1', (body_hash,)).fetchone():
+            return
+        object_path = self._resolve_object_path(body_hash=body_hash)
+        if os.path.exists(object_path):
+            self._total_size -= os.path.getsize(object_path)
+            os.remove(object_path)
+
+    def _resolve_total_size(self) -> int:
+        row = self._connection.execute('SELECT SUM(size) FROM (SELECT DISTINCT body_hash, size FROM entries)').fetchone()
+        return row[0] or 0
+
+    def _resolve_object_path(self, body_hash: str) -> str:
+        return os.path.join(self._objects_dir, body_hash[:2], body_hash)
+
+    @staticmethod
+    def _write_object(object_path: str, content: bytes) -> None:
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(object_path), delete=False) as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_file.name, object_path)
+
+
+def create_http_cache(cache_dir: str = conf.DEFAULT_CACHE_DIR, max_size: int = conf.DEFAULT_CACHE_MAX_SIZE,
+                      offline: bool = False):
+    return HttpCache(cache_dir=cache_dir, max_size=max_size, offline=offline)
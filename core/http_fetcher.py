@@ -0,0 +1,193 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import time
+import logging
+import datetime
+import threading
+import email.utils
+import typing as t
+import requests
+import requests.utils
+import requests.adapters
+import requests.structures
+import core.metrics as metrics
+import core.http_cache as hc
+import core.host_limiter as hl
+import init.conf as conf
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+HTTP_FETCH_STAGE = 'http_fetch'
+
+
+class RateLimiter:
+
+    def __init__(self, requests_per_second: t.Optional[float] = conf.DEFAULT_REQUESTS_PER_SECOND):
+        self._interval = 1 / requests_per_second if requests_per_second else 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        # Reserves the next free slot and returns how long the caller should wait for it
+        if not self._interval:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+            return slot - now
+
+    def acquire(self) -> None:
+        if delay := self.reserve():
+            time.sleep(delay)
+
+
+class RetryPolicy:
+
+    def __init__(self, max_retries: int = conf.DEFAULT_MAX_RETRIES, backoff_factor: float = conf.DEFAULT_BACKOFF_FACTOR,
+                 max_backoff: float = conf.DEFAULT_MAX_BACKOFF):
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._max_backoff = max_backoff
+
+    def can_retry(self, attempt: int) -> bool:
+        return attempt < self._max_retries
+
+    def should_retry(self, status_code: int, attempt: int) -> bool:
+        return status_code in RETRY_STATUS_CODES and self.can_retry(attempt=attempt)
+
+    def resolve_delay(self, attempt: int, retry_after: t.Optional[str] = None) -> float:
+        if retry_after and (retry_after_delay := self._parse_retry_after(retry_after=retry_after)) is not None:
+            return min(retry_after_delay, self._max_backoff)
+        return min(self._backoff_factor * (2 ** attempt), self._max_backoff)
+
+    @staticmethod
+    def _parse_retry_after(retry_after: str) -> t.Optional[float]:
+        # Retry-After is either a number of seconds or an HTTP date
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            logging.debug(f'Can not parse Retry-After header: {retry_after}')
+            return
+        return max(0.0, (retry_at - datetime.datetime.now(tz=datetime.timezone.utc)).total_seconds())
+
+
+class HttpFetcher:
+
+    def __init__(self, pool_size: int = conf.DEFAULT_WORKERS, default_headers: dict = None,
+                 retry_policy: RetryPolicy = None, rate_limiter: RateLimiter = None,
+                 host_limiter: hl.HostLimiter = None, timeout: float = conf.DEFAULT_TIMEOUT,
+                 cache: hc.HttpCache = None):
+        self._default_headers = default_headers
+        self._cache = cache
+        self._retry_policy = retry_policy if retry_policy else RetryPolicy()
+        self._rate_limiter = rate_limiter if rate_limiter else RateLimiter()
+        self._host_limiter = host_limiter if host_limiter else hl.create_host_limiter()
+        self._timeout = timeout
+        self._session = self._create_session(pool_size=pool_size)
+
+    def get_retry_policy(self) -> RetryPolicy:
+        return self._retry_policy
+
+    def get_rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter
+
+    def get_cache(self) -> t.Optional[hc.HttpCache]:
+        return self._cache
+
+    def get(self, url: str, headers: dict = None) -> requests.Response:
+        headers = headers if headers else self._default_headers
+        with metrics.timer(stage=HTTP_FETCH_STAGE):
+            response = self._get_with_cache(url=url, headers=headers) if self._cache else \
+                self._get(url=url, headers=headers)
+        if response.status_code >= 400:
+            metrics.increment(stage=HTTP_FETCH_STAGE, counter=metrics.COUNTER_ERRORS)
+        return response
+
+    def close(self) -> None:
+        self._session.close()
+        if self._cache:
+            self._cache.close()
+
+    def _get_with_cache(self, url: str, headers: t.Optional[dict]) -> requests.Response:
+        entry = self._cache.get_entry(url=url)
+        if self._cache.is_offline():
+            if not entry:
+                raise ValueError(f'{url} is not cached and the http cache is in offline mode')
+            metrics.increment(stage=HTTP_FETCH_STAGE, counter=metrics.COUNTER_CACHE_HITS)
+            return self._build_cached_response(url=url, entry=entry)
+        if entry:
+            headers = {**(headers if headers else dict()), **entry.get_conditional_headers()}
+        response = self._get(url=url, headers=headers)
+        if response.status_code == 304 and entry:
+            logging.debug(f'{url} has not been modified, using the cached body')
+            self._cache.refresh(entry=entry, headers=response.headers)
+            metrics.increment(stage=HTTP_FETCH_STAGE, counter=metrics.COUNTER_CACHE_HITS)
+            return self._build_cached_response(url=url, entry=entry)
+        metrics.increment(stage=HTTP_FETCH_STAGE, counter=metrics.COUNTER_CACHE_MISSES)
+        if response.status_code == 200:
+            self._cache.store(url=url, content=response.content, headers=response.headers)
+        return response
+
+    def _build_cached_response(self, url: str, entry: hc.CacheEntry) -> requests.Response:
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response.headers = requests.structures.CaseInsensitiveDict()
+        if content_type := entry.get_content_type():
+            response.headers['Content-Type'] = content_type
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = self._cache.read_body(entry=entry)
+        return response
+
+    def _get(self, url: str, headers: t.Optional[dict]) -> requests.Response:
+        attempt = 0
+        while True:
+            self._rate_limiter.acquire()
+            try:
+                with self._host_limiter.limit(url=url):
+                    response = self._session.get(url, headers=headers, timeout=self._timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not self._retry_policy.can_retry(attempt=attempt):
+                    raise
+                delay = self._retry_policy.resolve_delay(attempt=attempt)
+                logging.debug(f'Request to {url} failed ({e}), retrying in {delay} seconds')
+            else:
+                if not self._retry_policy.should_retry(status_code=response.status_code, attempt=attempt):
+                    # Only the bodies that came over the network are counted, not the ones served from the cache
+                    if response.status_code == 200:
+                        metrics.increment(stage=HTTP_FETCH_STAGE, counter=metrics.COUNTER_BYTES,
+                                          amount=len(response.content))
+                    return response
+                delay = self._retry_policy.resolve_delay(attempt=attempt,
+                                                         retry_after=response.headers.get('Retry-After'))
+                logging.debug(f'Request to {url} returned {response.status_code}, retrying in {delay} seconds')
+                response.close()
+            metrics.increment(stage=HTTP_FETCH_STAGE, counter=metrics.COUNTER_RETRIES)
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        session = requests.Session()
+        # Retries are handled by the fetcher itself so Retry-After and the rate limiter are respected
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+def create_http_fetcher(pool_size: int = conf.DEFAULT_WORKERS, default_headers: dict = None,
+                        per_host_limit: int = conf.DEFAULT_PER_HOST_LIMIT,
+                        requests_per_second: t.Optional[float] = conf.DEFAULT_REQUESTS_PER_SECOND,
+                        max_retries: int = conf.DEFAULT_MAX_RETRIES, cache: hc.HttpCache = None):
+    return HttpFetcher(pool_size=pool_size, default_headers=default_headers,
+                       retry_policy=RetryPolicy(max_retries=max_retries),
+                       rate_limiter=RateLimiter(requests_per_second=requests_per_second),
+                       host_limiter=hl.create_host_limiter(per_host_limit=per_host_limit), cache=cache)
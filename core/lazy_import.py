@@ -0,0 +1,34 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import sys
+import types
+import importlib
+import importlib.util
+import typing as t
+
+
+class LazyModule(types.ModuleType):
+    # Stands in for a module until one of its attributes is used, the module is imported then. Every attribute is
+    # read from the imported module, so module globals rebound later are seen as well.
+
+    def __getattr__(self, attribute_name: str) -> t.Any:
+        return getattr(importlib.import_module(self.__name__), attribute_name)
+
+
+def lazy_import(module_name: str) -> types.ModuleType:
+    return sys.modules.get(module_name) or LazyModule(module_name)
+
+
+def lazy_import_optional(module_name: str) -> t.Optional[types.ModuleType]:
+    # None when the module is not installed, found without importing it (only its parent packages are imported)
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    try:
+        if importlib.util.find_spec(module_name) is None:
+            return None
+    except ImportError:
+        return None
+    return LazyModule(module_name)
@@ -0,0 +1,170 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import math
+import time
+import bisect
+import threading
+import contextlib
+import typing as t
+
+METRICS_PREFIX = 'animals_extractor'
+# Upper bounds in seconds, the last bucket (+Inf) is implicit
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+
+COUNTER_BYTES = 'bytes'
+COUNTER_CACHE_HITS = 'cache_hits'
+COUNTER_CACHE_MISSES = 'cache_misses'
+COUNTER_RETRIES = 'retries'
+COUNTER_ERRORS = 'errors'
+# Requests served by the result of a concurrent or earlier request for the same resource
+COUNTER_COALESCED = 'coalesced'
+
+
+class Histogram:
+
+    def __init__(self, buckets: t.Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self._buckets = tuple(buckets)
+        self._bucket_counts = [0] * (len(self._buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = 0.0
+
+    def observe(self, value: float) -> None:
+        self._bucket_counts[bisect.bisect_left(self._buckets, value)] += 1
+        self._count += 1
+        self._sum += value
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+
+    def get_count(self) -> int:
+        return self._count
+
+    def get_sum(self) -> float:
+        return self._sum
+
+    def get_cumulative_buckets(self) -> t.List[t.Tuple[float, int]]:
+        cumulative_buckets = list()
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(self._buckets + (math.inf,), self._bucket_counts):
+            cumulative_count += bucket_count
+            cumulative_buckets.append((upper_bound, cumulative_count))
+        return cumulative_buckets
+
+    def estimate_quantile(self, quantile: float) -> t.Optional[float]:
+        # The upper bound of the bucket holding the quantile, capped by the largest observed value
+        if not self._count:
+            return None
+        rank = quantile * self._count
+        for upper_bound, cumulative_count in self.get_cumulative_buckets():
+            if cumulative_count >= rank:
+                return min(upper_bound, self._max)
+        return self._max
+
+    def to_dict(self) -> dict:
+        return {'count': self._count, 'sum': self._sum, 'mean': self._sum / self._count if self._count else None,
+                'min': self._min if self._count else None, 'max': self._max if self._count else None,
+                **{f'p{round(quantile * 100)}': self.estimate_quantile(quantile=quantile)
+                   for quantile in SUMMARY_QUANTILES},
+                'buckets': {('+Inf' if math.isinf(upper_bound) else str(upper_bound)): cumulative_count
+                            for upper_bound, cumulative_count in self.get_cumulative_buckets()}}
+
+
+class Metrics:
+    # Latency histograms and counters per stage, shared by all the worker threads
+
+    def __init__(self, buckets: t.Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self._buckets = buckets
+        self._stage_to_histogram: t.Dict[str, Histogram] = dict()
+        self._stage_to_counters: t.Dict[str, t.Dict[str, float]] = dict()
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            if not (histogram := self._stage_to_histogram.get(stage)):
+                histogram = self._stage_to_histogram[stage] = Histogram(buckets=self._buckets)
+            histogram.observe(value=seconds)
+
+    def increment(self, stage: str, counter: str, amount: float = 1) -> None:
+        with self._lock:
+            counters = self._stage_to_counters.setdefault(stage, dict())
+            counters[counter] = counters.get(counter, 0) + amount
+
+    @contextlib.contextmanager
+    def timer(self, stage: str) -> t.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.increment(stage=stage, counter=COUNTER_ERRORS)
+            raise
+        finally:
+            self.observe(stage=stage, seconds=time.perf_counter() - start)
+
+    def to_summary(self) -> t.Dict[str, dict]:
+        with self._lock:
+            stages = sorted(set(self._stage_to_histogram) | set(self._stage_to_counters))
+            return {stage: {**self._stage_to_counters.get(stage, dict()),
+                            'latency_seconds': self._stage_to_histogram[stage].to_dict()
+                            if stage in self._stage_to_histogram else None}
+                    for stage in stages}
+
+    def to_prometheus(self) -> str:
+        lines = list()
+        with self._lock:
+            lines.append(f'# TYPE {METRICS_PREFIX}_stage_seconds histogram')
+            for stage, histogram in sorted(self._stage_to_histogram.items()):
+                for upper_bound, cumulative_count in histogram.get_cumulative_buckets():
+                    le = '+Inf' if math.isinf(upper_bound) else repr(float(upper_bound))
+                    lines.append(f'{METRICS_PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} '
+                                 f'{cumulative_count}')
+                lines.append(f'{METRICS_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {histogram.get_sum()}')
+                lines.append(f'{METRICS_PREFIX}_stage_seconds_count{{stage="{stage}"}} {histogram.get_count()}')
+            counter_to_stages: t.Dict[str, t.List[t.Tuple[str, float]]] = dict()
+            for stage, counters in sorted(self._stage_to_counters.items()):
+                for counter, value in counters.items():
+                    counter_to_stages.setdefault(counter, list()).append((stage, value))
+        for counter, stage_values in sorted(counter_to_stages.items()):
+            lines.append(f'# TYPE {METRICS_PREFIX}_{counter}_total counter')
+            lines.extend(f'{METRICS_PREFIX}_{counter}_total{{stage="{stage}"}} {value}'
+                         for stage, value in stage_values)
+        return '\n'.join(lines) + '\n'
+
+
+# Instrumented code goes through the module level functions below. While no metrics are active they return at
+# the first check, and timer returns a shared no-op context manager.
+_active_metrics: t.Optional[Metrics] = None
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def set_active_metrics(metrics: t.Optional[Metrics]) -> None:
+    global _active_metrics
+    _active_metrics = metrics
+
+
+def get_active_metrics() -> t.Optional[Metrics]:
+    return _active_metrics
+
+
+def timer(stage: str) -> t.ContextManager[None]:
+    if _active_metrics is None:
+        return _NULL_TIMER
+    return _active_metrics.timer(stage=stage)
+
+
+def observe(stage: str, seconds: float) -> None:
+    if _active_metrics is not None:
+        _active_metrics.observe(stage=stage, seconds=seconds)
+
+
+def increment(stage: str, counter: str, amount: float = 1) -> None:
+    if _active_metrics is not None:
+        _active_metrics.increment(stage=stage, counter=counter, amount=amount)
+
+
+def create_metrics(buckets: t.Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+    return Metrics(buckets=buckets)
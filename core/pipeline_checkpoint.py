@@ -0,0 +1,70 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import json
+import logging
+import threading
+import typing as t
+import core.common as co
+import init.conf as conf
+
+
+class PipelineCheckpoint:
+    # An append only JSON lines file, one line per finished (completed or failed) animal. A later line of the same
+    # animal overrides the earlier ones, so a completed retry clears a previous failure.
+
+    def __init__(self, path: str = conf.DEFAULT_CHECKPOINT_PATH, resume: bool = False):
+        self._path = path
+        self._lock = threading.Lock()
+        self._name_to_image_path: t.Dict[str, str] = dict()
+        if resume:
+            self._load()
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def get_completed_image_path(self, animal: co.Animal) -> t.Optional[str]:
+        # A completed animal is skipped only while its image is still on disk
+        if (image_path := self._name_to_image_path.get(animal.get_name().lower())) and os.path.exists(image_path):
+            return image_path
+
+    def get_completed_count(self) -> int:
+        return len(self._name_to_image_path)
+
+    def record_completed(self, animal: co.Animal, image_path: str) -> None:
+        self._write(record={'name': animal.get_name(), 'image_path': image_path})
+        self._name_to_image_path[animal.get_name().lower()] = image_path
+
+    def record_failed(self, animal: co.Animal, error: Exception) -> None:
+        self._write(record={'name': animal.get_name(), 'error': str(error)})
+        self._name_to_image_path.pop(animal.get_name().lower(), None)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def _write(self, record: dict) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._path):
+            return
+        with open(self._path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The last line may be partially written if the run was killed
+                    logging.debug(f'Skipping a corrupted checkpoint line: {line}')
+                    continue
+                if image_path := record.get('image_path'):
+                    self._name_to_image_path[record['name'].lower()] = image_path
+                else:
+                    self._name_to_image_path.pop(record['name'].lower(), None)
+
+
+def create_pipeline_checkpoint(path: str = conf.DEFAULT_CHECKPOINT_PATH, resume: bool = False):
+    return PipelineCheckpoint(path=path, resume=resume)
@@ -0,0 +1,19 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import multiprocessing
+import typing as t
+import concurrent.futures
+
+# Every process pool of the tool is created through create_process_pool. The pools are started from a parent that
+# runs other threads (the pipeline workers), and forking such a process can copy locks those threads hold into the
+# worker, so the workers are started from a clean process instead. The functions submitted to the pools are pickled
+# by reference, so they must stay module level functions.
+PROCESS_POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def create_process_pool(max_workers: t.Optional[int] = None) -> concurrent.futures.ProcessPoolExecutor:
+    return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers,
+                                                  mp_context=multiprocessing.get_context(PROCESS_POOL_START_METHOD))
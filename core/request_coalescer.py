@@ -0,0 +1,53 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import threading
+import typing as t
+import concurrent.futures
+import core.metrics as metrics
+
+
+class RequestCoalescer:
+    # Runs a single request per key: callers of a key that is in flight wait for its result, and later callers get
+    # the stored result. A failed request is shared with the callers already waiting for it but not stored, so the
+    # next caller of the key retries it.
+
+    def __init__(self, stage: str):
+        self._stage = stage
+        self._key_to_future: t.Dict[str, concurrent.futures.Future] = dict()
+        self._saved_count = 0
+        self._lock = threading.Lock()
+
+    def get_stage(self) -> str:
+        return self._stage
+
+    def get_saved_count(self) -> int:
+        # Number of requests served by the result of another request of the same key
+        return self._saved_count
+
+    def run(self, key: str, request: t.Callable[[], t.Any]) -> t.Any:
+        with self._lock:
+            future = self._key_to_future.get(key)
+            if is_owner := future is None:
+                future = self._key_to_future[key] = concurrent.futures.Future()
+        if not is_owner:
+            result = future.result()
+            with self._lock:
+                self._saved_count += 1
+            metrics.increment(stage=self._stage, counter=metrics.COUNTER_COALESCED)
+            return result
+        try:
+            result = request()
+        except BaseException as e:
+            with self._lock:
+                del self._key_to_future[key]
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+
+def create_request_coalescer(stage: str):
+    return RequestCoalescer(stage=stage)
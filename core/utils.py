@@ -3,9 +3,32 @@
 # Author:  Ohad ELiyahou
 # Date:    September 2024
 # Summary:
+import re
+import hashlib
+import logging
+import urllib.parse
+import importlib.util
+import typing as t
 
 
 PREFIX_WIKI_URL = 'https://en.wikipedia.org'
+WIKI_API_URL = PREFIX_WIKI_URL + '/w/api.php'
+WIKI_PAGE_PATH_PREFIX = '/wiki/'
+
+# bs4 parser backends by preference, mapped to the module they require (None for the builtin parser)
+HTML_PARSER_TO_MODULE = {'lxml': 'lxml', 'html.parser': None}
+DEFAULT_HTML_PARSER = 'html.parser'
+
+# //upload.wikimedia.org/wikipedia/commons/thumb/f/f0/Name.jpg/220px-Name.jpg
+WIKIMEDIA_THUMB_URL_PATTERN = re.compile(r'^(?P<base>.+/wikipedia/[^/]+)/thumb/(?P<path>[0-9a-f]/[0-9a-f]{2}/'
+                                         r'(?P<file_name>[^/]+))/(?P<params>[^/]*?)(?P<width>\d+)px-(?P<thumb_name>[^/]+)$')
+# //upload.wikimedia.org/wikipedia/commons/f/f0/Name.jpg
+WIKIMEDIA_ORIGINAL_URL_PATTERN = re.compile(r'^(?P<base>.+/wikipedia/[^/]+)/(?P<path>[0-9a-f]/[0-9a-f]{2}/'
+                                            r'(?P<file_name>[^/]+))$')
+# Vector images are rendered by the thumbnailer to any width, the other formats can not be upscaled
+VECTOR_IMAGE_EXTENSIONS = ('.svg',)
+
+HASH_CHUNK_SIZE = 1024 * 1024
 
 
 def normalize_image_url(image_url: str) -> str:
@@ -14,3 +37,71 @@ def normalize_image_url(image_url: str) -> str:
 
 def get_wiki_url(postfix: str) -> str:
     return PREFIX_WIKI_URL + postfix
+
+
+def get_wiki_title(page_url: str) -> str:
+    path = urllib.parse.urlsplit(page_url).path
+    if not path.startswith(WIKI_PAGE_PATH_PREFIX):
+        raise ValueError(f'Not a wiki page URL: {page_url}')
+    return urllib.parse.unquote(path[len(WIKI_PAGE_PATH_PREFIX):]).replace('_', ' ')
+
+
+def plan_image_url(image_url: str, width: t.Optional[int] = None, srcset: t.Optional[str] = None,
+                   file_width: t.Optional[t.Union[int, str]] = None) -> str:
+    # Resolves the (normalized) URL of the image rendered at the given width, using a srcset candidate of exactly
+    # that width when the page already references one, otherwise rewriting the Wikimedia thumb URL
+    if not width:
+        return normalize_image_url(image_url=image_url)
+    for candidate_url in _resolve_srcset_urls(srcset=srcset):
+        if _resolve_thumbnail_width(image_url=candidate_url) == width:
+            return normalize_image_url(image_url=candidate_url)
+    return normalize_image_url(image_url=resolve_thumbnail_url(image_url=image_url, width=width,
+                                                               file_width=file_width))
+
+
+def resolve_thumbnail_url(image_url: str, width: int, file_width: t.Optional[t.Union[int, str]] = None) -> str:
+    if match := WIKIMEDIA_THUMB_URL_PATTERN.match(image_url):
+        base, path, file_name = match.group('base'), match.group('path'), match.group('file_name')
+        params, thumb_name = match.group('params'), match.group('thumb_name')
+    elif match := WIKIMEDIA_ORIGINAL_URL_PATTERN.match(image_url):
+        base, path, file_name = match.group('base'), match.group('path'), match.group('file_name')
+        params = ''
+        thumb_name = f'{file_name}.png' if file_name.lower().endswith(VECTOR_IMAGE_EXTENSIONS) else file_name
+    else:
+        logging.debug(f'Not a Wikimedia image URL, can not resize: {image_url}')
+        return image_url
+    if not file_name.lower().endswith(VECTOR_IMAGE_EXTENSIONS) and file_width and int(file_width) <= width:
+        # The thumbnailer does not upscale, the original is the closest image
+        return f'{base}/{path}'
+    return f'{base}/thumb/{path}/{params}{width}px-{thumb_name}'
+
+
+def hash_file(file_path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def resolve_html_parser(parser: t.Optional[str] = None) -> str:
+    candidates = [parser] if parser else list(HTML_PARSER_TO_MODULE.keys())
+    for candidate in candidates:
+        if candidate not in HTML_PARSER_TO_MODULE:
+            raise ValueError(f'Unsupported html parser: {candidate}')
+        module = HTML_PARSER_TO_MODULE[candidate]
+        if not module or importlib.util.find_spec(module):
+            return candidate
+        logging.debug(f'Html parser {candidate} is not installed, falling back to {DEFAULT_HTML_PARSER}')
+    return DEFAULT_HTML_PARSER
+
+
+def _resolve_srcset_urls(srcset: t.Optional[str]) -> t.List[str]:
+    if not srcset:
+        return list()
+    return [candidate.split()[0] for candidate in srcset.split(',') if candidate.strip()]
+
+
+def _resolve_thumbnail_width(image_url: str) -> t.Optional[int]:
+    if match := WIKIMEDIA_THUMB_URL_PATTERN.match(image_url):
+        return int(match.group('width'))
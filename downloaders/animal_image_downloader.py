@@ -3,28 +3,154 @@
 # Author:  Ohad ELiyahou
 # Date:    September 2024
 # Summary:
-import requests
+import asyncio
+import logging
 import tempfile
+import typing as t
+import core.metrics as metrics
+import core.lazy_import as li
+import core.http_fetcher as hf
+import init.conf as conf
+
+# aiohttp is only required by the AsyncImageDownloader, so it is imported on its first use
+aiohttp = li.lazy_import_optional(module_name='aiohttp')
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+IMAGE_DOWNLOAD_STAGE = 'image_download'
+DEFAULT_IMAGE_SUFFIX = '.jpg'
+MIME_TYPE_TO_SUFFIX = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif', 'image/webp': '.webp',
+                       'image/svg+xml': '.svg', 'image/tiff': '.tif'}
 
 
 class ImageDownloader:
 
-    def __init__(self, default_headers: dict = None):
+    def __init__(self, default_headers: dict = None, fetcher: hf.HttpFetcher = None):
         self._default_headers = default_headers
+        self._fetcher = fetcher if fetcher else hf.create_http_fetcher()
 
     def download(self, image_url: str, file_path: str = None, headers: dict = None) -> str:
-        image_response = requests.get(url=image_url,
-                                      headers=headers if headers else self._default_headers)
+        with metrics.timer(stage=IMAGE_DOWNLOAD_STAGE):
+            return self._download(image_url=image_url, file_path=file_path, headers=headers)
+
+    def _download(self, image_url: str, file_path: t.Optional[str], headers: t.Optional[dict]) -> str:
+        image_response = self._fetcher.get(url=image_url, headers=headers if headers else self._default_headers)
         if image_response.status_code != 200:
             raise ValueError(f'Failed to download image for: {image_url}, status code: {image_response.status_code}')
+        # The downloaded bytes are counted once, by the fetcher, under its http_fetch stage
         if file_path:
-            with open(file_path, 'b+') as file:
+            with open(file_path, 'wb') as file:
                 file.write(image_response.content)
                 return file_path
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=resolve_image_suffix(
+                content_type=image_response.headers.get('Content-Type'))) as tmp_file:
             tmp_file.write(image_response.content)
             return tmp_file.name
 
 
-def create_image_downloader():
-    return ImageDownloader()
+class AsyncImageDownloader:
+
+    def __init__(self, default_headers: dict = None, concurrency: int = conf.DEFAULT_WORKERS,
+                 per_host_limit: int = conf.DEFAULT_PER_HOST_LIMIT, chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+                 retry_policy: hf.RetryPolicy = None, rate_limiter: hf.RateLimiter = None):
+        if aiohttp is None:
+            raise ImportError('aiohttp is required for the asynchronous image downloader')
+        self._default_headers = default_headers
+        self._retry_policy = retry_policy if retry_policy else hf.RetryPolicy()
+        self._rate_limiter = rate_limiter if rate_limiter else hf.RateLimiter()
+        self._concurrency = concurrency
+        self._per_host_limit = per_host_limit
+        self._chunk_size = chunk_size
+        # Both are bound to the running event loop, so they are created on first use
+        self._session: t.Optional['aiohttp.ClientSession'] = None
+        self._semaphore: t.Optional[asyncio.BoundedSemaphore] = None
+
+    async def __aenter__(self) -> 'AsyncImageDownloader':
+        return self
+
+    async def __aexit__(self, *_exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session:
+            await self._session.close()
+            self._session = None
+            self._semaphore = None
+
+    async def download(self, image_url: str, file_path: str = None, headers: dict = None) -> str:
+        with metrics.timer(stage=IMAGE_DOWNLOAD_STAGE):
+            return await self._download(image_url=image_url, file_path=file_path, headers=headers)
+
+    async def _download(self, image_url: str, file_path: t.Optional[str], headers: t.Optional[dict]) -> str:
+        session = self._resolve_session()
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._rate_limiter.reserve())
+            # The concurrency slot is held only by the request itself, not by the back off before a retry
+            async with self._semaphore:
+                try:
+                    async with session.get(image_url,
+                                           headers=headers if headers else self._default_headers) as response:
+                        if not self._retry_policy.should_retry(status_code=response.status, attempt=attempt):
+                            return await self._write_response(image_url=image_url, response=response,
+                                                              file_path=file_path)
+                        delay = self._retry_policy.resolve_delay(attempt=attempt,
+                                                                 retry_after=response.headers.get('Retry-After'))
+                        logging.debug(f'Request to {image_url} returned {response.status}, '
+                                      f'retrying in {delay} seconds')
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if not self._retry_policy.can_retry(attempt=attempt):
+                        raise
+                    delay = self._retry_policy.resolve_delay(attempt=attempt)
+                    logging.debug(f'Request to {image_url} failed ({e}), retrying in {delay} seconds')
+            metrics.increment(stage=IMAGE_DOWNLOAD_STAGE, counter=metrics.COUNTER_RETRIES)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def download_many(self, image_urls: t.List[str],
+                            headers: dict = None) -> t.List[t.Union[str, BaseException]]:
+        return await asyncio.gather(*[self.download(image_url=image_url, headers=headers)
+                                      for image_url in image_urls], return_exceptions=True)
+
+    async def _write_response(self, image_url: str, response: 'aiohttp.ClientResponse',
+                              file_path: t.Optional[str]) -> str:
+        if response.status != 200:
+            raise ValueError(f'Failed to download image for: {image_url}, status code: {response.status}')
+        if file_path:
+            with open(file_path, 'wb') as file:
+                await self._write_chunks(response=response, file=file)
+                return file_path
+        with tempfile.NamedTemporaryFile(delete=False, suffix=resolve_image_suffix(
+                content_type=response.headers.get('Content-Type'))) as tmp_file:
+            await self._write_chunks(response=response, file=tmp_file)
+            return tmp_file.name
+
+    async def _write_chunks(self, response: 'aiohttp.ClientResponse', file: t.BinaryIO) -> None:
+        # Without an HttpFetcher underneath, the downloaded bytes are counted here, under the image_download stage
+        async for chunk in response.content.iter_chunked(self._chunk_size):
+            file.write(chunk)
+            metrics.increment(stage=IMAGE_DOWNLOAD_STAGE, counter=metrics.COUNTER_BYTES, amount=len(chunk))
+
+    def _resolve_session(self) -> 'aiohttp.ClientSession':
+        if not self._session:
+            connector = aiohttp.TCPConnector(limit=self._concurrency, limit_per_host=self._per_host_limit)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.BoundedSemaphore(self._concurrency)
+        return self._session
+
+
+def resolve_image_suffix(content_type: t.Optional[str]) -> str:
+    mime_type = content_type.split(';')[0].strip().lower() if content_type else None
+    return MIME_TYPE_TO_SUFFIX.get(mime_type, DEFAULT_IMAGE_SUFFIX)
+
+
+def create_image_downloader(default_headers: dict = None, fetcher: hf.HttpFetcher = None):
+    return ImageDownloader(default_headers=default_headers, fetcher=fetcher)
+
+
+def create_async_image_downloader(default_headers: dict = None, concurrency: int = conf.DEFAULT_WORKERS,
+                                  per_host_limit: int = conf.DEFAULT_PER_HOST_LIMIT,
+                                  requests_per_second: t.Optional[float] = conf.DEFAULT_REQUESTS_PER_SECOND,
+                                  max_retries: int = conf.DEFAULT_MAX_RETRIES):
+    return AsyncImageDownloader(default_headers=default_headers, concurrency=concurrency,
+                                per_host_limit=per_host_limit, retry_policy=hf.RetryPolicy(max_retries=max_retries),
+                                rate_limiter=hf.RateLimiter(requests_per_second=requests_per_second))
@@ -0,0 +1,143 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import shutil
+import logging
+import typing as t
+import core.common as co
+import core.utils as utils
+import core.lazy_import as li
+import core.process_pool as pp
+import init.conf as conf
+
+# Imported on the first thumbnail. Without Pillow the deduplicated images are kept at their original size.
+Image = li.lazy_import_optional(module_name='PIL.Image')
+ImageSequence = li.lazy_import_optional(module_name='PIL.ImageSequence')
+
+IMAGE_FORMAT_TO_EXTENSION = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp', 'BMP': '.bmp',
+                             'TIFF': '.tif'}
+
+
+def _create_thumbnail(source_path: str, thumbnail_path: str, width: int) -> t.Optional[str]:
+    # Runs in a worker process
+    try:
+        with Image.open(source_path) as image:
+            if image.width <= width:
+                # Nothing to resize, re-encoding the image would only lose quality, metadata and frames
+                shutil.copyfile(source_path, thumbnail_path)
+                return thumbnail_path
+            size = (width, round(image.height * width / image.width))
+            save_options = _resolve_save_options(image=image)
+            if getattr(image, 'n_frames', 1) > 1:
+                frames = [frame.resize(size) for frame in ImageSequence.Iterator(image)]
+                frames[0].save(thumbnail_path, save_all=True, append_images=frames[1:], **save_options)
+            else:
+                image.thumbnail(size)
+                image.save(thumbnail_path, **save_options)
+        return thumbnail_path
+    except Exception as e:
+        logging.debug(f'Failed to create thumbnail for {source_path}, error: {e}')
+        if os.path.exists(thumbnail_path):
+            os.remove(thumbnail_path)
+
+
+def _resolve_save_options(image: 'Image.Image') -> dict:
+    # Keeps the format, quality, metadata and animation of the source image in its thumbnail
+    save_options = {'format': image.format}
+    if image.format == 'JPEG':
+        save_options.update(quality='keep', subsampling='keep')
+    for info_key in ['exif', 'icc_profile', 'duration', 'loop']:
+        if image.info.get(info_key) is not None:
+            save_options[info_key] = image.info[info_key]
+    return save_options
+
+
+def _resolve_image_extension(source_path: str) -> str:
+    # The extension of the format the image content is in, the downloaded file name is only a fallback for when
+    # Pillow is not installed or does not know the format
+    if Image is not None:
+        try:
+            with Image.open(source_path) as image:
+                if extension := IMAGE_FORMAT_TO_EXTENSION.get(image.format):
+                    return extension
+        except Exception as e:
+            logging.debug(f'Failed to identify the format of {source_path}, error: {e}')
+    return os.path.splitext(source_path)[1]
+
+
+class ImageProcessor:
+
+    def __init__(self, images_dir: str = conf.DEFAULT_IMAGES_DIR, thumbnail_width: int = conf.DEFAULT_THUMBNAIL_WIDTH,
+                 workers: int = None):
+        self._images_dir = images_dir
+        self._thumbnail_width = thumbnail_width
+        self._workers = workers
+
+    def process(self, animals: t.Iterable[co.Animal]) -> None:
+        os.makedirs(self._images_dir, exist_ok=True)
+        hash_to_animals: t.Dict[str, t.List[co.Animal]] = dict()
+        hash_to_source_paths: t.Dict[str, t.List[str]] = dict()
+        images_dir = os.path.abspath(self._images_dir)
+        for animal in animals:
+            if not (image_path := animal.get_image_path()):
+                continue
+            if os.path.dirname(os.path.abspath(image_path)) == images_dir:
+                # Already stored by a previous (resumed) run
+                continue
+            image_hash = utils.hash_file(file_path=image_path)
+            hash_to_animals.setdefault(image_hash, list()).append(animal)
+            if image_path not in (source_paths := hash_to_source_paths.setdefault(image_hash, list())):
+                source_paths.append(image_path)
+        hash_to_stored_path = self._store_images(hash_to_source_paths=hash_to_source_paths)
+        for image_hash, stored_path in hash_to_stored_path.items():
+            for animal in hash_to_animals[image_hash]:
+                animal.set_image_path(image_path=stored_path)
+        logging.debug(f'Stored {len(hash_to_stored_path)} unique images for '
+                      f'{sum(len(animals) for animals in hash_to_animals.values())} animals')
+
+    def _store_images(self, hash_to_source_paths: t.Dict[str, t.List[str]]) -> t.Dict[str, str]:
+        hash_to_stored_path = dict()
+        hash_to_thumbnail_future = dict()
+        hash_to_extension = {image_hash: _resolve_image_extension(source_path=source_paths[0])
+                             for image_hash, source_paths in hash_to_source_paths.items()}
+        with pp.create_process_pool(max_workers=self._workers) as executor:
+            for image_hash, source_paths in hash_to_source_paths.items():
+                thumbnail_path = self._resolve_stored_path(image_hash=image_hash,
+                                                           extension=hash_to_extension[image_hash],
+                                                           width=self._thumbnail_width)
+                if os.path.exists(thumbnail_path):
+                    hash_to_stored_path[image_hash] = thumbnail_path
+                elif Image is not None:
+                    hash_to_thumbnail_future[image_hash] = executor.submit(
+                        _create_thumbnail, source_paths[0], thumbnail_path, self._thumbnail_width)
+            for image_hash, thumbnail_future in hash_to_thumbnail_future.items():
+                if thumbnail_path := thumbnail_future.result():
+                    hash_to_stored_path[image_hash] = thumbnail_path
+        for image_hash, source_paths in hash_to_source_paths.items():
+            if image_hash not in hash_to_stored_path:
+                # The thumbnail could not be created, the original image is stored instead
+                original_path = self._resolve_stored_path(image_hash=image_hash,
+                                                          extension=hash_to_extension[image_hash])
+                if not os.path.exists(original_path):
+                    shutil.copyfile(source_paths[0], original_path)
+                hash_to_stored_path[image_hash] = original_path
+            self._remove_source_paths(source_paths=source_paths, stored_path=hash_to_stored_path[image_hash])
+        return hash_to_stored_path
+
+    def _resolve_stored_path(self, image_hash: str, extension: str, width: int = None) -> str:
+        file_name = f'{image_hash}_{width}px{extension}' if width else f'{image_hash}{extension}'
+        return os.path.join(self._images_dir, file_name)
+
+    @staticmethod
+    def _remove_source_paths(source_paths: t.List[str], stored_path: str) -> None:
+        for source_path in source_paths:
+            if os.path.abspath(source_path) != os.path.abspath(stored_path):
+                os.remove(source_path)
+
+
+def create_image_processor(images_dir: str = conf.DEFAULT_IMAGES_DIR,
+                           thumbnail_width: int = conf.DEFAULT_THUMBNAIL_WIDTH, workers: int = None):
+    return ImageProcessor(images_dir=images_dir, thumbnail_width=thumbnail_width, workers=workers)
@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import abc
+import tempfile
+import typing as t
+import core.common as co
+
+
+class AnimalExporter(abc.ABC):
+    # Exporters write batches of animals as they arrive. The output is written to a temporary file next to the
+    # output path and renamed over it on close, so a reader never sees a partially written export.
+
+    def __init__(self, output_path: str):
+        self._output_path = output_path
+        self._tmp_file_path: t.Optional[str] = None
+
+    def get_output_path(self) -> str:
+        return self._output_path
+
+    def open(self) -> None:
+        file_descriptor, self._tmp_file_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self._output_path)), suffix='.tmp')
+        os.close(file_descriptor)
+        self._open(file_path=self._tmp_file_path)
+
+    @abc.abstractmethod
+    def write_batch(self, animals: t.List[co.Animal]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        self._close()
+        os.chmod(self._tmp_file_path, 0o644)
+        os.replace(self._tmp_file_path, self._output_path)
+        self._tmp_file_path = None
+
+    def abort(self) -> None:
+        self._close()
+        if self._tmp_file_path and os.path.exists(self._tmp_file_path):
+            os.remove(self._tmp_file_path)
+        self._tmp_file_path = None
+
+    @abc.abstractmethod
+    def _open(self, file_path: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _close(self) -> None:
+        raise NotImplementedError
+
+
+class AnimalTextExporter(AnimalExporter, abc.ABC):
+
+    def __init__(self, output_path: str):
+        super().__init__(output_path=output_path)
+        self._file: t.Optional[t.TextIO] = None
+
+    def _open(self, file_path: str) -> None:
+        self._file = open(file_path, 'w', encoding='utf-8', newline='')
+
+    def _close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,30 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import csv
+import typing as t
+import core.common as co
+import exporters.animal_exporter_base as aeb
+
+CSV_HEADER = ['name', 'collateral_adjectives', 'page_url', 'image_path']
+COLLATERAL_ADJECTIVES_SEPARATOR = ';'
+
+
+class AnimalExporterCSV(aeb.AnimalTextExporter):
+
+    def __init__(self, output_path: str):
+        super().__init__(output_path=output_path)
+        self._writer = None
+
+    def _open(self, file_path: str) -> None:
+        super()._open(file_path=file_path)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_HEADER)
+
+    def write_batch(self, animals: t.List[co.Animal]) -> None:
+        self._writer.writerows([animal.get_name(),
+                                COLLATERAL_ADJECTIVES_SEPARATOR.join(animal.get_collateral_adjectives_list() or []),
+                                animal.get_page_url() or '',
+                                animal.get_image_path() or ''] for animal in animals)
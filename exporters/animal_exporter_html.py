@@ -3,52 +3,101 @@
 # Author:  Ohad ELiyahou
 # Date:    September 2024
 # Summary:
+import os
+import html
 import typing as t
+import urllib.parse
 import core.common as co
+import exporters.animal_exporter_base as aeb
 
+DEFAULT_OUTPUT_PATH = 'animal_list.html'
 
-class AnimalExporterHTML:
-
-    @staticmethod
-    def export(animal_list: t.List[co.Animal]) -> None:
-        html_content = """
+HTML_HEADER = """
         <!DOCTYPE html>
         <html>
         <head>
+            <meta charset="utf-8">
             <title>Animals and Collateral Adjectives</title>
             <style>
-                body {{
+                body {
                     font-family: Arial, sans-serif;
-                }}
-                .animal {{
+                }
+                .animal {
                     margin-bottom: 20px;
-                }}
-                img {{
+                }
+                img {
                     width: 200px;
                     height: auto;
                     margin-top: 10px;
-                }}
+                }
             </style>
         </head>
         <body>
             <h1>List of Animals and Their Collateral Adjectives</h1>
             <div class="animal-list">
         """
-        for animal in animal_list:
-            html_content += f"""
-            <div class="animal">
-                <h2>{animal.get_name()}</h2>
-                <p><strong>Collateral Adjectives:</strong> {', '.join(animal.get_collateral_adjectives_list()) if animal.get_collateral_adjectives_list() else '-'}</p>
-                <img src="{animal.get_image_path()}" alt="{animal.get_name()} image"/>
-            </div>
-            """
 
-        html_content += """
+HTML_FOOTER = """
             </div>
         </body>
         </html>
         """
 
-        with open('animal_list.html', 'w+') as file:
-            file.write(html_content)
-        print("HTML file created: animal_list.html")
+
+class AnimalExporterHTML(aeb.AnimalTextExporter):
+
+    @staticmethod
+    def export(animal_list: t.Iterable[co.Animal], output_path: str = DEFAULT_OUTPUT_PATH) -> None:
+        exporter = AnimalExporterHTML(output_path=output_path)
+        exporter.open()
+        try:
+            for animal in animal_list:
+                exporter.write_batch(animals=[animal])
+        except BaseException:
+            exporter.abort()
+            raise
+        exporter.close()
+        print(f"HTML file created: {output_path}")
+
+    @staticmethod
+    def export_to_stream(animals: t.Iterable[co.Animal], stream: t.TextIO) -> None:
+        stream.write(HTML_HEADER)
+        for animal in animals:
+            stream.write(AnimalExporterHTML._render_animal(animal=animal))
+        stream.write(HTML_FOOTER)
+
+    def write_batch(self, animals: t.List[co.Animal]) -> None:
+        output_dir = os.path.dirname(os.path.abspath(self._output_path))
+        self._file.write(''.join(self._render_animal(animal=animal, output_dir=output_dir) for animal in animals))
+
+    def _open(self, file_path: str) -> None:
+        super()._open(file_path=file_path)
+        self._file.write(HTML_HEADER)
+
+    def _close(self) -> None:
+        if self._file and not self._file.closed:
+            self._file.write(HTML_FOOTER)
+        super()._close()
+
+    @staticmethod
+    def _render_animal(animal: co.Animal, output_dir: t.Optional[str] = None) -> str:
+        name = html.escape(animal.get_name())
+        collateral_adjectives_list = animal.get_collateral_adjectives_list()
+        adjectives = html.escape(', '.join(collateral_adjectives_list)) if collateral_adjectives_list else '-'
+        image_item = f'<img src="{resolve_image_url(image_path=image_path, output_dir=output_dir)}" ' \
+                     f'alt="{name} image" loading="lazy"/>' \
+            if (image_path := animal.get_image_path()) else ''
+        return f"""
+            <div class="animal">
+                <h2>{name}</h2>
+                <p><strong>Collateral Adjectives:</strong> {adjectives}</p>
+                {image_item}
+            </div>
+            """
+
+
+def resolve_image_url(image_path: str, output_dir: t.Optional[str] = None) -> str:
+    # Relative to the exported page, so the page and its images can be served as a static bundle
+    if output_dir:
+        image_path = os.path.relpath(os.path.abspath(image_path), output_dir)
+    return html.escape(urllib.parse.quote(image_path.replace(os.sep, '/')))
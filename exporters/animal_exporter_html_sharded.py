@@ -0,0 +1,219 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import re
+import html
+import glob
+import shutil
+import hashlib
+import logging
+import tempfile
+import typing as t
+import concurrent.futures
+import core.common as co
+import core.process_pool as pp
+import exporters.animal_exporter_base as aeb
+import exporters.animal_exporter_html as aeh
+
+DEFAULT_PAGE_SIZE = 100
+INDEX_FILE_NAME = 'index.html'
+IMAGES_DIR_NAME = 'images'
+PAGE_FILE_NAME_FORMAT = 'page-{page_number:04d}.html'
+PAGE_FILE_NAME_PATTERN = re.compile(r'^page-(\d{4,})\.html$')
+
+# The pages are served as static files, so the markup is kept compact and the stylesheet is inlined to save a
+# request before the first paint
+PAGE_HEADER_FORMAT = '<!DOCTYPE html><html><head><meta charset="utf-8">' \
+                     '<meta name="viewport" content="width=device-width,initial-scale=1">' \
+                     '<title>{title}</title><style>' \
+                     'body{{font-family:Arial,sans-serif}}.animal{{margin-bottom:20px}}' \
+                     'img{{width:200px;height:auto;margin-top:10px}}nav a{{margin-right:10px}}' \
+                     '</style></head><body><h1>{title}</h1>'
+PAGE_FOOTER = '</body></html>\n'
+TITLE = 'List of Animals and Their Collateral Adjectives'
+
+# (name, collateral adjectives, relative image url), so only plain tuples are pickled to the worker processes
+AnimalRow = t.Tuple[str, t.Optional[t.List[str]], t.Optional[str]]
+
+
+def _write_page(file_path: str, page_number: int, has_next_page: bool, rows: t.List[AnimalRow]) -> None:
+    # Runs in a worker process
+    parts = [PAGE_HEADER_FORMAT.format(title=f'{TITLE} - page {page_number}'),
+             _render_navigation(page_number=page_number, has_next_page=has_next_page), '<div class="animal-list">']
+    for name, collateral_adjectives_list, image_url in rows:
+        name = html.escape(name)
+        adjectives = html.escape(', '.join(collateral_adjectives_list)) if collateral_adjectives_list else '-'
+        image_item = f'<img src="{image_url}" alt="{name} image" loading="lazy" decoding="async">' \
+            if image_url else ''
+        parts.append(f'<div class="animal"><h2>{name}</h2>'
+                     f'<p><strong>Collateral Adjectives:</strong> {adjectives}</p>{image_item}</div>\n')
+    parts.append('</div>')
+    parts.append(_render_navigation(page_number=page_number, has_next_page=has_next_page))
+    parts.append(PAGE_FOOTER)
+    with open(file_path, 'w', encoding='utf-8', newline='') as file:
+        file.write(''.join(parts))
+    os.chmod(file_path, 0o644)
+
+
+def _render_navigation(page_number: int, has_next_page: bool) -> str:
+    links = [f'<a href="{INDEX_FILE_NAME}">Index</a>']
+    if page_number > 1:
+        links.append(f'<a href="{PAGE_FILE_NAME_FORMAT.format(page_number=page_number - 1)}">Previous</a>')
+    if has_next_page:
+        links.append(f'<a href="{PAGE_FILE_NAME_FORMAT.format(page_number=page_number + 1)}">Next</a>')
+    return f'<nav>{"".join(links)}</nav>'
+
+
+class AnimalExporterShardedHTML(aeb.AnimalTextExporter):
+    # The output path is the index page, the pages of page_size animals are written next to it. Every full page is
+    # rendered by a worker process while the next page is collected; a page is handed to a worker only once an
+    # animal of the following page arrives, so it knows whether to link to a next page. The images outside the
+    # pages directory are hard linked (or copied) into its images directory, so the directory is a self contained
+    # bundle that can be served as is.
+
+    def __init__(self, output_path: str, page_size: int = DEFAULT_PAGE_SIZE, workers: int = None):
+        if page_size < 1:
+            raise ValueError(f'Page size must be positive, got: {page_size}')
+        super().__init__(output_path=output_path)
+        self._page_size = page_size
+        self._workers = workers
+        self._output_dir = os.path.dirname(os.path.abspath(output_path))
+        self._images_dir = os.path.join(self._output_dir, IMAGES_DIR_NAME)
+        self._image_path_to_bundled_path: t.Dict[str, t.Optional[str]] = dict()
+        # Bundled images this export added, removed again if it is aborted
+        self._new_bundled_paths: t.List[str] = list()
+        self._executor: t.Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._pending_rows: t.List[AnimalRow] = list()
+        self._page_futures: t.List[concurrent.futures.Future] = list()
+        self._page_tmp_paths: t.List[str] = list()
+        # (first animal name, last animal name) of every page, for the index
+        self._page_ranges: t.List[t.Tuple[str, str]] = list()
+
+    def open(self) -> None:
+        os.makedirs(self._output_dir, exist_ok=True)
+        super().open()
+
+    def write_batch(self, animals: t.List[co.Animal]) -> None:
+        for animal in animals:
+            if len(self._pending_rows) == self._page_size:
+                self._submit_page(has_next_page=True)
+            image_url = aeh.resolve_image_url(image_path=bundled_path, output_dir=self._output_dir) \
+                if (image_path := animal.get_image_path()) and (bundled_path := self._bundle_image(image_path)) \
+                else None
+            self._pending_rows.append((animal.get_name(), animal.get_collateral_adjectives_list(), image_url))
+
+    def close(self) -> None:
+        try:
+            if self._pending_rows:
+                self._submit_page(has_next_page=False)
+            for page_future in self._page_futures:
+                page_future.result()
+            self._file.write(self._render_index())
+        except BaseException:
+            self.abort()
+            raise
+        # The pages are in place before the index that links to them
+        for page_number, page_tmp_path in enumerate(self._page_tmp_paths, start=1):
+            os.replace(page_tmp_path, self._get_page_path(page_number=page_number))
+        self._remove_stale_pages(page_count=len(self._page_tmp_paths))
+        self._remove_stale_images()
+        self._page_tmp_paths = list()
+        self._new_bundled_paths = list()
+        super().close()
+
+    def abort(self) -> None:
+        self._shutdown_executor()
+        for page_tmp_path in self._page_tmp_paths:
+            if os.path.exists(page_tmp_path):
+                os.remove(page_tmp_path)
+        self._page_tmp_paths = list()
+        for bundled_path in self._new_bundled_paths:
+            if os.path.exists(bundled_path):
+                os.remove(bundled_path)
+        self._new_bundled_paths = list()
+        if os.path.isdir(self._images_dir) and not os.listdir(self._images_dir):
+            os.rmdir(self._images_dir)
+        super().abort()
+
+    def _close(self) -> None:
+        self._shutdown_executor()
+        super()._close()
+
+    def _submit_page(self, has_next_page: bool) -> None:
+        if self._executor is None:
+            self._executor = pp.create_process_pool(max_workers=self._workers)
+        file_descriptor, page_tmp_path = tempfile.mkstemp(dir=self._output_dir, suffix='.tmp')
+        os.close(file_descriptor)
+        self._page_tmp_paths.append(page_tmp_path)
+        page_number = len(self._page_tmp_paths)
+        self._page_ranges.append((self._pending_rows[0][0], self._pending_rows[-1][0]))
+        self._page_futures.append(self._executor.submit(_write_page, page_tmp_path, page_number, has_next_page,
+                                                        self._pending_rows))
+        self._pending_rows = list()
+
+    def _bundle_image(self, image_path: str) -> t.Optional[str]:
+        image_path = os.path.abspath(image_path)
+        if os.path.commonpath([image_path, self._output_dir]) == self._output_dir:
+            return image_path
+        if image_path in self._image_path_to_bundled_path:
+            return self._image_path_to_bundled_path[image_path]
+        bundled_name = os.path.basename(image_path)
+        if os.path.join(self._images_dir, bundled_name) in self._image_path_to_bundled_path.values():
+            # Another image of the same name is already bundled
+            bundled_name = f'{hashlib.sha1(image_path.encode("utf-8")).hexdigest()[:8]}_{bundled_name}'
+        bundled_path = os.path.join(self._images_dir, bundled_name)
+        try:
+            self._link_image(image_path=image_path, bundled_path=bundled_path)
+        except OSError as e:
+            logging.warning(f'Failed to bundle the image {image_path}, it is left out of the pages, error: {e}')
+            bundled_path = None
+        self._image_path_to_bundled_path[image_path] = bundled_path
+        return bundled_path
+
+    def _link_image(self, image_path: str, bundled_path: str) -> None:
+        if os.path.exists(bundled_path):
+            if os.path.samefile(image_path, bundled_path):
+                return
+            os.remove(bundled_path)
+        else:
+            self._new_bundled_paths.append(bundled_path)
+        os.makedirs(self._images_dir, exist_ok=True)
+        try:
+            os.link(image_path, bundled_path)
+        except OSError:  # e.g. the image is on another file system
+            shutil.copyfile(image_path, bundled_path)
+
+    def _shutdown_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._page_futures = list()
+
+    def _render_index(self) -> str:
+        page_items = ''.join(
+            f'<li><a href="{PAGE_FILE_NAME_FORMAT.format(page_number=page_number)}">'
+            f'{html.escape(first_name)} - {html.escape(last_name)}</a></li>'
+            for page_number, (first_name, last_name) in enumerate(self._page_ranges, start=1))
+        return f'{PAGE_HEADER_FORMAT.format(title=TITLE)}<ol>{page_items}</ol>{PAGE_FOOTER}'
+
+    def _get_page_path(self, page_number: int) -> str:
+        return os.path.join(self._output_dir, PAGE_FILE_NAME_FORMAT.format(page_number=page_number))
+
+    def _remove_stale_pages(self, page_count: int) -> None:
+        # Pages left by a previous, longer export would otherwise still be served
+        for page_path in glob.glob(os.path.join(self._output_dir, 'page-*.html')):
+            if (match := PAGE_FILE_NAME_PATTERN.match(os.path.basename(page_path))) and \
+                    int(match.group(1)) > page_count:
+                os.remove(page_path)
+
+    def _remove_stale_images(self) -> None:
+        # Images bundled by a previous export that no page links to anymore
+        if not os.path.isdir(self._images_dir):
+            return
+        bundled_paths = set(self._image_path_to_bundled_path.values())
+        for image_name in os.listdir(self._images_dir):
+            if (image_path := os.path.join(self._images_dir, image_name)) not in bundled_paths:
+                os.remove(image_path)
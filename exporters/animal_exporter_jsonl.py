@@ -0,0 +1,31 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import json
+import typing as t
+import core.common as co
+import exporters.animal_exporter_base as aeb
+
+
+class AnimalExporterJSONL(aeb.AnimalTextExporter):
+
+    def write_batch(self, animals: t.List[co.Animal]) -> None:
+        self._file.write(''.join(json.dumps({'name': animal.get_name(),
+                                             'collateral_adjectives': animal.get_collateral_adjectives_list(),
+                                             'page_url': animal.get_page_url(),
+                                             'image_path': animal.get_image_path()}, ensure_ascii=False) + '\n'
+                                 for animal in animals))
+
+
+def read_animals(input_path: str) -> t.Iterator[co.Animal]:
+    # Reads back an AnimalExporterJSONL export, so the stages of a run can be split between invocations
+    with open(input_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            animal_dict = json.loads(line)
+            yield co.Animal(name=animal_dict['name'],
+                            collateral_adjectives_list=animal_dict.get('collateral_adjectives'),
+                            page_url=animal_dict.get('page_url'), image_path=animal_dict.get('image_path'))
@@ -0,0 +1,43 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import typing as t
+import core.common as co
+import exporters.animal_exporter_base as aeb
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow is only required by the parquet exporter
+    pyarrow = None
+
+
+class AnimalExporterParquet(aeb.AnimalExporter):
+    # Every batch is written as a parquet row group
+
+    def __init__(self, output_path: str):
+        if pyarrow is None:
+            raise ImportError('pyarrow is required for the parquet exporter')
+        super().__init__(output_path=output_path)
+        self._schema = pyarrow.schema([('name', pyarrow.string()),
+                                       ('collateral_adjectives', pyarrow.list_(pyarrow.string())),
+                                       ('page_url', pyarrow.string()),
+                                       ('image_path', pyarrow.string())])
+        self._writer: t.Optional['pyarrow.parquet.ParquetWriter'] = None
+
+    def write_batch(self, animals: t.List[co.Animal]) -> None:
+        self._writer.write_table(pyarrow.Table.from_pydict({
+            'name': [animal.get_name() for animal in animals],
+            'collateral_adjectives': [animal.get_collateral_adjectives_list() for animal in animals],
+            'page_url': [animal.get_page_url() for animal in animals],
+            'image_path': [animal.get_image_path() for animal in animals]}, schema=self._schema))
+
+    def _open(self, file_path: str) -> None:
+        self._writer = pyarrow.parquet.ParquetWriter(file_path, schema=self._schema)
+
+    def _close(self) -> None:
+        if self._writer:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,73 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import logging
+import importlib
+import itertools
+import typing as t
+import core.common as co
+import exporters.animal_exporter_base as aeb
+
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+
+# Exporter classes are imported on first use, so a format whose optional dependency is missing (parquet) does not
+# break the others
+_FORMAT_TO_EXPORTER_CLASS_PATH: t.Dict[str, str] = {
+    'html': 'exporters.animal_exporter_html.AnimalExporterHTML',
+    'html-sharded': 'exporters.animal_exporter_html_sharded.AnimalExporterShardedHTML',
+    'jsonl': 'exporters.animal_exporter_jsonl.AnimalExporterJSONL',
+    'csv': 'exporters.animal_exporter_csv.AnimalExporterCSV',
+    'parquet': 'exporters.animal_exporter_parquet.AnimalExporterParquet',
+}
+
+
+def register_exporter(export_format: str, exporter_class_path: str) -> None:
+    _FORMAT_TO_EXPORTER_CLASS_PATH[export_format] = exporter_class_path
+
+
+def get_export_formats() -> t.List[str]:
+    return list(_FORMAT_TO_EXPORTER_CLASS_PATH.keys())
+
+
+def resolve_output_path(export_format: str, output_prefix: str) -> str:
+    if export_format == 'html-sharded':
+        # A directory bundle of pages with an index, to be served statically
+        return os.path.join(f'{output_prefix}_pages', 'index.html')
+    return f'{output_prefix}.{export_format}'
+
+
+def create_exporter(export_format: str, output_path: str, **exporter_options) -> aeb.AnimalExporter:
+    if not (exporter_class_path := _FORMAT_TO_EXPORTER_CLASS_PATH.get(export_format)):
+        raise ValueError(f'Unsupported export format: {export_format}, supported formats: {get_export_formats()}')
+    module_name, class_name = exporter_class_path.rsplit('.', 1)
+    exporter_class = getattr(importlib.import_module(module_name), class_name)
+    return exporter_class(output_path=output_path, **exporter_options)
+
+
+def export_animals(animals: t.Iterable[co.Animal], format_to_output_path: t.Dict[str, str],
+                   batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+                   format_to_options: t.Optional[t.Dict[str, t.Dict[str, t.Any]]] = None) -> None:
+    # A single pass over the animals, every batch is written to all the formats
+    format_to_options = format_to_options or dict()
+    exporters = [create_exporter(export_format=export_format, output_path=output_path,
+                                 **format_to_options.get(export_format, dict()))
+                 for export_format, output_path in format_to_output_path.items()]
+    opened_exporters = list()
+    try:
+        for exporter in exporters:
+            exporter.open()
+            opened_exporters.append(exporter)
+        animals_iterator = iter(animals)
+        while batch := list(itertools.islice(animals_iterator, batch_size)):
+            for exporter in exporters:
+                exporter.write_batch(animals=batch)
+    except BaseException:
+        for exporter in opened_exporters:
+            exporter.abort()
+        raise
+    for exporter in exporters:
+        exporter.close()
+        logging.debug(f'Exported animals to {os.path.abspath(exporter.get_output_path())}')
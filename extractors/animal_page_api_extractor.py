@@ -0,0 +1,113 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import json
+import logging
+import typing as t
+import urllib.parse
+import core.utils as utils
+import core.metrics as metrics
+import core.http_fetcher as hf
+import init.conf as conf
+
+# Default width of the infobox images embedded in the wiki pages
+DEFAULT_API_THUMBNAIL_WIDTH = 220
+PAGE_API_QUERY_STAGE = 'page_api_query'
+
+
+class AnimalPageApiExtractor:
+    # Resolves the lead image (and latest revision) of many pages with the MediaWiki API, one query per batch of
+    # titles, instead of downloading and parsing each page. The lead image is the one PageImages picks, which is
+    # the infobox image for the animal pages.
+
+    def __init__(self, fetcher: hf.HttpFetcher, image_width: int = None, api_url: str = utils.WIKI_API_URL,
+                 batch_size: int = conf.DEFAULT_API_BATCH_SIZE):
+        self._fetcher = fetcher
+        self._image_width = image_width if image_width else DEFAULT_API_THUMBNAIL_WIDTH
+        self._api_url = api_url
+        self._batch_size = batch_size
+
+    def extract_image_urls(self, page_urls: t.Iterable[str]) -> t.Dict[str, t.Optional[str]]:
+        params = {'prop': 'pageimages', 'piprop': 'thumbnail', 'pithumbsize': str(self._image_width)}
+        return self._extract_page_values(page_urls=page_urls, params=params, limit_param='pilimit',
+                                         resolve_page_value=lambda page: page.get('thumbnail', dict()).get('source'))
+
+    def extract_image_url(self, page_url: str) -> t.Optional[str]:
+        return self.extract_image_urls(page_urls=[page_url]).get(page_url)
+
+    def extract_page_revisions(self, page_urls: t.Iterable[str]) -> t.Dict[str, t.Optional[int]]:
+        # The latest revision id of a page changes on every edit, so it tells whether a page changed since last run
+        return self._extract_page_values(page_urls=page_urls, params={'prop': 'info'}, limit_param=None,
+                                         resolve_page_value=lambda page: page.get('lastrevid'))
+
+    def _extract_page_values(self, page_urls: t.Iterable[str], params: t.Dict[str, str], limit_param: t.Optional[str],
+                             resolve_page_value: t.Callable[[dict], t.Any]) -> t.Dict[str, t.Any]:
+        title_to_page_urls: t.Dict[str, t.List[str]] = dict()
+        page_url_to_value = dict()
+        for page_url in page_urls:
+            try:
+                title = utils.get_wiki_title(page_url=page_url)
+            except ValueError as e:
+                # e.g. a redlink to an article that does not exist, it has no value rather than failing the batch
+                logging.debug(f'Not querying {page_url}, error: {e}')
+                page_url_to_value[page_url] = None
+                continue
+            title_to_page_urls.setdefault(title, list()).append(page_url)
+        titles = list(title_to_page_urls.keys())
+        for batch_start in range(0, len(titles), self._batch_size):
+            batch_titles = titles[batch_start:batch_start + self._batch_size]
+            batch_params = {**params, limit_param: str(len(batch_titles))} if limit_param else params
+            title_to_value = self._query_titles(titles=batch_titles, params=batch_params,
+                                                resolve_page_value=resolve_page_value)
+            for title in batch_titles:
+                for page_url in title_to_page_urls[title]:
+                    page_url_to_value[page_url] = title_to_value.get(title)
+        return page_url_to_value
+
+    def _query_titles(self, titles: t.List[str], params: t.Dict[str, str],
+                      resolve_page_value: t.Callable[[dict], t.Any]) -> t.Dict[str, t.Any]:
+        params = {'action': 'query', 'format': 'json', 'formatversion': '2', 'redirects': '1', **params,
+                  'titles': '|'.join(titles)}
+        title_aliases = dict()
+        resolved_title_to_value = dict()
+        continue_params = dict()
+        while True:
+            query_response = self._query(params={**params, **continue_params})
+            query = query_response.get('query', dict())
+            # Requested titles may be normalized and then redirected before they reach their page
+            for alias in query.get('normalized', list()) + query.get('redirects', list()):
+                title_aliases[alias['from']] = alias['to']
+            for page in query.get('pages', list()):
+                if (value := resolve_page_value(page)) is not None:
+                    resolved_title_to_value[page['title']] = value
+            if not (continue_params := query_response.get('continue')):
+                break
+        title_to_value = dict()
+        for title in titles:
+            resolved_title = title
+            for _ in range(len(title_aliases) + 1):
+                if resolved_title not in title_aliases:
+                    break
+                resolved_title = title_aliases[resolved_title]
+            title_to_value[title] = resolved_title_to_value.get(resolved_title)
+            if title_to_value[title] is None:
+                logging.debug(f'No {params["prop"]} value found for {title}')
+        return title_to_value
+
+    def _query(self, params: t.Dict[str, str]) -> dict:
+        with metrics.timer(stage=PAGE_API_QUERY_STAGE):
+            query_url = f'{self._api_url}?{urllib.parse.urlencode(params)}'
+            response = self._fetcher.get(url=query_url)
+            if response.status_code != 200:
+                raise ValueError(f'Failed to query the wiki API, status code: {response.status_code}')
+            query_response = json.loads(response.content)
+            if error := query_response.get('error'):
+                raise ValueError(f'Failed to query the wiki API, error: {error}')
+            return query_response
+
+
+def create_animal_page_api_extractor(fetcher: hf.HttpFetcher, image_width: int = None,
+                                     api_url: str = utils.WIKI_API_URL):
+    return AnimalPageApiExtractor(fetcher=fetcher, image_width=image_width, api_url=api_url)
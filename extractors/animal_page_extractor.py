@@ -4,19 +4,28 @@
 # Date:    September 2024
 # Summary:
 import bs4
-import requests
 import typing as t
+import html.parser
 import core.common as co
 import core.utils as utils
+import core.metrics as metrics
 import logging
 
+MAIN_TABLE_CLASSES = frozenset({'infobox', 'biota'})
+PAGE_IMAGE_CLASS = 'mw-file-element'
+STREAMING_CHUNK_SIZE = 16 * 1024
+PAGE_PARSE_STAGE = 'page_parse'
+PAGE_EXTRACT_STAGE = 'page_extract'
+
 
 class AnimalPageExtractor:
 
-    def __init__(self, webpage: str):
+    def __init__(self, webpage: str, image_width: int = None):
         self._webpage = webpage
-        self._soup = bs4.BeautifulSoup(self._webpage, "html.parser")
-        self._main_table = self._resolve_main_table()
+        self._image_width = image_width
+        with metrics.timer(stage=PAGE_PARSE_STAGE):
+            self._soup = bs4.BeautifulSoup(self._webpage, "html.parser")
+            self._main_table = self._resolve_main_table()
 
     def _resolve_main_table(self):
         try:
@@ -28,23 +37,134 @@ class AnimalPageExtractor:
             logging.debug(f'Failed to resolve main table')
 
     def extract_image_url(self) -> t.Optional[str]:
-        if self._main_table:
-            if image_url := self._resolve_image_from_main_table():
-                return image_url
-        return self._resolve_image_from_page()
+        with metrics.timer(stage=PAGE_EXTRACT_STAGE):
+            if self._main_table:
+                if image_url := self._resolve_image_from_main_table():
+                    return image_url
+            return self._resolve_image_from_page()
 
     def _resolve_image_from_main_table(self) -> t.Optional[str]:
         if not (img_tag := self._main_table.find('img')):
             logging.debug('Can not find image item in main table')
             return
         if image_url_src := img_tag['src']:
-            return utils.normalize_image_url(image_url=image_url_src)
+            return utils.plan_image_url(image_url=image_url_src, width=self._image_width, srcset=img_tag.get('srcset'),
+                                        file_width=img_tag.get('data-file-width'))
 
     def _resolve_image_from_page(self) -> t.Optional[str]:
         if first_image := self._soup.find('img', {'class': ['mw-file-element']}):
             if image_url_src := first_image['src']:
-                return utils.normalize_image_url(image_url=image_url_src)
+                return utils.plan_image_url(image_url=image_url_src, width=self._image_width,
+                                            srcset=first_image.get('srcset'),
+                                            file_width=first_image.get('data-file-width'))
+
+
+class _ImageScanner(html.parser.HTMLParser):
+    # Tracks the same elements AnimalPageExtractor looks for (the first <img> in the first tbody of the first
+    # infobox / biota table, and the first mw-file-element <img> of the page) without building a tree
+
+    def __init__(self, may_have_main_table: bool):
+        super().__init__(convert_charrefs=True)
+        self._main_table_state = 'pending' if may_have_main_table else 'closed'
+        self._main_table_depth = 0
+        self._main_tbody_state = 'pending'
+        self._main_tbody_depth = 0
+        self._main_table_image_attributes: t.Optional[t.Dict[str, t.Optional[str]]] = None
+        self._page_image_attributes: t.Optional[t.Dict[str, t.Optional[str]]] = None
+
+    def is_done(self) -> bool:
+        return self._main_table_image_attributes is not None or (
+                self._main_table_state == 'closed' and self._page_image_attributes is not None)
+
+    def get_main_table_image_attributes(self) -> t.Optional[t.Dict[str, t.Optional[str]]]:
+        return self._main_table_image_attributes
+
+    def get_page_image_attributes(self) -> t.Optional[t.Dict[str, t.Optional[str]]]:
+        return self._page_image_attributes
+
+    def handle_starttag(self, tag: str, attrs: t.List[t.Tuple[str, t.Optional[str]]]) -> None:
+        if self.is_done():
+            return
+        if tag == 'table':
+            self._handle_table_start(attrs=attrs)
+        elif tag == 'tbody' and self._main_table_state == 'open':
+            self._handle_tbody_start()
+        elif tag == 'img':
+            self._handle_img(attrs=attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._main_table_state != 'open':
+            return
+        if tag == 'tbody' and self._main_tbody_state == 'open':
+            self._main_tbody_depth -= 1
+            if not self._main_tbody_depth:
+                self._main_tbody_state = 'closed'
+        elif tag == 'table':
+            self._main_table_depth -= 1
+            if not self._main_table_depth:
+                self._main_table_state = 'closed'
+
+    def _handle_table_start(self, attrs: t.List[t.Tuple[str, t.Optional[str]]]) -> None:
+        if self._main_table_state == 'open':
+            self._main_table_depth += 1
+        elif self._main_table_state == 'pending' and MAIN_TABLE_CLASSES.intersection(self._resolve_classes(attrs)):
+            self._main_table_state = 'open'
+            self._main_table_depth = 1
+
+    def _handle_tbody_start(self) -> None:
+        if self._main_tbody_state == 'pending':
+            self._main_tbody_state = 'open'
+            self._main_tbody_depth = 1
+        elif self._main_tbody_state == 'open':
+            self._main_tbody_depth += 1
+
+    def _handle_img(self, attrs: t.List[t.Tuple[str, t.Optional[str]]]) -> None:
+        if self._main_table_state == 'open' and self._main_tbody_state == 'open':
+            self._main_table_image_attributes = dict(attrs)
+        if self._page_image_attributes is None and PAGE_IMAGE_CLASS in self._resolve_classes(attrs):
+            self._page_image_attributes = dict(attrs)
+
+    @staticmethod
+    def _resolve_classes(attrs: t.List[t.Tuple[str, t.Optional[str]]]) -> t.List[str]:
+        for attribute_name, attribute_value in attrs:
+            if attribute_name == 'class' and attribute_value:
+                return attribute_value.split()
+        return list()
+
+
+class StreamingAnimalPageExtractor:
+
+    def __init__(self, webpage: str, image_width: int = None, chunk_size: int = STREAMING_CHUNK_SIZE):
+        self._webpage = webpage
+        self._image_width = image_width
+        self._chunk_size = chunk_size
+
+    def extract_image_url(self) -> t.Optional[str]:
+        with metrics.timer(stage=PAGE_EXTRACT_STAGE):
+            return self._extract_image_url()
+
+    def _extract_image_url(self) -> t.Optional[str]:
+        # A page without the infobox / biota class names can not have a main table, so the scan may stop at the
+        # first page image
+        may_have_main_table = any(class_name in self._webpage for class_name in MAIN_TABLE_CLASSES)
+        scanner = _ImageScanner(may_have_main_table=may_have_main_table)
+        for offset in range(0, len(self._webpage), self._chunk_size):
+            scanner.feed(self._webpage[offset:offset + self._chunk_size])
+            if scanner.is_done():
+                break
+        if image_url := self._resolve_image_url(image_attributes=scanner.get_main_table_image_attributes()):
+            return image_url
+        logging.debug('Can not find image item in main table')
+        return self._resolve_image_url(image_attributes=scanner.get_page_image_attributes())
+
+    def _resolve_image_url(self, image_attributes: t.Optional[t.Dict[str, t.Optional[str]]]) -> t.Optional[str]:
+        if image_attributes and (image_url_src := image_attributes.get('src')):
+            return utils.plan_image_url(image_url=image_url_src, width=self._image_width,
+                                        srcset=image_attributes.get('srcset'),
+                                        file_width=image_attributes.get('data-file-width'))
 
 
-def create_animal_page_extractor(webpage: str):
-    return AnimalPageExtractor(webpage=webpage)
+def create_animal_page_extractor(webpage: str, streaming: bool = False, image_width: int = None):
+    if streaming:
+        return StreamingAnimalPageExtractor(webpage=webpage, image_width=image_width)
+    return AnimalPageExtractor(webpage=webpage, image_width=image_width)
@@ -4,6 +4,7 @@
 # Date:    September 2024
 # Summary:
 import abc
+import typing as t
 import core.common as co
 
 
@@ -15,3 +16,6 @@ class AnimalsExtractor(abc.ABC):
     @abc.abstractmethod
     def extract_animals(self, extended: bool = False) -> co.AnimalsExtractorOutput:
         raise NotImplementedError
+
+    def iter_animals(self, extended: bool = False) -> t.Iterator[co.Animal]:
+        yield from self.extract_animals(extended=extended).get_list_of_animals()
@@ -5,45 +5,121 @@
 # Summary:
 import re
 import bs4
+import time
 import logging
 import typing as t
 import core.common as co
 import core.utils as utils
+import core.metrics as metrics
 import extractors.animals_extractor_base as aeb
+import extractors.table_layout_cache as tlc
+
+WIKI_TABLE_PARSE_STAGE = 'wiki_table_parse'
+WIKI_TABLE_EXTRACT_STAGE = 'wiki_table_extract'
+ANIMALS_TABLE_CLASSES = ['wikitable', 'sortable', 'sticky-header', 'jquery-tablesorter']
+NAME_HEADER = 'Animal'
+COLLATERAL_ADJECTIVES_HEADER = 'Collateral adjective'
 
 
 class WikiAnimalsExtractor(aeb.AnimalsExtractor):
 
-    def __init__(self, webpage: str):
+    def __init__(self, webpage: str, parser: str = None, layout_cache: tlc.TableLayoutCache = None):
         super().__init__(webpage=webpage)
-        table_body = self._resolve_table()
-        self._name_index = self._resolve_name_index(table_body=table_body)
-        self._collateral_adjectives_index = self._resolve_collateral_adjectives_index(table_body=table_body)
-        self._animal_items = self._resolve_animal_items(table_body=table_body)
+        self._parser = utils.resolve_html_parser(parser=parser)
+        self._layout_cache = layout_cache
+        with metrics.timer(stage=WIKI_TABLE_PARSE_STAGE):
+            if not (table_body := self._resolve_table_from_layout_cache()):
+                table_body = self._resolve_table()
+                self._name_index = self._resolve_name_index(table_body=table_body)
+                self._collateral_adjectives_index = self._resolve_collateral_adjectives_index(table_body=table_body)
+            self._animal_items = self._resolve_animal_items(table_body=table_body)
+
+    def extract_animals(self, extended: bool = False, columnar: bool = False) \
+            -> t.Union[co.AnimalsExtractorOutput, co.ColumnarAnimalsExtractorOutput]:
+        with metrics.timer(stage=WIKI_TABLE_EXTRACT_STAGE):
+            return self._extract_animals(extended=extended, columnar=columnar)
 
-    def extract_animals(self, extended: bool = False) -> co.AnimalsExtractorOutput:
+    def _extract_animals(self, extended: bool, columnar: bool) \
+            -> t.Union[co.AnimalsExtractorOutput, co.ColumnarAnimalsExtractorOutput]:
         animal_name_to_data = dict()
         animal_to_similar_name = dict()
-        for index, animal_item in enumerate(self._animal_items):
-            name = self._resolve_name(animal_item=animal_item)
-            if name == 'Procyonidae':
-                print('f')
-            self._resolve_similar_animal(name=name, animal_item=animal_item,
-                                         animal_to_similar_name=animal_to_similar_name)
-            collateral_adjectives_list = self._resolve_collateral_adjectives_list(animal_item=animal_item)
-            page_url = None
-            if extended:
-                page_url = self._resolve_page_url(animal_item=animal_item)
-            animal_name_to_data[name.lower()] = co.Animal(name=name,
-                                                          collateral_adjectives_list=collateral_adjectives_list,
-                                                          page_url=page_url)
+        for animal_item in self._animal_items:
+            animal = self._resolve_animal(animal_item=animal_item, extended=extended,
+                                          animal_to_similar_name=animal_to_similar_name)
+            animal_name_to_data[animal.get_name().lower()] = animal
         self._update_missing_fields(animal_name_to_data=animal_name_to_data,
                                     animal_to_similar_name=animal_to_similar_name)
+        if columnar:
+            # The rows are merged by lowercase name into the compact output, with the adjectives interned once
+            return co.ColumnarAnimalsExtractorOutput(list_of_animals=animal_name_to_data.values())
         return co.AnimalsExtractorOutput(list_of_animals=list(animal_name_to_data.values()))
 
-    def _resolve_name(self, animal_item: bs4.Tag) -> str:
-        name_item_attribute = self._resolve_attribute_item(animal_item=animal_item, attribute_index=self._name_index,
-                                                           attribute_name='Name')
+    def iter_animals(self, extended: bool = False) -> t.Iterator[co.Animal]:
+        # The consumer runs between the animals, so only the time spent resolving them is recorded, once the
+        # iteration ends (or is abandoned)
+        animals = self._iter_animals(extended=extended)
+        extract_seconds = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    animal = next(animals)
+                except StopIteration:
+                    return
+                except Exception:
+                    metrics.increment(stage=WIKI_TABLE_EXTRACT_STAGE, counter=metrics.COUNTER_ERRORS)
+                    raise
+                finally:
+                    extract_seconds += time.perf_counter() - start
+                yield animal
+        finally:
+            metrics.observe(stage=WIKI_TABLE_EXTRACT_STAGE, seconds=extract_seconds)
+
+    def _iter_animals(self, extended: bool) -> t.Iterator[co.Animal]:
+        # Animals are yielded as their rows are parsed. An animal that refers to another one ("see X") and has no
+        # collateral adjectives of its own is held back until X is seen, patched from X and only then yielded.
+        # Unlike extract_animals, a name that appears in several rows is yielded once per row.
+        animal_name_to_data = dict()
+        animal_to_similar_name = dict()
+        similar_name_to_pending_animals = dict()
+        for animal_item in self._animal_items:
+            animal = self._resolve_animal(animal_item=animal_item, extended=extended,
+                                          animal_to_similar_name=animal_to_similar_name)
+            name = animal.get_name()
+            animal_name_to_data[name.lower()] = animal
+            similar_name = animal_to_similar_name.get(name)
+            if not similar_name or animal.get_collateral_adjectives_list():
+                yield animal
+            elif similar_animal_data := animal_name_to_data.get(similar_name.lower()):
+                animal.set_collateral_adjectives_list(similar_animal_data.get_collateral_adjectives_list())
+                yield animal
+            else:
+                similar_name_to_pending_animals.setdefault(similar_name.lower(), list()).append(animal)
+            for pending_animal in similar_name_to_pending_animals.pop(name.lower(), list()):
+                pending_animal.set_collateral_adjectives_list(animal.get_collateral_adjectives_list())
+                yield pending_animal
+        for pending_animals in similar_name_to_pending_animals.values():
+            yield from pending_animals
+
+    def _resolve_animal(self, animal_item: bs4.Tag, extended: bool,
+                        animal_to_similar_name: t.Dict[str, str]) -> co.Animal:
+        # The row cells are split once and shared by all the attribute resolvers
+        animal_attributes = self._resolve_animal_attributes(animal_item=animal_item)
+        name_item_attribute = self._resolve_attribute_item(animal_item=animal_item,
+                                                           animal_attributes=animal_attributes,
+                                                           attribute_index=self._name_index, attribute_name='Name')
+        name = self._resolve_name(animal_item=animal_item, name_item_attribute=name_item_attribute)
+        self._resolve_similar_animal(name=name, name_item_attribute=name_item_attribute,
+                                     animal_to_similar_name=animal_to_similar_name)
+        collateral_adjectives_list = self._resolve_collateral_adjectives_list(animal_item=animal_item,
+                                                                              animal_attributes=animal_attributes)
+        page_url = None
+        if extended:
+            page_url = self._resolve_page_url(animal_item=animal_item, name_item_attribute=name_item_attribute)
+        return co.Animal(name=name, collateral_adjectives_list=collateral_adjectives_list, page_url=page_url)
+
+    @staticmethod
+    def _resolve_name(animal_item: bs4.Tag, name_item_attribute: bs4.Tag) -> str:
         if not name_item_attribute or not (name_item := name_item_attribute.find('a')):
             raise co.AnimalExtractorException(f'Can not resolve name, Name attribute: {name_item_attribute}')
         relevant_names = list()
@@ -55,19 +131,20 @@ class WikiAnimalsExtractor(aeb.AnimalsExtractor):
                 f'Unexpected number of names found ({relevant_names}) for animal: {animal_item}')
         return relevant_names[0]
 
-    def _resolve_similar_animal(self, name: str, animal_item: bs4.Tag,
+    @staticmethod
+    def _resolve_similar_animal(name: str, name_item_attribute: bs4.Tag,
                                 animal_to_similar_name: t.Dict[str, str]) -> None:
-        name_item_attribute = self._resolve_attribute_item(animal_item=animal_item, attribute_index=self._name_index,
-                                                           attribute_name='Name')
         name_item_attribute_text = name_item_attribute.text
         match = re.search(r'see\s+([A-Za-z]+)', name_item_attribute_text, re.IGNORECASE)
         if match:
             similar_name = match.group(1)
             animal_to_similar_name[name] = similar_name
 
-    def _resolve_collateral_adjectives_list(self, animal_item: bs4.Tag) -> t.Optional[t.List[str]]:
+    def _resolve_collateral_adjectives_list(self, animal_item: bs4.Tag,
+                                            animal_attributes: t.List[bs4.Tag]) -> t.Optional[t.List[str]]:
         try:
             collateral_adjectives_items = self._resolve_attribute_item(animal_item=animal_item,
+                                                                       animal_attributes=animal_attributes,
                                                                        attribute_index=self._collateral_adjectives_index,
                                                                        attribute_name='collateral_adjectives')
             relevant_collateral_adjectives_items = list()
@@ -78,12 +155,10 @@ class WikiAnimalsExtractor(aeb.AnimalsExtractor):
         except co.AnimalExtractorException as _e:
             logging.exception('Failed to fetch collateral_adjectives')
 
-    def _resolve_page_url(self, animal_item: bs4.Tag) -> str:
+    @staticmethod
+    def _resolve_page_url(animal_item: bs4.Tag, name_item_attribute: bs4.Tag) -> str:
         try:
-            name_attribute_item = self._resolve_attribute_item(animal_item=animal_item,
-                                                               attribute_index=self._name_index,
-                                                               attribute_name='Name')
-            if not (animal_a := name_attribute_item.find('a')):
+            if not (animal_a := name_item_attribute.find('a')):
                 raise co.AnimalExtractorException(
                     f'Can not resolve animal image URL, no page URL found in: {animal_item.text}')
             if not (animal_url := animal_a['href']):
@@ -93,10 +168,34 @@ class WikiAnimalsExtractor(aeb.AnimalsExtractor):
         except co.AnimalExtractorException as _e:
             logging.exception('Failed to fetch page URL')
 
+    def _resolve_table_from_layout_cache(self) -> t.Optional[bs4.Tag]:
+        # A page with a known layout is parsed from the animals table only, with the cached column indexes. The
+        # headers are compared to the cached ones, any drift falls back to resolving the table from the whole page.
+        if not self._layout_cache:
+            return
+        table_tags = tlc.scan_table_tags(webpage=self._webpage)
+        if not (layout := self._layout_cache.get_layout(layout_key=tlc.compute_layout_key(table_tags=table_tags))):
+            return
+        if layout.get_table_ordinal() >= len(table_tags) or \
+                table_tags[layout.get_table_ordinal()][1] != layout.get_table_tag() or \
+                not (table_span := tlc.resolve_table_span(webpage=self._webpage,
+                                                          table_offset=table_tags[layout.get_table_ordinal()][0])):
+            return
+        soup = bs4.BeautifulSoup(self._webpage[table_span[0]:table_span[1]], self._parser)
+        if not (table := soup.find('table')) or not (t_body := table.find('tbody')):
+            return
+        if self._resolve_headers(table_body=t_body) != layout.get_headers():
+            logging.debug('The animals table headers changed, resolving the table from the whole page')
+            return
+        self._name_index = layout.get_header_index(header=NAME_HEADER)
+        self._collateral_adjectives_index = layout.get_header_index(header=COLLATERAL_ADJECTIVES_HEADER)
+        return t_body
+
     def _resolve_table(self):
-        soup = bs4.BeautifulSoup(self._webpage, "html.parser")
+        # Only the tables are kept in the tree, the rest of the page is never materialized
+        soup = bs4.BeautifulSoup(self._webpage, self._parser, parse_only=bs4.SoupStrainer('table'))
         element_name = 'table'
-        element_attributes = {'class': ['wikitable', 'sortable', 'sticky-header', 'jquery-tablesorter']}
+        element_attributes = {'class': ANIMALS_TABLE_CLASSES}
         relevant_elements = soup.find_all(element_name, element_attributes)
         if len(relevant_elements) <= 1:
             raise co.AnimalExtractorException('Unexpected number of table elements while extracting the animals table,'
@@ -104,17 +203,33 @@ class WikiAnimalsExtractor(aeb.AnimalsExtractor):
         relevant_animal_table = relevant_elements[1]
         if not (t_body := relevant_animal_table.find('tbody')):
             raise co.AnimalExtractorException('Can not find animal table body in element')
+        if self._layout_cache:
+            self._save_layout(table_ordinal=soup.find_all('table').index(relevant_animal_table), table_body=t_body)
         return t_body
 
+    def _save_layout(self, table_ordinal: int, table_body: bs4.Tag) -> None:
+        headers = self._resolve_headers(table_body=table_body)
+        if NAME_HEADER not in headers or COLLATERAL_ADJECTIVES_HEADER not in headers:
+            return
+        table_tags = tlc.scan_table_tags(webpage=self._webpage)
+        if table_ordinal >= len(table_tags):
+            return
+        layout = tlc.TableLayout(table_ordinal=table_ordinal, table_tag=table_tags[table_ordinal][1], headers=headers)
+        self._layout_cache.save_layout(layout_key=tlc.compute_layout_key(table_tags=table_tags), layout=layout)
+
     def _resolve_name_index(self, table_body: bs4.Tag) -> t.Optional[int]:
-        return self._resolve_header_index(table_body=table_body, header_name='Animal')
+        return self._resolve_header_index(table_body=table_body, header_name=NAME_HEADER)
 
     def _resolve_collateral_adjectives_index(self, table_body: bs4.Tag) -> t.Optional[int]:
-        return self._resolve_header_index(table_body=table_body, header_name='Collateral adjective')
+        return self._resolve_header_index(table_body=table_body, header_name=COLLATERAL_ADJECTIVES_HEADER)
+
+    @staticmethod
+    def _resolve_headers(table_body: bs4.Tag) -> t.List[str]:
+        return [r.text for r in table_body.find_all('th')]
 
     @staticmethod
     def _resolve_header_index(table_body: bs4.Tag, header_name: str) -> t.Optional[int]:
-        table_headers = [r.text for r in table_body.find_all('th')]
+        table_headers = WikiAnimalsExtractor._resolve_headers(table_body=table_body)
         try:
             return table_headers.index(header_name)
         except Exception as _e:
@@ -125,8 +240,12 @@ class WikiAnimalsExtractor(aeb.AnimalsExtractor):
         return [r for r in table_body.find_all('tr') if r.find('td')]
 
     @staticmethod
-    def _resolve_attribute_item(animal_item: bs4.Tag, attribute_index: int, attribute_name: str) -> bs4.Tag:
-        animal_attributes = animal_item.find_all('td')
+    def _resolve_animal_attributes(animal_item: bs4.Tag) -> t.List[bs4.Tag]:
+        return animal_item.find_all('td')
+
+    @staticmethod
+    def _resolve_attribute_item(animal_item: bs4.Tag, animal_attributes: t.List[bs4.Tag], attribute_index: int,
+                                attribute_name: str) -> bs4.Tag:
         if not animal_attributes or len(animal_attributes) <= attribute_index:
             raise co.AnimalExtractorException(
                 f'Can not find animal {attribute_name} for animal item: {animal_item.get_text()}')
@@ -142,5 +261,5 @@ class WikiAnimalsExtractor(aeb.AnimalsExtractor):
                     animal_data.set_collateral_adjectives_list(similar_animal_data.get_collateral_adjectives_list())
 
 
-def create_wiki_animal_extractor(webpage: str):
-    return WikiAnimalsExtractor(webpage=webpage)
+def create_wiki_animal_extractor(webpage: str, parser: str = None, layout_cache: tlc.TableLayoutCache = None):
+    return WikiAnimalsExtractor(webpage=webpage, parser=parser, layout_cache=layout_cache)
@@ -0,0 +1,123 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import mmap
+import logging
+import threading
+import typing as t
+import concurrent.futures
+import concurrent.futures.process
+import core.metrics as metrics
+import core.process_pool as pp
+import extractors.animal_page_extractor as ape
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Without shared memory the pages that are not cached on disk are parsed in process
+    shared_memory = None
+
+PAGE_PARSE_POOL_STAGE = 'page_parse_pool'
+DEFAULT_PAGE_ENCODING = 'utf-8'
+
+
+def _extract_image_url(webpage: str, image_width: t.Optional[int], streaming: bool) -> t.Optional[str]:
+    return ape.create_animal_page_extractor(webpage=webpage, streaming=streaming,
+                                            image_width=image_width).extract_image_url()
+
+
+def _extract_image_url_from_file(file_path: str, encoding: str, image_width: t.Optional[int],
+                                 streaming: bool) -> t.Optional[str]:
+    # Runs in a worker process, the page is read from the memory mapped file instead of being pickled to the worker
+    with open(file_path, 'rb') as file:
+        try:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as page_map:
+                webpage = str(page_map, encoding, errors='replace')
+        except ValueError:  # An empty file can not be mapped
+            webpage = ''
+    return _extract_image_url(webpage=webpage, image_width=image_width, streaming=streaming)
+
+
+def _extract_image_url_from_shared_memory(shared_memory_name: str, size: int, encoding: str,
+                                          image_width: t.Optional[int], streaming: bool) -> t.Optional[str]:
+    # Runs in a worker process, the segment is owned (and unlinked) by the submitting process
+    page_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        with page_memory.buf[:size] as page_view:
+            webpage = str(page_view, encoding, errors='replace')
+    finally:
+        page_memory.close()
+    return _extract_image_url(webpage=webpage, image_width=image_width, streaming=streaming)
+
+
+class PageParsePool:
+    # Parses the animal pages in worker processes, so the CPU bound parsing is not serialized on the GIL of the
+    # pipeline threads. Only the page location crosses the process boundary: the cached body file when there is one,
+    # otherwise a shared memory copy of the page, and only the image URL comes back. With workers=0, or when the
+    # process pool can not be used, the pages are parsed in process.
+
+    def __init__(self, workers: t.Optional[int] = None, image_width: int = None, streaming: bool = True):
+        if workers is not None and workers < 0:
+            raise ValueError(f'Number of parse workers can not be negative, got: {workers}')
+        self._workers = workers
+        self._image_width = image_width
+        self._streaming = streaming
+        self._executor: t.Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._in_process = workers == 0
+        self._lock = threading.Lock()
+
+    def is_in_process(self) -> bool:
+        return self._in_process
+
+    def extract_image_url(self, content: bytes, encoding: t.Optional[str] = None,
+                          body_path: t.Optional[str] = None) -> t.Optional[str]:
+        encoding = encoding if encoding else DEFAULT_PAGE_ENCODING
+        with metrics.timer(stage=PAGE_PARSE_POOL_STAGE):
+            if not self._in_process and (executor := self._resolve_executor()):
+                try:
+                    if body_path:
+                        return executor.submit(_extract_image_url_from_file, body_path, encoding, self._image_width,
+                                               self._streaming).result()
+                    if shared_memory is not None and content:
+                        return self._extract_image_url_with_shared_memory(executor=executor, content=content,
+                                                                          encoding=encoding)
+                except concurrent.futures.process.BrokenProcessPool as e:
+                    logging.warning(f'The page parse pool is broken, parsing the pages in process, error: {e}')
+                    self._in_process = True
+                except OSError as e:
+                    # e.g. the cached body was evicted meanwhile, or no shared memory is available
+                    logging.debug(f'Failed to parse the page in a worker process, parsing it in process, error: {e}')
+            return _extract_image_url(webpage=str(content, encoding, errors='replace'),
+                                      image_width=self._image_width, streaming=self._streaming)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _extract_image_url_with_shared_memory(self, executor: concurrent.futures.ProcessPoolExecutor,
+                                              content: bytes, encoding: str) -> t.Optional[str]:
+        page_memory = shared_memory.SharedMemory(create=True, size=len(content))
+        try:
+            page_memory.buf[:len(content)] = content
+            return executor.submit(_extract_image_url_from_shared_memory, page_memory.name, len(content), encoding,
+                                   self._image_width, self._streaming).result()
+        finally:
+            page_memory.close()
+            page_memory.unlink()
+
+    def _resolve_executor(self) -> t.Optional[concurrent.futures.ProcessPoolExecutor]:
+        with self._lock:
+            if self._executor is None and not self._in_process:
+                try:
+                    self._executor = pp.create_process_pool(max_workers=self._workers)
+                except (OSError, NotImplementedError, ValueError) as e:
+                    logging.warning(f'Can not start the page parse pool, parsing the pages in process, error: {e}')
+                    self._in_process = True
+            return self._executor
+
+
+def create_page_parse_pool(workers: t.Optional[int] = None, image_width: int = None, streaming: bool = True):
+    return PageParsePool(workers=workers, image_width=image_width, streaming=streaming)
@@ -0,0 +1,109 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import re
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+import typing as t
+
+TABLE_TAG_PATTERN = re.compile(r'<table\b[^>]*>', re.IGNORECASE)
+TABLE_BOUNDARY_PATTERN = re.compile(r'<(/?)table\b[^>]*>', re.IGNORECASE)
+
+
+class TableLayout:
+    # Where the table is in pages of the same structure, and the columns it had when it was fully resolved
+
+    def __init__(self, table_ordinal: int, table_tag: str, headers: t.List[str]):
+        self._table_ordinal = table_ordinal
+        self._table_tag = table_tag
+        self._headers = headers
+        self._header_to_index = dict()
+        for index, header in enumerate(headers):
+            self._header_to_index.setdefault(header, index)
+
+    def get_table_ordinal(self) -> int:
+        return self._table_ordinal
+
+    def get_table_tag(self) -> str:
+        return self._table_tag
+
+    def get_headers(self) -> t.List[str]:
+        return self._headers
+
+    def get_header_index(self, header: str) -> t.Optional[int]:
+        return self._header_to_index.get(header)
+
+    def to_dict(self) -> dict:
+        return {'table_ordinal': self._table_ordinal, 'table_tag': self._table_tag, 'headers': self._headers}
+
+    @staticmethod
+    def from_dict(layout_dict: dict) -> 'TableLayout':
+        return TableLayout(table_ordinal=layout_dict['table_ordinal'], table_tag=layout_dict['table_tag'],
+                           headers=layout_dict['headers'])
+
+
+class TableLayoutCache:
+    # Table layouts keyed by the structure hash of their page. Kept in memory, and in a JSON file when a path is
+    # given, so reruns of the same page layout skip the table resolution as well.
+
+    def __init__(self, path: t.Optional[str] = None):
+        self._path = path
+        self._layout_key_to_layout: t.Dict[str, TableLayout] = self._load()
+        self._lock = threading.Lock()
+
+    def get_layout(self, layout_key: str) -> t.Optional[TableLayout]:
+        return self._layout_key_to_layout.get(layout_key)
+
+    def save_layout(self, layout_key: str, layout: TableLayout) -> None:
+        with self._lock:
+            self._layout_key_to_layout[layout_key] = layout
+            if self._path:
+                self._write()
+
+    def _load(self) -> t.Dict[str, TableLayout]:
+        if not self._path or not os.path.exists(self._path):
+            return dict()
+        try:
+            with open(self._path, 'r', encoding='utf-8') as file:
+                return {layout_key: TableLayout.from_dict(layout_dict=layout_dict)
+                        for layout_key, layout_dict in json.load(file).items()}
+        except (ValueError, KeyError, TypeError) as e:
+            logging.debug(f'Ignoring corrupt table layout cache {self._path}, error: {e}')
+            return dict()
+
+    def _write(self) -> None:
+        file_descriptor, tmp_file_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self._path)),
+                                                          suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w', encoding='utf-8') as file:
+            json.dump({layout_key: layout.to_dict() for layout_key, layout in self._layout_key_to_layout.items()},
+                      file, indent=4)
+        os.replace(tmp_file_path, self._path)
+
+
+def scan_table_tags(webpage: str) -> t.List[t.Tuple[int, str]]:
+    # (offset, opening tag) of every table of the page, in document order, without parsing the page
+    return [(match.start(), match.group(0)) for match in TABLE_TAG_PATTERN.finditer(webpage)]
+
+
+def compute_layout_key(table_tags: t.List[t.Tuple[int, str]]) -> str:
+    # Pages whose tables have the same opening tags in the same order share a layout, whatever their rows are
+    return hashlib.sha1('\n'.join(table_tag for _, table_tag in table_tags).encode('utf-8')).hexdigest()
+
+
+def resolve_table_span(webpage: str, table_offset: int) -> t.Optional[t.Tuple[int, int]]:
+    # The span of the table starting at table_offset, nested tables included
+    depth = 0
+    for match in TABLE_BOUNDARY_PATTERN.finditer(webpage, table_offset):
+        depth += -1 if match.group(1) else 1
+        if not depth:
+            return table_offset, match.end()
+
+
+def create_table_layout_cache(path: t.Optional[str] = None):
+    return TableLayoutCache(path=path)
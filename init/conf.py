@@ -3,3 +3,54 @@
 # Author:  Ohad ELiyahou
 # Date:    September 2024
 # Summary:
+import os
+
+MAIN_PAGE_URL = 'https://en.wikipedia.org/wiki/List_of_animal_names'
+
+DEFAULT_HEADERS = {'User-Agent': 'CoolBot/0.0 (https://example.org/coolbot/; coolbot@example.org)'}
+
+# Number of animals processed concurrently (page fetch -> page parse -> image download)
+DEFAULT_WORKERS = 16
+
+# Max number of in-flight requests against a single host (en.wikipedia.org, upload.wikimedia.org, ...)
+DEFAULT_PER_HOST_LIMIT = 4
+
+# Processes parsing the animal pages, None for one per core
+DEFAULT_PARSE_WORKERS = None
+
+# Timeout (seconds) for a single HTTP request
+DEFAULT_TIMEOUT = 30
+
+# Number of retries for a request that failed with a connection error or a throttling / server error status code
+DEFAULT_MAX_RETRIES = 5
+
+# Exponential backoff between retries is backoff_factor * 2 ^ attempt seconds, capped by max backoff
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_MAX_BACKOFF = 60
+
+# Global requests per second budget shared by all the workers (None for unlimited)
+DEFAULT_REQUESTS_PER_SECOND = 20
+
+# On disk HTTP cache for pages and images, revalidated with conditional requests (ETag / Last-Modified)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'adaptive', 'http')
+DEFAULT_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# Downloaded images are deduplicated by content into the images directory and resized to the width they are shown at
+DEFAULT_IMAGES_DIR = 'images'
+DEFAULT_THUMBNAIL_WIDTH = 200
+
+# Max number of titles per MediaWiki API query (the limit for non bot clients)
+DEFAULT_API_BATCH_SIZE = 50
+
+# State of every animal from the previous runs, used by the incremental run mode
+DEFAULT_STATE_PATH = 'animal_state.sqlite'
+
+# Completed animals of the current run, appended as they finish so a killed run can be resumed
+DEFAULT_CHECKPOINT_PATH = 'animal_checkpoint.jsonl'
+# Animals that failed in the last run and still need attention
+DEFAULT_FAILURE_REPORT_PATH = 'failed_animals.json'
+# Position and columns of the animals table, reused while the page layout is unchanged
+DEFAULT_LAYOUT_CACHE_PATH = 'animal_table_layout.json'
+
+# Animals handed over between the extract, download and export commands
+DEFAULT_ANIMALS_PATH = 'animals.jsonl'
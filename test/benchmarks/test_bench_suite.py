@@ -0,0 +1,47 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+from unittest import TestCase
+import benchmarks.bench_suite as bs
+import extractors.animals_wiki_extractor as awe
+
+
+class TestBenchSuite(TestCase):
+
+    """
+    GIVEN   The animals page
+    WHEN    scaling its animals table 3 times
+    THEN    the extractor finds 3 times as many distinct animals
+    """
+    def test_scale_animals_page(self):
+        with open(bs.ANIMALS_PAGE_PATH, 'r') as file:
+            animals_page = file.read()
+        animals = awe.create_wiki_animal_extractor(webpage=animals_page).extract_animals().get_list_of_animals()
+        scaled_animals = awe.create_wiki_animal_extractor(
+            webpage=bs.scale_animals_page(webpage=animals_page, scale=3)).extract_animals().get_list_of_animals()
+        self.assertEqual(3 * len(animals), len(scaled_animals))
+        self.assertIn('Aardvark 2', {animal.get_name() for animal in scaled_animals})
+
+    """
+    GIVEN   Benchmark results, a baseline and thresholds with a per case override
+    WHEN    checking for regressions
+    THEN    only the cases beyond their absolute or baseline relative limits are reported
+    """
+    def test_check_regressions(self):
+        thresholds = {'default': {'max_time_ratio': 1.2, 'max_memory_ratio': 1.1},
+                      'cases': {'http_fetcher': {'max_time_ratio': 2}, 'html_exporter@10': {'max_seconds': 0.5}}}
+        baseline = {'html_exporter@1': self._result(name='html_exporter', seconds=1, memory=100),
+                    'http_fetcher@100': self._result(name='http_fetcher', seconds=1, memory=100)}
+        results = {'html_exporter@1': self._result(name='html_exporter', seconds=1.1, memory=120),
+                   'html_exporter@10': self._result(name='html_exporter', seconds=0.6, memory=100),
+                   'http_fetcher@100': self._result(name='http_fetcher', seconds=1.9, memory=100)}
+        regressions = bs.check_regressions(results=results, thresholds=thresholds, baseline=baseline)
+        self.assertEqual(2, len(regressions))
+        self.assertTrue(regressions[0].startswith('html_exporter@1: peak memory'))
+        self.assertTrue(regressions[1].startswith('html_exporter@10: 0.600s exceeds'))
+
+    @staticmethod
+    def _result(name: str, seconds: float, memory: int) -> dict:
+        return {'name': name, 'best_seconds': seconds, 'peak_memory_bytes': memory}
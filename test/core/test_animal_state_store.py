@@ -0,0 +1,54 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import tempfile
+from unittest import TestCase
+import core.common as co
+import core.animal_state_store as ass
+
+
+class TestAnimalStateStore(TestCase):
+
+    def setUp(self):
+        self._work_dir = tempfile.TemporaryDirectory()
+        self._image_path = os.path.join(self._work_dir.name, 'bee.jpg')
+        with open(self._image_path, 'wb') as file:
+            file.write(b'bee image')
+        self._state_store = ass.create_animal_state_store(path=os.path.join(self._work_dir.name, 'state.sqlite'))
+        self._bee = co.Animal(name='Bee', collateral_adjectives_list=['apian', 'apiarian', 'apic'],
+                              page_url='https://en.wikipedia.org/wiki/Bee')
+        self._state_store.save_states(states=[
+            ass.AnimalState(name='Bee', row_hash=ass.compute_row_hash(animal=self._bee),
+                            page_url=self._bee.get_page_url(), page_revision=100,
+                            image_url='https://upload.wikimedia.org/bee.jpg', image_hash='hash',
+                            image_path=self._image_path)])
+
+    def tearDown(self):
+        self._state_store.close()
+        self._work_dir.cleanup()
+
+    """
+    GIVEN   A state store with the Bee state of a previous run
+    WHEN    checking the Bee animal with the same table row and page revision
+    THEN    the animal is unchanged
+    """
+    def test_unchanged_animal(self):
+        self.assertTrue(self._state_store.is_unchanged(animal=self._bee, page_revision=100))
+        self.assertEqual(self._image_path, self._state_store.get_state(name='bee').get_image_path())
+
+    """
+    GIVEN   A state store with the Bee state of a previous run
+    WHEN    checking the Bee animal after its table row, its page or its image file changed
+    THEN    the animal is changed
+    """
+    def test_changed_animal(self):
+        self.assertFalse(self._state_store.is_unchanged(animal=self._bee, page_revision=101))
+        self.assertFalse(self._state_store.is_unchanged(animal=self._bee, page_revision=None))
+        changed_bee = co.Animal(name='Bee', collateral_adjectives_list=['apian'], page_url=self._bee.get_page_url())
+        self.assertFalse(self._state_store.is_unchanged(animal=changed_bee, page_revision=100))
+        self.assertFalse(self._state_store.is_unchanged(animal=co.Animal(name='Weasel'), page_revision=100))
+        os.remove(self._image_path)
+        self.assertFalse(self._state_store.is_unchanged(animal=self._bee, page_revision=100))
@@ -0,0 +1,261 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import sys
+import json
+import tempfile
+import threading
+import http.server
+import subprocess
+import urllib.parse
+from unittest import TestCase
+import requests
+import core.common as co
+import core.http_cache as hc
+import init.conf as conf
+import core.request_coalescer as rc
+import core.animals_extractor_tool as aet
+import exporters.exporter_registry as er
+import exporters.animal_exporter_jsonl as aej
+import downloaders.animal_image_processor as aip
+
+# Generous for slow machines, the tool itself imports in well under 0.1 seconds
+IMPORT_TIME_BUDGET_SECONDS = 0.3
+HEAVY_MODULES = ['requests', 'bs4', 'aiohttp', 'PIL', 'pyarrow', 'lxml']
+IMPORT_TIME_SCRIPT = '''
+import sys
+import json
+import time
+start = time.perf_counter()
+import core.animals_extractor_tool
+print(json.dumps({'import_time': time.perf_counter() - start,
+                  'imported_modules': [module_name for module_name in sys.argv[1:] if module_name in sys.modules]}))
+'''
+
+ANIMALS_PAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'extractors', 'mocks',
+                                 'animals_page.txt')
+REDLINK_URL = 'https://en.wikipedia.org/w/index.php?title=Unicornfish&action=edit&redlink=1'
+
+
+class _WikiApiFetcher:
+    # Answers the wiki API queries of the tool, every page is at revision 1 and has an image named after it
+
+    def get(self, url: str, headers: dict = None) -> requests.Response:
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        pages = [{'title': title, 'lastrevid': 1, 'thumbnail': {'source': f'https://upload.wikimedia.org/{title}.jpg'}}
+                 for title in query['titles'][0].split('|')]
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({'query': {'pages': pages}}).encode()
+        return response
+
+    def get_cache(self) -> None:
+        return None
+
+
+class _ImageDownloader:
+
+    def __init__(self, images_dir: str):
+        self._images_dir = images_dir
+        self.downloaded_urls = list()
+
+    def download(self, image_url: str, headers: dict = None) -> str:
+        self.downloaded_urls.append(image_url)
+        file_path = os.path.join(self._images_dir, f'{len(self.downloaded_urls)}.jpg')
+        aip.Image.new('RGB', (100, 100), color='brown').save(file_path, format='JPEG')
+        return file_path
+
+
+class _UserAgentRequestHandler(http.server.BaseHTTPRequestHandler):
+    user_agents = list()
+
+    def do_GET(self):
+        type(self).user_agents.append(self.headers.get('User-Agent'))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *_args):
+        pass
+
+
+class TestAnimalsExtractorTool(TestCase):
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+        self._animals_path = os.path.join(self._output_dir.name, 'animals.jsonl')
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+        aet.http_fetcher = None
+        aet.image_downloader = None
+        aet.page_parse_pool = None
+        aet.page_url_to_image_url = None
+
+    """
+    GIVEN   A fresh interpreter
+    WHEN    importing the tool
+    THEN    none of the heavy dependencies is imported and the import fits the startup budget
+    """
+    def test_import_time_budget(self):
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(co.__file__)))
+        env = dict(os.environ, PYTHONPATH=package_dir)
+        result = subprocess.run([sys.executable, '-c', IMPORT_TIME_SCRIPT] + HEAVY_MODULES, env=env, cwd=package_dir,
+                                capture_output=True, text=True, check=True)
+        import_result = json.loads(result.stdout)
+        self.assertEqual([], import_result['imported_modules'])
+        self.assertLess(import_result['import_time'], IMPORT_TIME_BUDGET_SECONDS)
+
+    """
+    GIVEN   Command lines with and without a command
+    WHEN    parsing them
+    THEN    the options alone run the whole tool, and from-cache runs it offline
+    """
+    def test_parse_commands(self):
+        args = aet._parse_args(argv=['--workers', '2'])
+        self.assertEqual(aet.COMMAND_RUN, args.command)
+        self.assertEqual(2, args.workers)
+        self.assertFalse(args.offline)
+        self.assertTrue(aet._parse_args(argv=[aet.COMMAND_FROM_CACHE]).offline)
+        self.assertEqual(aet.COMMAND_RUN, aet._parse_args(argv=[]).command)
+
+    """
+    GIVEN   An animals file written by the extract command
+    WHEN    running the export command
+    THEN    the animals are exported without setting up any fetcher
+    """
+    def test_export_command(self):
+        er.export_animals(animals=[co.Animal(name='Aardvark', collateral_adjectives_list=['orycteropodian'],
+                                             page_url='https://en.wikipedia.org/wiki/Aardvark')],
+                          format_to_output_path={'jsonl': self._animals_path})
+        output_path = os.path.join(self._output_dir.name, 'animal_list.html')
+        aet.main(argv=[aet.COMMAND_EXPORT, '--animals-path', self._animals_path, '--output', output_path,
+                       '--formats', 'html', 'csv'])
+        self.assertIsNone(aet.http_fetcher)
+        with open(output_path, 'r', encoding='utf-8') as file:
+            self.assertIn('Aardvark', file.read())
+        self.assertTrue(os.path.exists(er.resolve_output_path(export_format='csv',
+                                                              output_prefix=os.path.splitext(output_path)[0])))
+
+    """
+    GIVEN   Aliases linking to the same page, and an animal of another page
+    WHEN    downloading their images
+    THEN    the shared image is downloaded once, and the aliases share its file
+    """
+    def test_aliases_share_image_download(self):
+        downloaded_urls = list()
+
+        class CountingImageDownloader:
+            def download(self, image_url: str, headers: dict = None) -> str:
+                downloaded_urls.append(image_url)
+                return f'/tmp/{os.path.basename(image_url)}'
+
+        aet.image_downloader = CountingImageDownloader()
+        image_coalescer = rc.create_request_coalescer(stage='animal_image')
+        aet.page_url_to_image_url = {'https://en.wikipedia.org/wiki/Cattle': 'https://upload.wikimedia.org/cattle.jpg',
+                                     'https://en.wikipedia.org/wiki/Bison': 'https://upload.wikimedia.org/bison.jpg'}
+        image_paths = [aet._download_animal_image(animal=co.Animal(name=name, page_url=page_url),
+                                                  page_coalescer=rc.create_request_coalescer(stage='animal_page'),
+                                                  image_coalescer=image_coalescer, animal_name_to_image_url=dict())
+                       for name, page_url in [('Cattle', 'https://en.wikipedia.org/wiki/Cattle'),
+                                              ('Cow', 'https://en.wikipedia.org/wiki/Cattle'),
+                                              ('Bison', 'https://en.wikipedia.org/wiki/Bison')]]
+        self.assertEqual(['/tmp/cattle.jpg', '/tmp/cattle.jpg', '/tmp/bison.jpg'], image_paths)
+        self.assertEqual(['https://upload.wikimedia.org/cattle.jpg', 'https://upload.wikimedia.org/bison.jpg'],
+                         downloaded_urls)
+        self.assertEqual(1, image_coalescer.get_saved_count())
+
+    """
+    GIVEN   Aliases sharing an image
+    WHEN    downloading them twice in the same process
+    THEN    the second run downloads the image again rather than reusing the file the first run removed
+    """
+    def test_repeated_download_runs(self):
+        downloads_dir = os.path.join(self._output_dir.name, 'downloads')
+        os.makedirs(downloads_dir)
+        args = aet._parse_args(argv=[
+            aet.COMMAND_DOWNLOAD, '--image-source', aet.IMAGE_SOURCE_API, '--parse-workers', '0',
+            '--checkpoint-path', os.path.join(self._output_dir.name, 'animal_checkpoint.jsonl'),
+            '--failure-report', os.path.join(self._output_dir.name, 'failed_animals.json'),
+            '--images-dir', os.path.join(self._output_dir.name, 'images')])
+        aet.http_fetcher = _WikiApiFetcher()
+        aet.image_downloader = image_downloader = _ImageDownloader(images_dir=downloads_dir)
+        for _ in range(2):
+            cattle, cow = aet._download_animals(args=args, animals=[
+                co.Animal(name='Cattle', page_url='https://en.wikipedia.org/wiki/Cattle'),
+                co.Animal(name='Cow', page_url='https://en.wikipedia.org/wiki/Cattle')])
+            self.assertTrue(os.path.exists(cattle.get_image_path()))
+            self.assertEqual(cattle.get_image_path(), cow.get_image_path())
+        self.assertEqual(['https://upload.wikimedia.org/Cattle.jpg'] * 2, image_downloader.downloaded_urls)
+
+    """
+    GIVEN   An animal and a redlink row, whose URL is not a wiki page URL
+    WHEN    running two incremental passes with the image URLs resolved by the wiki API
+    THEN    the redlink fails on its own in both passes, and the unchanged animal is not downloaded again
+    """
+    def test_incremental_run_with_redlink(self):
+        downloads_dir = os.path.join(self._output_dir.name, 'downloads')
+        os.makedirs(downloads_dir)
+        failure_report_path = os.path.join(self._output_dir.name, 'failed_animals.json')
+        args = aet._parse_args(argv=[
+            aet.COMMAND_DOWNLOAD, '--incremental', '--image-source', aet.IMAGE_SOURCE_API, '--parse-workers', '0',
+            '--state-path', os.path.join(self._output_dir.name, 'animal_state.sqlite'),
+            '--checkpoint-path', os.path.join(self._output_dir.name, 'animal_checkpoint.jsonl'),
+            '--failure-report', failure_report_path, '--images-dir', os.path.join(self._output_dir.name, 'images')])
+        aet.http_fetcher = _WikiApiFetcher()
+        aet.image_downloader = image_downloader = _ImageDownloader(images_dir=downloads_dir)
+        for _ in range(2):
+            aardvark, unicornfish = aet._download_animals(args=args, animals=[
+                co.Animal(name='Aardvark', page_url='https://en.wikipedia.org/wiki/Aardvark'),
+                co.Animal(name='Unicornfish', page_url=REDLINK_URL)])
+            self.assertTrue(os.path.exists(aardvark.get_image_path()))
+            self.assertIsNone(unicornfish.get_image_path())
+            with open(failure_report_path, 'r', encoding='utf-8') as file:
+                self.assertEqual(['Unicornfish'], [failure['name'] for failure in json.load(file)])
+        self.assertEqual(['https://upload.wikimedia.org/Aardvark.jpg'], image_downloader.downloaded_urls)
+
+    """
+    GIVEN   The fetcher set up by a download command
+    WHEN    fetching a page without request specific headers
+    THEN    the request is sent with the User-Agent of the tool
+    """
+    def test_fetcher_sends_tool_user_agent(self):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _UserAgentRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            aet._setup_fetcher(args=aet._parse_args(argv=[aet.COMMAND_DOWNLOAD, '--no-cache']))
+            aet.http_fetcher.get(url=f'http://127.0.0.1:{server.server_address[1]}/wiki/Aardvark')
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual([conf.DEFAULT_HEADERS['User-Agent']], _UserAgentRequestHandler.user_agents)
+
+    """
+    GIVEN   The animals page in the on disk cache
+    WHEN    running the extract command offline, streaming every row and then with the columnar output
+    THEN    the columnar animals file holds one animal per name, with the fields of the merged rows
+    """
+    def test_extract_command_columnar(self):
+        cache_dir = os.path.join(self._output_dir.name, 'cache')
+        http_cache = hc.create_http_cache(cache_dir=cache_dir)
+        with open(ANIMALS_PAGE_PATH, 'rb') as file:
+            http_cache.store(url=conf.MAIN_PAGE_URL, content=file.read(),
+                             headers={'Content-Type': 'text/html; charset=utf-8'})
+        http_cache.close()
+        columnar_animals_path = os.path.join(self._output_dir.name, 'columnar_animals.jsonl')
+        for extract_options in [['--animals-path', self._animals_path],
+                                ['--animals-path', columnar_animals_path, '--columnar']]:
+            aet.main(argv=[aet.COMMAND_EXTRACT, '--offline', '--cache-dir', cache_dir, '--layout-cache-path',
+                           os.path.join(self._output_dir.name, 'layout.json')] + extract_options)
+        streamed_animals = list(aej.read_animals(input_path=self._animals_path))
+        columnar_animals = list(aej.read_animals(input_path=columnar_animals_path))
+        columnar_names = [animal.get_name().lower() for animal in columnar_animals]
+        self.assertEqual(len(set(columnar_names)), len(columnar_names))
+        self.assertEqual({animal.get_name().lower() for animal in streamed_animals}, set(columnar_names))
+        bull = next(animal for animal in columnar_animals if animal.get_name() == 'Bull')
+        self.assertCountEqual(['bovine', 'taurine (male)', 'vaccine (female)', 'vituline (young)'],
+                              bull.get_collateral_adjectives_list())
+        self.assertEqual('https://en.wikipedia.org/wiki/Bull', bull.get_page_url())
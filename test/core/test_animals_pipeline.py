@@ -0,0 +1,118 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import time
+import random
+import tempfile
+import threading
+from unittest import TestCase
+import core.common as co
+import core.host_limiter as hl
+import core.animals_pipeline as ap
+import core.pipeline_checkpoint as pc
+
+
+class TestAnimalsPipeline(TestCase):
+
+    def setUp(self):
+        self._animals = [co.Animal(name=f'Animal{index}', page_url=f'https://en.wikipedia.org/wiki/Animal{index}')
+                         for index in range(50)]
+
+    """
+    GIVEN   A list of animals and a process function that finishes in a random order
+    WHEN    running the animals pipeline with multiple workers
+    THEN    the output keeps the input order and every animal gets its image path
+    """
+    def test_pipeline_keeps_input_order(self):
+        def process_animal(animal: co.Animal) -> str:
+            time.sleep(random.random() / 100)
+            return f'/tmp/{animal.get_name()}.jpg'
+
+        pipeline_output = ap.create_animals_pipeline(process_animal=process_animal, workers=8).run(
+            animals=self._animals)
+        self.assertEqual([animal.get_name() for animal in self._animals],
+                         [animal.get_name() for animal in pipeline_output.get_list_of_animals()])
+        for animal in pipeline_output.get_list_of_animals():
+            self.assertEqual(f'/tmp/{animal.get_name()}.jpg', animal.get_image_path())
+        self.assertEqual([], pipeline_output.get_failures())
+
+    """
+    GIVEN   A list of animals and a process function that fails for some of them
+    WHEN    running the animals pipeline
+    THEN    the failing animals are collected as failures and the rest of the animals are still processed
+    """
+    def test_pipeline_collects_failures(self):
+        def process_animal(animal: co.Animal) -> str:
+            if animal.get_name().endswith('7'):
+                raise ValueError(f'No page url found for {animal.get_name()}')
+            return f'/tmp/{animal.get_name()}.jpg'
+
+        pipeline_output = ap.create_animals_pipeline(process_animal=process_animal, workers=4).run(
+            animals=self._animals)
+        failed_names = [failure.get_animal().get_name() for failure in pipeline_output.get_failures()]
+        self.assertEqual(['Animal7', 'Animal17', 'Animal27', 'Animal37', 'Animal47'], failed_names)
+        self.assertEqual(len(self._animals), len(pipeline_output.get_list_of_animals()))
+        self.assertIsNone(pipeline_output.get_failures()[0].get_animal().get_image_path())
+
+    """
+    GIVEN   A host limiter with a limit of 2 requests per host
+    WHEN    running the animals pipeline with more workers than the limit
+    THEN    no more than 2 animals access the same host at the same time
+    """
+    def test_pipeline_respects_per_host_limit(self):
+        host_limiter = hl.create_host_limiter(per_host_limit=2)
+        lock = threading.Lock()
+        in_flight = [0]
+        max_in_flight = [0]
+
+        def process_animal(animal: co.Animal) -> str:
+            with host_limiter.limit(url=animal.get_page_url()):
+                with lock:
+                    in_flight[0] += 1
+                    max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+                time.sleep(0.005)
+                with lock:
+                    in_flight[0] -= 1
+            return f'/tmp/{animal.get_name()}.jpg'
+
+        ap.create_animals_pipeline(process_animal=process_animal, workers=8).run(animals=self._animals)
+        self.assertEqual(2, max_in_flight[0])
+
+    """
+    GIVEN   A run that completed part of the animals and failed on the rest
+    WHEN    resuming the run from its checkpoint
+    THEN    only the animals that did not complete are processed again
+    """
+    def test_pipeline_resumes_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            checkpoint_path = os.path.join(work_dir, 'checkpoint.jsonl')
+
+            def process_animal(animal: co.Animal) -> str:
+                if animal.get_name().endswith('7'):
+                    raise ValueError(f'Failed to get page for animal:{animal.get_name()}, status code: 503')
+                image_path = os.path.join(work_dir, f'{animal.get_name()}.jpg')
+                open(image_path, 'wb').close()
+                return image_path
+
+            checkpoint = pc.create_pipeline_checkpoint(path=checkpoint_path)
+            ap.create_animals_pipeline(process_animal=process_animal, workers=4, checkpoint=checkpoint).run(
+                animals=self._animals)
+            checkpoint.close()
+
+            processed_names = list()
+
+            def process_animal_again(animal: co.Animal) -> str:
+                processed_names.append(animal.get_name())
+                return os.path.join(work_dir, f'{animal.get_name()}.jpg')
+
+            checkpoint = pc.create_pipeline_checkpoint(path=checkpoint_path, resume=True)
+            animals = [co.Animal(name=animal.get_name()) for animal in self._animals]
+            pipeline_output = ap.create_animals_pipeline(process_animal=process_animal_again, workers=4,
+                                                         checkpoint=checkpoint).run(animals=animals)
+            checkpoint.close()
+            self.assertCountEqual(['Animal7', 'Animal17', 'Animal27', 'Animal37', 'Animal47'], processed_names)
+            self.assertEqual([], pipeline_output.get_failures())
+            self.assertTrue(all(animal.get_image_path() for animal in pipeline_output.get_list_of_animals()))
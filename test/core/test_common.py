@@ -0,0 +1,66 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+from unittest import TestCase
+import core.common as co
+
+
+class TestColumnarAnimalsExtractorOutput(TestCase):
+
+    def setUp(self):
+        self._animals = [co.Animal(name='Bee', collateral_adjectives_list=['apian', 'apiarian', 'apic'],
+                                   page_url='https://en.wikipedia.org/wiki/Bee'),
+                         co.Animal(name='Bull', collateral_adjectives_list=['bovine', 'taurine (male)'],
+                                   page_url='https://en.wikipedia.org/wiki/Bull'),
+                         co.Animal(name='Cattle', collateral_adjectives_list=['bovine', 'taurine (male)'],
+                                   page_url='https://en.wikipedia.org/wiki/Cattle'),
+                         co.Animal(name='Panda', page_url='https://en.wikipedia.org/wiki/Giant_panda')]
+
+    """
+    GIVEN   A list of animals
+    WHEN    storing them in a columnar animals output
+    THEN    the animals getters return the same values, in the same order
+    """
+    def test_columnar_output_keeps_animals(self):
+        columnar_output = co.ColumnarAnimalsExtractorOutput(list_of_animals=self._animals)
+        self.assertEqual([(animal.get_name(), animal.get_collateral_adjectives_list(), animal.get_page_url(),
+                           animal.get_image_path()) for animal in self._animals],
+                         [(animal.get_name(), animal.get_collateral_adjectives_list(), animal.get_page_url(),
+                           animal.get_image_path()) for animal in columnar_output.get_list_of_animals()])
+
+    """
+    GIVEN   A columnar animals output
+    WHEN    looking up an animal by name in any case and updating its fields
+    THEN    the lookup finds the animal and the updates are kept by the output
+    """
+    def test_columnar_output_lookup_and_setters(self):
+        columnar_output = co.ColumnarAnimalsExtractorOutput(list_of_animals=self._animals)
+        panda = columnar_output.get_animal(name='PANDA')
+        panda.set_image_path(image_path='images/panda.jpg')
+        panda.set_collateral_adjectives_list(['ailuropodine'])
+        self.assertEqual('images/panda.jpg', columnar_output.get_animal(name='panda').get_image_path())
+        self.assertEqual(['ailuropodine'], columnar_output.get_animal(name='panda').get_collateral_adjectives_list())
+        self.assertIsNone(columnar_output.get_animal(name='Weasel'))
+
+    """
+    GIVEN   Two source tables with a shared animal
+    WHEN    merging them into one columnar animals output
+    THEN    the shared animal is stored once with the values of the last table, and repeated adjectives are pooled
+    """
+    def test_columnar_output_merges_tables(self):
+        columnar_output = co.ColumnarAnimalsExtractorOutput(list_of_animals=self._animals)
+        columnar_output.extend(animals=[co.Animal(name='bee', collateral_adjectives_list=['apian'])])
+        self.assertEqual(4, len(columnar_output))
+        self.assertEqual(['apian'], columnar_output.get_animal(name='Bee').get_collateral_adjectives_list())
+        self.assertEqual(5, len(columnar_output._adjectives))
+
+    """
+    GIVEN   An animal
+    WHEN    setting an attribute that is not one of its fields
+    THEN    it fails since the animal has no per instance dict
+    """
+    def test_animal_is_slotted(self):
+        with self.assertRaises(AttributeError):
+            self._animals[0].extra_field = 'value'
@@ -0,0 +1,97 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import tempfile
+import threading
+import http.server
+from unittest import TestCase
+import core.http_cache as hc
+import core.http_fetcher as hf
+
+PAGE_CONTENT = b'<html>animal page</html>'
+PAGE_ETAG = '"v1"'
+
+
+class _ConditionalRequestHandler(http.server.BaseHTTPRequestHandler):
+    bodies_sent = 0
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == PAGE_ETAG:
+            self.send_response(304)
+            self.send_header('ETag', PAGE_ETAG)
+            self.end_headers()
+            return
+        type(self).bodies_sent += 1
+        self.send_response(200)
+        self.send_header('ETag', PAGE_ETAG)
+        self.send_header('Content-Type', 'text/html; charset=UTF-8')
+        self.send_header('Content-Length', str(len(PAGE_CONTENT)))
+        self.end_headers()
+        self.wfile.write(PAGE_CONTENT)
+
+    def log_message(self, *_args):
+        pass
+
+
+class TestHttpCache(TestCase):
+
+    def setUp(self):
+        _ConditionalRequestHandler.bodies_sent = 0
+        self._cache_dir = tempfile.TemporaryDirectory()
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ConditionalRequestHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._url = f'http://127.0.0.1:{self._server.server_address[1]}/wiki/Aardvark'
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._cache_dir.cleanup()
+
+    """
+    GIVEN   A server that supports ETag validation and an empty http cache
+    WHEN    fetching the same page twice
+    THEN    the second fetch is revalidated (304) and served from the cache without transferring the body again
+    """
+    def test_cache_revalidates_with_etag(self):
+        fetcher = hf.create_http_fetcher(requests_per_second=None,
+                                         cache=hc.create_http_cache(cache_dir=self._cache_dir.name))
+        first_response = fetcher.get(url=self._url)
+        second_response = fetcher.get(url=self._url)
+        fetcher.close()
+        self.assertEqual(200, second_response.status_code)
+        self.assertEqual(first_response.text, second_response.text)
+        self.assertEqual(1, _ConditionalRequestHandler.bodies_sent)
+
+    """
+    GIVEN   A page cached by a previous run
+    WHEN    fetching it again in offline mode
+    THEN    the page is served from the cache, and a page that is not cached fails
+    """
+    def test_cache_offline_mode(self):
+        hf.create_http_fetcher(requests_per_second=None,
+                               cache=hc.create_http_cache(cache_dir=self._cache_dir.name)).get(url=self._url)
+        fetcher = hf.create_http_fetcher(requests_per_second=None,
+                                         cache=hc.create_http_cache(cache_dir=self._cache_dir.name, offline=True))
+        self.assertEqual(PAGE_CONTENT.decode(), fetcher.get(url=self._url).text)
+        with self.assertRaises(ValueError):
+            fetcher.get(url=f'{self._url}_missing')
+        self.assertEqual(1, _ConditionalRequestHandler.bodies_sent)
+
+    """
+    GIVEN   An http cache limited to 10 bytes
+    WHEN    storing identical bodies for two URLs and then a third different body
+    THEN    identical bodies are stored once and the least recently used URLs are evicted to respect the size limit
+    """
+    def test_cache_deduplicates_and_evicts_least_recently_used(self):
+        cache = hc.create_http_cache(cache_dir=self._cache_dir.name, max_size=10)
+        cache.store(url='https://a', content=b'12345', headers=dict())
+        cache.store(url='https://b', content=b'12345', headers=dict())
+        self.assertEqual(5, cache.get_total_size())
+        self.assertIsNotNone(cache.get_entry(url='https://a'))
+        cache.store(url='https://c', content=b'abcdefgh', headers=dict())
+        self.assertLessEqual(cache.get_total_size(), 10)
+        self.assertIsNone(cache.get_entry(url='https://a'))
+        self.assertIsNone(cache.get_entry(url='https://b'))
+        self.assertEqual(b'abcdefgh', cache.read_body(entry=cache.get_entry(url='https://c')))
@@ -0,0 +1,147 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import time
+import tempfile
+import threading
+import http.server
+from unittest import TestCase
+import core.metrics as metrics
+import core.http_cache as hc
+import core.http_fetcher as hf
+
+
+class _FlakyRequestHandler(http.server.BaseHTTPRequestHandler):
+    # Number of throttled (429) responses to send before serving the page
+    throttled_responses = 0
+    retry_after = '0'
+    requests_count = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests_count += 1
+        if cls.requests_count <= cls.throttled_responses:
+            self.send_response(429)
+            self.send_header('Retry-After', cls.retry_after)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        content = b'<html>animal page</html>'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *_args):
+        pass
+
+
+class TestHttpFetcher(TestCase):
+
+    def setUp(self):
+        _FlakyRequestHandler.requests_count = 0
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FlakyRequestHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._url = f'http://127.0.0.1:{self._server.server_address[1]}/wiki/Aardvark'
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    """
+    GIVEN   A server that throttles the first 2 requests with 429 and Retry-After
+    WHEN    fetching a page with the http fetcher
+    THEN    the fetcher retries and returns the page
+    """
+    def test_fetcher_retries_throttled_request(self):
+        _FlakyRequestHandler.throttled_responses = 2
+        fetcher = hf.create_http_fetcher(requests_per_second=None)
+        response = fetcher.get(url=self._url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('<html>animal page</html>', response.text)
+        self.assertEqual(3, _FlakyRequestHandler.requests_count)
+
+    """
+    GIVEN   A server that throttles the first 2 requests and active metrics
+    WHEN    fetching a page with the http fetcher
+    THEN    the fetch latency, the retries and the bytes of the page are recorded
+    """
+    def test_fetcher_records_metrics(self):
+        _FlakyRequestHandler.throttled_responses = 2
+        run_metrics = metrics.create_metrics()
+        metrics.set_active_metrics(metrics=run_metrics)
+        try:
+            hf.create_http_fetcher(requests_per_second=None).get(url=self._url)
+        finally:
+            metrics.set_active_metrics(metrics=None)
+        fetch_summary = run_metrics.to_summary()[hf.HTTP_FETCH_STAGE]
+        self.assertEqual(2, fetch_summary[metrics.COUNTER_RETRIES])
+        self.assertEqual(len('<html>animal page</html>'), fetch_summary[metrics.COUNTER_BYTES])
+        self.assertEqual(1, fetch_summary['latency_seconds']['count'])
+        self.assertNotIn(metrics.COUNTER_ERRORS, fetch_summary)
+
+    """
+    GIVEN   A page fetched once into the on disk cache, and active metrics
+    WHEN    fetching the page again from the cache in offline mode
+    THEN    the cache hit is recorded and the cached body is not counted as fetched bytes
+    """
+    def test_fetcher_does_not_count_cached_bytes(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            online_fetcher = hf.create_http_fetcher(requests_per_second=None,
+                                                    cache=hc.create_http_cache(cache_dir=cache_dir))
+            online_fetcher.get(url=self._url)
+            online_fetcher.close()
+            run_metrics = metrics.create_metrics()
+            metrics.set_active_metrics(metrics=run_metrics)
+            try:
+                offline_fetcher = hf.create_http_fetcher(cache=hc.create_http_cache(cache_dir=cache_dir, offline=True))
+                self.assertEqual('<html>animal page</html>', offline_fetcher.get(url=self._url).text)
+                offline_fetcher.close()
+            finally:
+                metrics.set_active_metrics(metrics=None)
+        fetch_summary = run_metrics.to_summary()[hf.HTTP_FETCH_STAGE]
+        self.assertEqual(1, fetch_summary[metrics.COUNTER_CACHE_HITS])
+        self.assertNotIn(metrics.COUNTER_BYTES, fetch_summary)
+
+    """
+    GIVEN   A server that keeps throttling the requests
+    WHEN    fetching a page with the http fetcher limited to a single retry
+    THEN    the throttled response is returned after the retries are exhausted
+    """
+    def test_fetcher_gives_up_after_max_retries(self):
+        _FlakyRequestHandler.throttled_responses = 10
+        fetcher = hf.create_http_fetcher(requests_per_second=None, max_retries=1)
+        self.assertEqual(429, fetcher.get(url=self._url).status_code)
+        self.assertEqual(2, _FlakyRequestHandler.requests_count)
+
+
+class TestRetryPolicy(TestCase):
+
+    """
+    GIVEN   A retry policy
+    WHEN    resolving the delay before the next retry
+    THEN    Retry-After (seconds or HTTP date) is honored, otherwise the delay grows exponentially up to the max backoff
+    """
+    def test_retry_policy_delay(self):
+        retry_policy = hf.RetryPolicy(backoff_factor=0.5, max_backoff=3)
+        self.assertEqual([0.5, 1, 2, 3], [retry_policy.resolve_delay(attempt=attempt) for attempt in range(4)])
+        self.assertEqual(2, retry_policy.resolve_delay(attempt=0, retry_after='2'))
+        self.assertEqual(3, retry_policy.resolve_delay(attempt=0, retry_after='120'))
+        self.assertEqual(0, retry_policy.resolve_delay(attempt=0, retry_after='Wed, 21 Oct 2015 07:28:00 GMT'))
+
+
+class TestRateLimiter(TestCase):
+
+    """
+    GIVEN   A rate limiter of 100 requests per second
+    WHEN    acquiring 20 slots
+    THEN    it takes at least 190 milliseconds
+    """
+    def test_rate_limiter(self):
+        rate_limiter = hf.RateLimiter(requests_per_second=100)
+        start = time.monotonic()
+        for _ in range(20):
+            rate_limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
@@ -0,0 +1,77 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+from unittest import TestCase
+import core.metrics as metrics
+
+
+class TestMetrics(TestCase):
+
+    def tearDown(self):
+        metrics.set_active_metrics(metrics=None)
+
+    """
+    GIVEN   A histogram
+    WHEN    observing 100 latencies
+    THEN    the count, sum, cumulative buckets and quantile estimates match the observations
+    """
+    def test_histogram(self):
+        histogram = metrics.Histogram(buckets=(0.1, 1))
+        for value in [0.05] * 90 + [0.5] * 9 + [3]:
+            histogram.observe(value=value)
+        summary = histogram.to_dict()
+        self.assertEqual(100, summary['count'])
+        self.assertAlmostEqual(0.05 * 90 + 0.5 * 9 + 3, summary['sum'])
+        self.assertEqual({'0.1': 90, '1': 99, '+Inf': 100}, summary['buckets'])
+        self.assertEqual(0.1, summary['p50'])
+        self.assertEqual(1, summary['p99'])
+        self.assertEqual(3, summary['max'])
+
+    """
+    GIVEN   Active metrics
+    WHEN    timing a stage that succeeds once and fails once, and counting its bytes
+    THEN    both runs are in the latency histogram, the failure is counted as an error and the bytes are summed
+    """
+    def test_timer_and_counters(self):
+        run_metrics = metrics.create_metrics()
+        metrics.set_active_metrics(metrics=run_metrics)
+        with metrics.timer(stage='image_download'):
+            metrics.increment(stage='image_download', counter=metrics.COUNTER_BYTES, amount=100)
+        with self.assertRaises(ValueError):
+            with metrics.timer(stage='image_download'):
+                raise ValueError('Failed to download image')
+        metrics.increment(stage='image_download', counter=metrics.COUNTER_BYTES, amount=50)
+        summary = run_metrics.to_summary()['image_download']
+        self.assertEqual(2, summary['latency_seconds']['count'])
+        self.assertEqual(1, summary[metrics.COUNTER_ERRORS])
+        self.assertEqual(150, summary[metrics.COUNTER_BYTES])
+
+    """
+    GIVEN   Metrics with a timed stage and a counter
+    WHEN    dumping them in the Prometheus text format
+    THEN    the histogram buckets, sum, count and the counter are written with the stage label
+    """
+    def test_prometheus_dump(self):
+        run_metrics = metrics.create_metrics(buckets=(0.1, 1))
+        run_metrics.observe(stage='http_fetch', seconds=0.5)
+        run_metrics.increment(stage='http_fetch', counter=metrics.COUNTER_CACHE_HITS)
+        lines = run_metrics.to_prometheus().splitlines()
+        self.assertIn('animals_extractor_stage_seconds_bucket{stage="http_fetch",le="0.1"} 0', lines)
+        self.assertIn('animals_extractor_stage_seconds_bucket{stage="http_fetch",le="1.0"} 1', lines)
+        self.assertIn('animals_extractor_stage_seconds_bucket{stage="http_fetch",le="+Inf"} 1', lines)
+        self.assertIn('animals_extractor_stage_seconds_count{stage="http_fetch"} 1', lines)
+        self.assertIn('# TYPE animals_extractor_cache_hits_total counter', lines)
+        self.assertIn('animals_extractor_cache_hits_total{stage="http_fetch"} 1', lines)
+
+    """
+    GIVEN   No active metrics
+    WHEN    timing a stage and counting
+    THEN    nothing is recorded and the shared no-op timer is used
+    """
+    def test_disabled_metrics(self):
+        self.assertIs(metrics.timer(stage='http_fetch'), metrics.timer(stage='image_download'))
+        with metrics.timer(stage='http_fetch'):
+            metrics.increment(stage='http_fetch', counter=metrics.COUNTER_BYTES, amount=100)
+        self.assertIsNone(metrics.get_active_metrics())
@@ -0,0 +1,81 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import threading
+import concurrent.futures
+from unittest import TestCase
+import core.metrics as metrics
+import core.request_coalescer as rc
+
+
+class TestRequestCoalescer(TestCase):
+
+    def setUp(self):
+        self._coalescer = rc.create_request_coalescer(stage='animal_image')
+        self._request_count = 0
+        self._lock = threading.Lock()
+
+    def tearDown(self):
+        metrics.set_active_metrics(metrics=None)
+
+    """
+    GIVEN   A request that blocks until all the callers of its key are waiting
+    WHEN    8 workers run the same key concurrently
+    THEN    the request runs once, every worker gets its result and 7 requests are saved
+    """
+    def test_concurrent_requests_share_one_request(self):
+        run_metrics = metrics.create_metrics()
+        metrics.set_active_metrics(metrics=run_metrics)
+        release_event = threading.Event()
+
+        def request() -> str:
+            release_event.wait(timeout=5)
+            return self._count_request(result='/tmp/cattle.jpg')
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(self._coalescer.run, 'https://upload.wikimedia.org/cattle.jpg', request)
+                       for _ in range(8)]
+            release_event.set()
+            results = [future.result() for future in futures]
+        self.assertEqual(['/tmp/cattle.jpg'] * 8, results)
+        self.assertEqual(1, self._request_count)
+        self.assertEqual(7, self._coalescer.get_saved_count())
+        self.assertEqual(7, run_metrics.to_summary()['animal_image'][metrics.COUNTER_COALESCED])
+
+    """
+    GIVEN   A key whose request already completed
+    WHEN    running the key again, and then another key
+    THEN    the stored result is returned without a request, and the other key runs its own request
+    """
+    def test_repeated_requests_reuse_the_result(self):
+        self._coalescer.run(key='Cattle', request=lambda: self._count_request(result='cattle.jpg'))
+        self.assertEqual('cattle.jpg',
+                         self._coalescer.run(key='Cattle', request=lambda: self._count_request(result='other.jpg')))
+        self.assertEqual('bison.jpg',
+                         self._coalescer.run(key='Bison', request=lambda: self._count_request(result='bison.jpg')))
+        self.assertEqual(2, self._request_count)
+        self.assertEqual(1, self._coalescer.get_saved_count())
+
+    """
+    GIVEN   A key whose request failed
+    WHEN    running the key again
+    THEN    the failure is not stored and the request is retried
+    """
+    def test_failed_request_is_retried(self):
+        def failing_request() -> str:
+            self._count_request(result=None)
+            raise ValueError('Failed to download image')
+
+        with self.assertRaises(ValueError):
+            self._coalescer.run(key='Cattle', request=failing_request)
+        self.assertEqual('cattle.jpg',
+                         self._coalescer.run(key='Cattle', request=lambda: self._count_request(result='cattle.jpg')))
+        self.assertEqual(2, self._request_count)
+        self.assertEqual(0, self._coalescer.get_saved_count())
+
+    def _count_request(self, result: str) -> str:
+        with self._lock:
+            self._request_count += 1
+        return result
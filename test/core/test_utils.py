@@ -0,0 +1,54 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+from unittest import TestCase
+import core.utils as utils
+
+THUMB_URL = '//upload.wikimedia.org/wikipedia/commons/thumb/f/f0/Orycteropus_afer.jpg/220px-Orycteropus_afer.jpg'
+ORIGINAL_URL = '//upload.wikimedia.org/wikipedia/commons/f/f0/Orycteropus_afer.jpg'
+
+
+class TestPlanImageUrl(TestCase):
+
+    """
+    GIVEN   A Wikimedia thumb image URL
+    WHEN    planning the image URL without a width
+    THEN    the embedded image URL is kept
+    """
+    def test_plan_image_url_without_width(self):
+        self.assertEqual(f'https:{THUMB_URL}', utils.plan_image_url(image_url=THUMB_URL))
+
+    """
+    GIVEN   A Wikimedia thumb image URL and an original image URL
+    WHEN    planning the image URL for a width of 200 pixels
+    THEN    a 200px thumb URL is requested
+    """
+    def test_plan_image_url_rewrites_thumb_width(self):
+        expected_url = ('https://upload.wikimedia.org/wikipedia/commons/thumb/f/f0/Orycteropus_afer.jpg/'
+                        '200px-Orycteropus_afer.jpg')
+        self.assertEqual(expected_url, utils.plan_image_url(image_url=THUMB_URL, width=200))
+        self.assertEqual(expected_url, utils.plan_image_url(image_url=ORIGINAL_URL, width=200))
+
+    """
+    GIVEN   A Wikimedia thumb image URL with a srcset that has a candidate of the requested width
+    WHEN    planning the image URL for that width
+    THEN    the srcset candidate is used
+    """
+    def test_plan_image_url_uses_srcset_candidate(self):
+        srcset_url = '//upload.wikimedia.org/wikipedia/commons/thumb/f/f0/Orycteropus_afer.jpg/330px-Other.jpg'
+        self.assertEqual(f'https:{srcset_url}', utils.plan_image_url(image_url=THUMB_URL, width=330,
+                                                                     srcset=f'{srcset_url} 1.5x, {THUMB_URL} 2x'))
+
+    """
+    GIVEN   A bitmap and a vector Wikimedia image narrower than the requested width
+    WHEN    planning the image URL
+    THEN    the bitmap original is used (it can not be upscaled) and the vector image is rendered at the width
+    """
+    def test_plan_image_url_does_not_upscale_bitmaps(self):
+        self.assertEqual(f'https:{ORIGINAL_URL}', utils.plan_image_url(image_url=THUMB_URL, width=400,
+                                                                       file_width='300'))
+        self.assertEqual('https://upload.wikimedia.org/wikipedia/commons/thumb/5/5a/Status.svg/400px-Status.svg.png',
+                         utils.plan_image_url(image_url='//upload.wikimedia.org/wikipedia/commons/5/5a/Status.svg',
+                                              width=400, file_width='300'))
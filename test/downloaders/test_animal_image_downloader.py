@@ -0,0 +1,158 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import asyncio
+import threading
+import unittest
+import http.server
+from unittest import TestCase
+import core.metrics as metrics
+import core.http_fetcher as hf
+import downloaders.animal_image_downloader as aid
+
+IMAGE_CONTENT = bytes(range(256)) * 1024
+
+
+class _ImageRequestHandler(http.server.BaseHTTPRequestHandler):
+    throttled_paths = set()
+
+    def do_GET(self):
+        if self.path.startswith('/throttled') and self.path not in self.throttled_paths:
+            # Only the first request of a throttled path is throttled
+            self.throttled_paths.add(self.path)
+            self.send_response(503)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path.startswith('/missing'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(IMAGE_CONTENT)))
+        self.end_headers()
+        self.wfile.write(IMAGE_CONTENT)
+
+    def log_message(self, *_args):
+        pass
+
+
+class TestImageDownloader(TestCase):
+
+    def setUp(self):
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ImageRequestHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._base_url = f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        metrics.set_active_metrics(metrics=None)
+
+    """
+    GIVEN   A local server serving an image and active metrics
+    WHEN    downloading the image with the image downloader
+    THEN    the image bytes are counted once, under the fetcher stage
+    """
+    def test_download_counts_bytes_once(self):
+        run_metrics = metrics.create_metrics()
+        metrics.set_active_metrics(metrics=run_metrics)
+        image_downloader = aid.create_image_downloader(fetcher=hf.create_http_fetcher(requests_per_second=None))
+        file_path = image_downloader.download(image_url=f'{self._base_url}/image.jpg')
+        os.remove(file_path)
+        summary = run_metrics.to_summary()
+        self.assertEqual(len(IMAGE_CONTENT), summary[hf.HTTP_FETCH_STAGE][metrics.COUNTER_BYTES])
+        self.assertNotIn(metrics.COUNTER_BYTES, summary[aid.IMAGE_DOWNLOAD_STAGE])
+
+    """
+    GIVEN   Content types of downloaded images
+    WHEN    resolving the suffix of the downloaded files
+    THEN    the suffix matches the content type, and is .jpg for a missing or unknown one
+    """
+    def test_resolve_image_suffix(self):
+        self.assertEqual('.png', aid.resolve_image_suffix(content_type='image/png'))
+        self.assertEqual('.svg', aid.resolve_image_suffix(content_type='image/svg+xml; charset=utf-8'))
+        self.assertEqual('.jpg', aid.resolve_image_suffix(content_type='image/jpeg'))
+        self.assertEqual('.jpg', aid.resolve_image_suffix(content_type=None))
+        self.assertEqual('.jpg', aid.resolve_image_suffix(content_type='application/octet-stream'))
+
+
+@unittest.skipIf(aid.aiohttp is None, 'aiohttp is not installed')
+class TestAsyncImageDownloader(TestCase):
+
+    def setUp(self):
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ImageRequestHandler)
+        self._server_thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._server_thread.start()
+        self._base_url = f'http://127.0.0.1:{self._server.server_address[1]}'
+        self._downloaded_files = list()
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        for file_path in self._downloaded_files:
+            os.remove(file_path)
+
+    """
+    GIVEN   A local server serving images
+    WHEN    downloading many images with the async image downloader from a single event loop
+    THEN    every image is written to its own local file with the full image content
+    """
+    def test_async_download_many(self):
+        async def download():
+            async with aid.create_async_image_downloader(concurrency=4) as image_downloader:
+                return await image_downloader.download_many(
+                    image_urls=[f'{self._base_url}/image{index}.jpg' for index in range(20)])
+
+        file_paths = asyncio.run(download())
+        self._downloaded_files.extend(file_paths)
+        self.assertEqual(20, len(set(file_paths)))
+        for file_path in file_paths:
+            with open(file_path, 'rb') as file:
+                self.assertEqual(IMAGE_CONTENT, file.read())
+
+    """
+    GIVEN   A local server without the requested image
+    WHEN    downloading the image with the async image downloader
+    THEN    the failure is returned in place of the file path
+    """
+    def test_async_download_many_with_missing_image(self):
+        async def download():
+            async with aid.create_async_image_downloader() as image_downloader:
+                return await image_downloader.download_many(
+                    image_urls=[f'{self._base_url}/image.jpg', f'{self._base_url}/missing.jpg'])
+
+        file_path, error = asyncio.run(download())
+        self._downloaded_files.append(file_path)
+        self.assertTrue(os.path.exists(file_path))
+        self.assertIsInstance(error, ValueError)
+
+    """
+    GIVEN   A downloader with a single concurrency slot, and a server throttling the first image with Retry-After
+    WHEN    downloading the throttled image and another image concurrently
+    THEN    the other image is downloaded while the throttled one backs off, and the throttled one is retried
+    """
+    def test_async_back_off_releases_the_concurrency_slot(self):
+        completed_urls = list()
+
+        async def download(image_downloader: aid.AsyncImageDownloader, image_url: str) -> str:
+            file_path = await image_downloader.download(image_url=image_url)
+            completed_urls.append(image_url)
+            return file_path
+
+        async def download_both():
+            async with aid.create_async_image_downloader(concurrency=1, requests_per_second=None) as image_downloader:
+                throttled_task = asyncio.ensure_future(download(image_downloader=image_downloader,
+                                                                image_url=f'{self._base_url}/throttled.jpg'))
+                await asyncio.sleep(0.2)
+                return await asyncio.gather(throttled_task, download(image_downloader=image_downloader,
+                                                                     image_url=f'{self._base_url}/image.jpg'))
+
+        file_paths = asyncio.run(download_both())
+        self._downloaded_files.extend(file_paths)
+        self.assertEqual([f'{self._base_url}/image.jpg', f'{self._base_url}/throttled.jpg'], completed_urls)
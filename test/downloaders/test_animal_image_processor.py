@@ -0,0 +1,99 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+import core.common as co
+import downloaders.animal_image_processor as aip
+
+
+@unittest.skipIf(aip.Image is None, 'Pillow is not installed')
+class TestImageProcessor(TestCase):
+
+    def setUp(self):
+        self._work_dir = tempfile.TemporaryDirectory()
+        self._images_dir = os.path.join(self._work_dir.name, 'images')
+
+    def tearDown(self):
+        self._work_dir.cleanup()
+
+    """
+    GIVEN   Three animals, two of them (Cattle and its alias Bull) downloaded the same image
+    WHEN    processing the downloaded images
+    THEN    identical images are stored once as a 200px wide thumbnail shared by the animals, and the downloaded
+            files are removed
+    """
+    def test_process_deduplicates_and_resizes_images(self):
+        cattle_path = self._create_image(name='cattle.jpg', color='brown')
+        bull_path = self._create_image(name='bull.jpg', color='brown')
+        bee_path = self._create_image(name='bee.jpg', color='yellow')
+        animals = [co.Animal(name='Cattle', image_path=cattle_path), co.Animal(name='Bull', image_path=bull_path),
+                   co.Animal(name='Bee', image_path=bee_path), co.Animal(name='Panda')]
+        aip.create_image_processor(images_dir=self._images_dir, thumbnail_width=200, workers=2).process(
+            animals=animals)
+        cattle, bull, bee, panda = animals
+        self.assertEqual(cattle.get_image_path(), bull.get_image_path())
+        self.assertNotEqual(cattle.get_image_path(), bee.get_image_path())
+        self.assertIsNone(panda.get_image_path())
+        self.assertEqual(2, len(os.listdir(self._images_dir)))
+        with aip.Image.open(cattle.get_image_path()) as image:
+            self.assertEqual((200, 150), image.size)
+        for downloaded_path in [cattle_path, bull_path, bee_path]:
+            self.assertFalse(os.path.exists(downloaded_path))
+
+    """
+    GIVEN   A high quality JPEG image already narrower than the thumbnail width
+    WHEN    processing the downloaded image
+    THEN    the stored image is a byte identical copy of the downloaded one
+    """
+    def test_process_keeps_small_images_unchanged(self):
+        small_path = self._create_image(name='small.jpg', color='green', size=(150, 100), quality=95)
+        with open(small_path, 'rb') as file:
+            small_content = file.read()
+        animal = co.Animal(name='Shrew', image_path=small_path)
+        aip.create_image_processor(images_dir=self._images_dir, thumbnail_width=200, workers=1).process(
+            animals=[animal])
+        with open(animal.get_image_path(), 'rb') as file:
+            self.assertEqual(small_content, file.read())
+
+    """
+    GIVEN   An animated GIF image wider than the thumbnail width
+    WHEN    processing the downloaded image
+    THEN    the thumbnail is resized and keeps all the frames
+    """
+    def test_process_keeps_animation_frames(self):
+        gif_path = os.path.join(self._work_dir.name, 'animated.gif')
+        frames = [aip.Image.new('RGB', (400, 300), color=color) for color in ['red', 'green', 'blue']]
+        frames[0].save(gif_path, format='GIF', save_all=True, append_images=frames[1:], duration=100, loop=0)
+        animal = co.Animal(name='Hummingbird', image_path=gif_path)
+        aip.create_image_processor(images_dir=self._images_dir, thumbnail_width=200, workers=1).process(
+            animals=[animal])
+        with aip.Image.open(animal.get_image_path()) as image:
+            self.assertEqual((200, 150), image.size)
+            self.assertEqual(3, image.n_frames)
+
+    """
+    GIVEN   PNG and GIF images downloaded to files with a .jpg extension
+    WHEN    processing the downloaded images
+    THEN    the stored images are named after the format of their content
+    """
+    def test_process_names_images_by_format(self):
+        png_path = os.path.join(self._work_dir.name, 'png_image.jpg')
+        aip.Image.new('RGB', (400, 300), color='blue').save(png_path, format='PNG')
+        gif_path = os.path.join(self._work_dir.name, 'gif_image.jpg')
+        aip.Image.new('RGB', (100, 100), color='red').save(gif_path, format='GIF')
+        animals = [co.Animal(name='Blue whale', image_path=png_path), co.Animal(name='Cardinal', image_path=gif_path)]
+        aip.create_image_processor(images_dir=self._images_dir, thumbnail_width=200, workers=1).process(
+            animals=animals)
+        self.assertEqual(['.png', '.gif'], [os.path.splitext(animal.get_image_path())[1] for animal in animals])
+        with aip.Image.open(animals[0].get_image_path()) as image:
+            self.assertEqual('PNG', image.format)
+
+    def _create_image(self, name: str, color: str, size: tuple = (800, 600), quality: int = 75) -> str:
+        image_path = os.path.join(self._work_dir.name, name)
+        aip.Image.new('RGB', size, color=color).save(image_path, format='JPEG', quality=quality)
+        return image_path
@@ -0,0 +1,74 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import io
+import os
+import tempfile
+from unittest import TestCase
+import core.common as co
+import exporters.animal_exporter_html as aeh
+
+
+class TestAnimalExporterHTML(TestCase):
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    """
+    GIVEN   A generator of animals
+    WHEN    exporting the animals to a stream
+    THEN    every animal block is written to the stream in order, between the page header and footer
+    """
+    def test_export_generator_to_stream(self):
+        animals = (co.Animal(name=f'Animal{index}', collateral_adjectives_list=['bovine'],
+                             image_path=f'/tmp/Animal{index}.jpg') for index in range(1000))
+        stream = io.StringIO()
+        aeh.AnimalExporterHTML.export_to_stream(animals=animals, stream=stream)
+        html_content = stream.getvalue()
+        self.assertTrue(html_content.startswith(aeh.HTML_HEADER))
+        self.assertTrue(html_content.endswith(aeh.HTML_FOOTER))
+        self.assertEqual(1000, html_content.count('<div class="animal">'))
+        self.assertLess(html_content.index('<h2>Animal1</h2>'), html_content.index('<h2>Animal999</h2>'))
+
+    """
+    GIVEN   An animal whose name and collateral adjectives hold markup and quotes
+    WHEN    exporting the animal to a stream
+    THEN    the name and the adjectives are escaped in the heading, the paragraph and the image alt text
+    """
+    def test_export_escapes_animal_fields(self):
+        stream = io.StringIO()
+        aeh.AnimalExporterHTML.export_to_stream(animals=[co.Animal(
+            name='Bee "queen" <b>', collateral_adjectives_list=['apian & apic'], image_path='/tmp/bee.jpg')],
+            stream=stream)
+        html_content = stream.getvalue()
+        self.assertIn('<h2>Bee &quot;queen&quot; &lt;b&gt;</h2>', html_content)
+        self.assertIn('apian &amp; apic</p>', html_content)
+        self.assertIn('alt="Bee &quot;queen&quot; &lt;b&gt; image"', html_content)
+        self.assertNotIn('<b>', html_content)
+
+    """
+    GIVEN   An existing exported page
+    WHEN    the export fails in the middle
+    THEN    the existing page is left untouched and no temporary file is left behind
+    """
+    def test_export_is_atomic(self):
+        output_path = os.path.join(self._output_dir.name, 'animal_list.html')
+        aeh.AnimalExporterHTML.export(animal_list=[co.Animal(name='Bee', collateral_adjectives_list=['apian'])],
+                                      output_path=output_path)
+        with open(output_path, 'r') as file:
+            exported_page = file.read()
+
+        def failing_animals():
+            yield co.Animal(name='Weasel')
+            raise ValueError('Failed to get page for animal:Weasel')
+
+        with self.assertRaises(ValueError):
+            aeh.AnimalExporterHTML.export(animal_list=failing_animals(), output_path=output_path)
+        with open(output_path, 'r') as file:
+            self.assertEqual(exported_page, file.read())
+        self.assertEqual(['animal_list.html'], os.listdir(self._output_dir.name))
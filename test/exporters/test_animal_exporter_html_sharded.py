@@ -0,0 +1,115 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import re
+import tempfile
+from unittest import TestCase
+import core.common as co
+import exporters.exporter_registry as er
+
+
+class TestAnimalExporterShardedHTML(TestCase):
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+        self._images_dir = os.path.join(self._output_dir.name, 'images')
+        os.makedirs(self._images_dir)
+        self._output_path = er.resolve_output_path(export_format='html-sharded',
+                                                   output_prefix=os.path.join(self._output_dir.name, 'animal_list'))
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    """
+    GIVEN   25 animals with images
+    WHEN    exporting them with a page size of 10
+    THEN    3 linked pages and an index are written, with lazy images bundled into the pages directory
+    """
+    def test_export_pages(self):
+        self._export(count=25, page_size=10)
+        pages_dir = os.path.dirname(self._output_path)
+        self.assertEqual(['images', 'index.html', 'page-0001.html', 'page-0002.html', 'page-0003.html'],
+                         sorted(os.listdir(pages_dir)))
+        pages = [self._read(os.path.join(pages_dir, f'page-000{page_number}.html')) for page_number in (1, 2, 3)]
+        self.assertEqual([10, 10, 5], [page.count('<div class="animal">') for page in pages])
+        self.assertIn('<img src="images/Animal0.jpg" alt="Animal0 image" loading="lazy"', pages[0])
+        self.assertIn('href="page-0002.html">Next</a>', pages[0])
+        self.assertNotIn('>Previous</a>', pages[0])
+        self.assertIn('href="page-0002.html">Previous</a>', pages[2])
+        self.assertNotIn('>Next</a>', pages[2])
+        index = self._read(self._output_path)
+        self.assertIn('<a href="page-0001.html">Animal0 - Animal9</a>', index)
+        self.assertIn('<a href="page-0003.html">Animal20 - Animal24</a>', index)
+
+    """
+    GIVEN   25 animals with images outside the pages directory
+    WHEN    exporting them
+    THEN    no image links outside the pages directory and every linked image is bundled in it
+    """
+    def test_export_bundles_images(self):
+        self._export(count=25, page_size=10)
+        pages_dir = os.path.dirname(self._output_path)
+        pages = [self._read(os.path.join(pages_dir, f'page-000{page_number}.html')) for page_number in (1, 2, 3)]
+        image_urls = [image_url for page in pages for image_url in re.findall(r'<img src="([^"]+)"', page)]
+        self.assertEqual(25, len(image_urls))
+        self.assertFalse([image_url for image_url in image_urls if image_url.startswith('../')])
+        for image_url in image_urls:
+            self.assertEqual(self._read(os.path.join(self._images_dir, os.path.basename(image_url))),
+                             self._read(os.path.join(pages_dir, image_url)))
+
+    """
+    GIVEN   An export of 20 animals, exactly 2 full pages
+    WHEN    exporting them
+    THEN    the last page has no link to a next page
+    """
+    def test_export_full_last_page(self):
+        self._export(count=20, page_size=10)
+        self.assertNotIn('>Next</a>', self._read(os.path.join(os.path.dirname(self._output_path), 'page-0002.html')))
+
+    """
+    GIVEN   A previous export of 3 pages
+    WHEN    exporting fewer animals into a single page
+    THEN    the stale pages and bundled images are removed
+    """
+    def test_export_removes_stale_pages(self):
+        self._export(count=25, page_size=10)
+        self._export(count=5, page_size=10)
+        pages_dir = os.path.dirname(self._output_path)
+        self.assertEqual(['images', 'index.html', 'page-0001.html'], sorted(os.listdir(pages_dir)))
+        self.assertEqual([f'Animal{index}.jpg' for index in range(5)],
+                         sorted(os.listdir(os.path.join(pages_dir, 'images'))))
+
+    """
+    GIVEN   An export that fails after some pages were submitted
+    WHEN    the exporter is aborted
+    THEN    no page, index, bundled image or temporary file is left behind
+    """
+    def test_export_failure_leaves_nothing(self):
+        def failing_animals():
+            yield from self._generate_animals(count=25)
+            raise ValueError('Failed to get page for animal:Weasel')
+
+        with self.assertRaises(ValueError):
+            er.export_animals(animals=failing_animals(), format_to_output_path={'html-sharded': self._output_path},
+                              batch_size=5, format_to_options={'html-sharded': {'page_size': 10, 'workers': 2}})
+        self.assertEqual([], os.listdir(os.path.dirname(self._output_path)))
+
+    def _export(self, count: int, page_size: int):
+        er.export_animals(animals=self._generate_animals(count=count),
+                          format_to_output_path={'html-sharded': self._output_path}, batch_size=7,
+                          format_to_options={'html-sharded': {'page_size': page_size, 'workers': 2}})
+
+    def _generate_animals(self, count: int):
+        for index in range(count):
+            image_path = os.path.join(self._images_dir, f'Animal{index}.jpg')
+            with open(image_path, 'w', encoding='utf-8') as file:
+                file.write(f'Animal{index} image')
+            yield co.Animal(name=f'Animal{index}', collateral_adjectives_list=['bovine'], image_path=image_path)
+
+    @staticmethod
+    def _read(file_path: str) -> str:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            return file.read()
@@ -0,0 +1,91 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import csv
+import json
+import tempfile
+import unittest
+from unittest import TestCase
+import core.common as co
+import exporters.exporter_registry as er
+import exporters.animal_exporter_jsonl as aej
+import exporters.animal_exporter_parquet as aep
+
+
+class TestExporterRegistry(TestCase):
+
+    def setUp(self):
+        self._output_dir = tempfile.TemporaryDirectory()
+        self._output_prefix = os.path.join(self._output_dir.name, 'animal_list')
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    """
+    GIVEN   A generator of animals
+    WHEN    exporting them to html, jsonl and csv in one pass with a small batch size
+    THEN    every format holds all the animals with their fields
+    """
+    def test_export_multiple_formats_in_one_pass(self):
+        format_to_output_path = {export_format: er.resolve_output_path(export_format=export_format,
+                                                                       output_prefix=self._output_prefix)
+                                 for export_format in ['html', 'jsonl', 'csv']}
+        er.export_animals(animals=self._generate_animals(count=25), format_to_output_path=format_to_output_path,
+                          batch_size=10)
+        with open(format_to_output_path['jsonl'], 'r', encoding='utf-8') as file:
+            jsonl_animals = [json.loads(line) for line in file]
+        self.assertEqual(25, len(jsonl_animals))
+        self.assertEqual({'name': 'Animal3', 'collateral_adjectives': ['bovine', 'taurine (male)'],
+                          'page_url': 'https://en.wikipedia.org/wiki/Animal3', 'image_path': None}, jsonl_animals[3])
+        with open(format_to_output_path['csv'], 'r', encoding='utf-8', newline='') as file:
+            csv_rows = list(csv.DictReader(file))
+        self.assertEqual(25, len(csv_rows))
+        self.assertEqual('bovine;taurine (male)', csv_rows[3]['collateral_adjectives'])
+        with open(format_to_output_path['html'], 'r', encoding='utf-8') as file:
+            self.assertEqual(25, file.read().count('<div class="animal">'))
+
+    """
+    GIVEN   A jsonl export of animals
+    WHEN    reading the animals back
+    THEN    the animals and their fields are the exported ones
+    """
+    def test_read_jsonl_animals(self):
+        output_path = er.resolve_output_path(export_format='jsonl', output_prefix=self._output_prefix)
+        er.export_animals(animals=self._generate_animals(count=3), format_to_output_path={'jsonl': output_path})
+        animals = list(aej.read_animals(input_path=output_path))
+        self.assertEqual(['Animal0', 'Animal1', 'Animal2'], [animal.get_name() for animal in animals])
+        self.assertEqual(['bovine', 'taurine (male)'], animals[1].get_collateral_adjectives_list())
+        self.assertEqual('https://en.wikipedia.org/wiki/Animal1', animals[1].get_page_url())
+        self.assertIsNone(animals[1].get_image_path())
+
+    """
+    GIVEN   A generator of animals
+    WHEN    exporting them to parquet
+    THEN    the parquet file holds all the animals with their fields
+    """
+    @unittest.skipIf(aep.pyarrow is None, 'pyarrow is not installed')
+    def test_export_parquet(self):
+        output_path = er.resolve_output_path(export_format='parquet', output_prefix=self._output_prefix)
+        er.export_animals(animals=self._generate_animals(count=25), format_to_output_path={'parquet': output_path},
+                          batch_size=10)
+        table = aep.pyarrow.parquet.read_table(output_path)
+        self.assertEqual(25, table.num_rows)
+        self.assertEqual(['bovine', 'taurine (male)'], table.column('collateral_adjectives')[3].as_py())
+
+    """
+    GIVEN   An unknown export format
+    WHEN    creating its exporter
+    THEN    ValueError is raised
+    """
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            er.create_exporter(export_format='xml', output_path=f'{self._output_prefix}.xml')
+
+    @staticmethod
+    def _generate_animals(count: int):
+        for index in range(count):
+            yield co.Animal(name=f'Animal{index}', collateral_adjectives_list=['bovine', 'taurine (male)'],
+                            page_url=f'https://en.wikipedia.org/wiki/Animal{index}')
@@ -0,0 +1,101 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import json
+import threading
+import http.server
+import urllib.parse
+from unittest import TestCase
+import core.http_fetcher as hf
+import extractors.animal_page_api_extractor as apae
+
+# Titles of the recorded pageimages response
+RECORDED_TITLES = ['Aardvark', 'Bull', 'Cow', 'Unicornfish404']
+
+
+class _WikiApiRequestHandler(http.server.BaseHTTPRequestHandler):
+    recorded_response = None
+    requested_titles = list()
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        titles = query['titles'][0].split('|')
+        type(self).requested_titles.append(titles)
+        if sorted(titles) == RECORDED_TITLES:
+            content = json.dumps(self.recorded_response).encode()
+        else:
+            content = json.dumps({'query': {'pages': [
+                {'title': title, 'thumbnail': {'source': f'https://upload.wikimedia.org/{title}.jpg'}}
+                for title in titles]}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *_args):
+        pass
+
+
+class TestAnimalPageApiExtractor(TestCase):
+
+    def setUp(self):
+        with open('mocks/pageimages_response.json', 'r') as file:
+            _WikiApiRequestHandler.recorded_response = json.load(file)
+        _WikiApiRequestHandler.requested_titles = list()
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _WikiApiRequestHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._api_url = f'http://127.0.0.1:{self._server.server_address[1]}/w/api.php'
+        self._fetcher = hf.create_http_fetcher(requests_per_second=None)
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    """
+    GIVEN   A wiki API (recorded pageimages response) with a redirect (Cow -> Cattle) and a missing page
+    WHEN    extracting the image URLs of the animal pages with the API extractor
+    THEN    we get the same image URLs as the animal page extractor in a single request, redirects are followed and
+            the missing page has no image URL
+    """
+    def test_api_extractor_image_urls(self):
+        api_extractor = apae.create_animal_page_api_extractor(fetcher=self._fetcher, api_url=self._api_url)
+        page_url_to_image_url = api_extractor.extract_image_urls(page_urls=[
+            'https://en.wikipedia.org/wiki/Aardvark', 'https://en.wikipedia.org/wiki/Bull',
+            'https://en.wikipedia.org/wiki/Cow', 'https://en.wikipedia.org/wiki/Unicornfish404'])
+        self.assertEqual({
+            'https://en.wikipedia.org/wiki/Aardvark': 'https://upload.wikimedia.org/wikipedia/commons/thumb/f/f0/Orycteropus_afer_175359469.jpg/220px-Orycteropus_afer_175359469.jpg',
+            'https://en.wikipedia.org/wiki/Bull': 'https://upload.wikimedia.org/wikipedia/commons/thumb/b/b5/A_Friesian_Bull%2C_Llandeilo_Graban_-_geograph.org.uk_-_579885.jpg/220px-A_Friesian_Bull%2C_Llandeilo_Graban_-_geograph.org.uk_-_579885.jpg',
+            'https://en.wikipedia.org/wiki/Cow': 'https://upload.wikimedia.org/wikipedia/commons/thumb/0/0c/Cow_female_black_white.jpg/220px-Cow_female_black_white.jpg',
+            'https://en.wikipedia.org/wiki/Unicornfish404': None}, page_url_to_image_url)
+        self.assertEqual(1, len(_WikiApiRequestHandler.requested_titles))
+
+    """
+    GIVEN   120 animal pages
+    WHEN    extracting the image URLs of the animal pages with the API extractor
+    THEN    the titles are queried in batches of 50 and every page gets its image URL
+    """
+    def test_api_extractor_batches_titles(self):
+        api_extractor = apae.create_animal_page_api_extractor(fetcher=self._fetcher, api_url=self._api_url)
+        page_urls = [f'https://en.wikipedia.org/wiki/Animal_{index}' for index in range(120)]
+        page_url_to_image_url = api_extractor.extract_image_urls(page_urls=page_urls)
+        self.assertEqual([50, 50, 20], [len(titles) for titles in _WikiApiRequestHandler.requested_titles])
+        self.assertEqual('https://upload.wikimedia.org/Animal 7.jpg',
+                         page_url_to_image_url['https://en.wikipedia.org/wiki/Animal_7'])
+
+    """
+    GIVEN   Animal pages and a redlink row, whose URL is not a wiki page URL
+    WHEN    extracting the image URLs and the revisions of the animal pages with the API extractor
+    THEN    the redlink has no value and the other pages are still resolved
+    """
+    def test_api_extractor_skips_redlinks(self):
+        api_extractor = apae.create_animal_page_api_extractor(fetcher=self._fetcher, api_url=self._api_url)
+        redlink_url = 'https://en.wikipedia.org/w/index.php?title=Unicornfish&action=edit&redlink=1'
+        page_url_to_image_url = api_extractor.extract_image_urls(
+            page_urls=['https://en.wikipedia.org/wiki/Animal_1', redlink_url])
+        self.assertEqual({'https://en.wikipedia.org/wiki/Animal_1': 'https://upload.wikimedia.org/Animal 1.jpg',
+                          redlink_url: None}, page_url_to_image_url)
+        self.assertEqual([['Animal 1']], _WikiApiRequestHandler.requested_titles)
+        self.assertEqual({redlink_url: None}, api_extractor.extract_page_revisions(page_urls=[redlink_url]))
@@ -31,4 +31,50 @@ class TestAnimalPageExtractor(TestCase):
     """
     def test_animal_page_extractor_without_image_in_main_table(self):
         page_extractor = ape.create_animal_page_extractor(self._animal_page_without_image_in_table)
-        self.assertEqual('https://upload.wikimedia.org/wikipedia/commons/thumb/b/b5/A_Friesian_Bull%2C_Llandeilo_Graban_-_geograph.org.uk_-_579885.jpg/220px-A_Friesian_Bull%2C_Llandeilo_Graban_-_geograph.org.uk_-_579885.jpg', page_extractor.extract_image_url())
\ No newline at end of file
+        self.assertEqual('https://upload.wikimedia.org/wikipedia/commons/thumb/b/b5/A_Friesian_Bull%2C_Llandeilo_Graban_-_geograph.org.uk_-_579885.jpg/220px-A_Friesian_Bull%2C_Llandeilo_Graban_-_geograph.org.uk_-_579885.jpg', page_extractor.extract_image_url())
+
+    """
+    GIVEN   Animal Page html (as mock response) in Wiki (https://en.wikipedia.org/wiki/Aardvark) with image exists in the main table (Yellow background)
+    WHEN    extracting the animal data using the streaming animal page extractor
+    THEN    we get the same image URL as the animal page extractor
+    """
+    def test_streaming_animal_page_extractor_with_image_in_main_table(self):
+        page_extractor = ape.create_animal_page_extractor(self._animal_page_with_image_in_table, streaming=True)
+        self.assertEqual(ape.create_animal_page_extractor(self._animal_page_with_image_in_table).extract_image_url(),
+                         page_extractor.extract_image_url())
+
+    """
+    GIVEN   Animal Page html (as mock response) in Wiki (https://en.wikipedia.org/wiki/Bull) without main table
+    WHEN    extracting the animal data using the streaming animal page extractor
+    THEN    we get the same image URL as the animal page extractor
+    """
+    def test_streaming_animal_page_extractor_without_image_in_main_table(self):
+        page_extractor = ape.create_animal_page_extractor(self._animal_page_without_image_in_table, streaming=True)
+        self.assertEqual(ape.create_animal_page_extractor(self._animal_page_without_image_in_table).extract_image_url(),
+                         page_extractor.extract_image_url())
+
+    """
+    GIVEN   Animal Page html with a page image before a main table that has its own image
+    WHEN    extracting the animal data using the streaming animal page extractor
+    THEN    we get the main table image URL
+    """
+    def test_streaming_animal_page_extractor_prefers_main_table_image(self):
+        webpage = ('<html><body><img class="mw-file-element" src="//upload.wikimedia.org/icon.png"/>'
+                   '<table class="infobox biota"><tbody><tr><td><img src="//upload.wikimedia.org/animal.jpg"/>'
+                   '</td></tr></tbody></table></body></html>')
+        self.assertEqual('https://upload.wikimedia.org/animal.jpg',
+                         ape.create_animal_page_extractor(webpage, streaming=True).extract_image_url())
+        self.assertEqual('https://upload.wikimedia.org/animal.jpg',
+                         ape.create_animal_page_extractor(webpage).extract_image_url())
+
+    """
+    GIVEN   Animal Page html (as mock response) in Wiki (https://en.wikipedia.org/wiki/Aardvark) with image exists in the main table (Yellow background)
+    WHEN    extracting the animal data using the animal page extractors with an image width of 200 pixels
+    THEN    we get the image URL of the 200px thumbnail
+    """
+    def test_animal_page_extractor_with_image_width(self):
+        expected_url = 'https://upload.wikimedia.org/wikipedia/commons/thumb/f/f0/Orycteropus_afer_175359469.jpg/200px-Orycteropus_afer_175359469.jpg'
+        for streaming in [False, True]:
+            page_extractor = ape.create_animal_page_extractor(self._animal_page_with_image_in_table,
+                                                              streaming=streaming, image_width=200)
+            self.assertEqual(expected_url, page_extractor.extract_image_url())
@@ -4,8 +4,12 @@
 # Date:    September 2024
 # Summary:
 from unittest import TestCase
+import time
 import typing as t
+import unittest
 import core.common as co
+import core.utils as utils
+import core.metrics as metrics
 import extractors.animals_wiki_extractor as awe
 
 
@@ -68,6 +72,73 @@ class TestWikiAnimalsExtractor(TestCase):
         self._test_animal_extractor(animal_name='Bee', expected_page_url='https://en.wikipedia.org/wiki/Bee',
                                     expected_collateral_adjectives=['apian','apiarian', 'apic'])
 
+    """
+    GIVEN   Wiki all Animal Page (as mock response) (https://en.wikipedia.org/wiki/List_of_animal_names)
+    WHEN    extracting the animals data using WikiAnimalsExtractor with the lxml parser
+    THEN    we get the same animals as with the builtin html parser
+    """
+    @unittest.skipIf(utils.resolve_html_parser(parser='lxml') != 'lxml', 'lxml is not installed')
+    def test_animals_extractor_with_lxml_parser(self):
+        def to_animals_data(animals_output: co.AnimalsExtractorOutput):
+            return [(animal.get_name(), animal.get_collateral_adjectives_list(), animal.get_page_url())
+                    for animal in animals_output.get_list_of_animals()]
+
+        html_parser_output = awe.create_wiki_animal_extractor(webpage=self._valid_animal_page,
+                                                              parser='html.parser').extract_animals(extended=True)
+        lxml_output = awe.create_wiki_animal_extractor(webpage=self._valid_animal_page,
+                                                       parser='lxml').extract_animals(extended=True)
+        self.assertEqual(to_animals_data(html_parser_output), to_animals_data(lxml_output))
+
+    """
+    GIVEN   Wiki all Animal Page (as mock response) (https://en.wikipedia.org/wiki/List_of_animal_names)
+    WHEN    streaming the animals data using WikiAnimalsExtractor.iter_animals
+    THEN    we get the same animals as extract_animals, including the fields taken from a referenced animal (Bull)
+    """
+    def test_animals_extractor_iter_animals(self):
+        self._extractor = awe.create_wiki_animal_extractor(webpage=self._valid_animal_page)
+        extracted_animals = {animal.get_name(): (animal.get_collateral_adjectives_list(), animal.get_page_url())
+                             for animal in self._extractor.extract_animals(extended=True).get_list_of_animals()}
+        streamed_animals = {animal.get_name(): (animal.get_collateral_adjectives_list(), animal.get_page_url())
+                            for animal in self._extractor.iter_animals(extended=True)}
+        self.assertEqual(extracted_animals, streamed_animals)
+        self.assertCountEqual(['bovine', 'taurine (male)', 'vaccine (female)', 'vituline (young)'],
+                              streamed_animals['Bull'][0])
+
+    """
+    GIVEN   Wiki all Animal Page (as mock response) and active metrics
+    WHEN    streaming the animals data to a consumer that takes a second with the first animal
+    THEN    the table extract stage is recorded once, without the time spent by the consumer
+    """
+    def test_animals_extractor_iter_animals_metrics(self):
+        run_metrics = metrics.create_metrics()
+        metrics.set_active_metrics(metrics=run_metrics)
+        try:
+            self._extractor = awe.create_wiki_animal_extractor(webpage=self._valid_animal_page)
+            for index, _ in enumerate(self._extractor.iter_animals(extended=True)):
+                if not index:
+                    time.sleep(1)
+        finally:
+            metrics.set_active_metrics(metrics=None)
+        extract_latency = run_metrics.to_summary()[awe.WIKI_TABLE_EXTRACT_STAGE]['latency_seconds']
+        self.assertEqual(1, extract_latency['count'])
+        self.assertLess(extract_latency['sum'], 1)
+
+    """
+    GIVEN   Wiki all Animal Page (as mock response) (https://en.wikipedia.org/wiki/List_of_animal_names)
+    WHEN    extracting the animals data into the columnar output
+    THEN    we get the same animals as the list output, in the same order, and they can be looked up by name
+    """
+    def test_animals_extractor_columnar_output(self):
+        self._extractor = awe.create_wiki_animal_extractor(webpage=self._valid_animal_page)
+        def to_animals_data(animals: t.List[co.Animal]):
+            return [(animal.get_name(), animal.get_collateral_adjectives_list(), animal.get_page_url())
+                    for animal in animals]
+
+        columnar_output = self._extractor.extract_animals(extended=True, columnar=True)
+        self.assertEqual(to_animals_data(self._extractor.extract_animals(extended=True).get_list_of_animals()),
+                         to_animals_data(columnar_output.get_list_of_animals()))
+        self.assertEqual('Bull', columnar_output.get_animal(name='bull').get_name())
+
     def _test_animal_extractor(self, animal_name: str, expected_page_url: str,
                                expected_collateral_adjectives: t.List[str]):
         self._extractor = awe.create_wiki_animal_extractor(webpage=self._valid_animal_page)
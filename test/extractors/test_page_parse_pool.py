@@ -0,0 +1,76 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import unittest
+import concurrent.futures
+from unittest import TestCase
+import extractors.page_parse_pool as ppp
+import extractors.animal_page_extractor as ape
+
+PAGE_WITH_IMAGE_IN_MAIN_TABLE_PATH = 'mocks/animal_main_page_with_image_in_main_table.txt'
+PAGE_WITHOUT_IMAGE_IN_MAIN_TABLE_PATH = 'mocks/animal_main_page_without_image_in_main_table.txt'
+
+
+class TestPageParsePool(TestCase):
+
+    def setUp(self):
+        self._page_contents = list()
+        self._expected_image_urls = list()
+        for page_path in (PAGE_WITH_IMAGE_IN_MAIN_TABLE_PATH, PAGE_WITHOUT_IMAGE_IN_MAIN_TABLE_PATH):
+            with open(page_path, 'rb') as file:
+                self._page_contents.append(file.read())
+            self._expected_image_urls.append(ape.create_animal_page_extractor(
+                webpage=self._page_contents[-1].decode('utf-8'), image_width=200).extract_image_url())
+        self._page_parse_pool = ppp.create_page_parse_pool(workers=2, image_width=200)
+
+    def tearDown(self):
+        self._page_parse_pool.close()
+
+    """
+    GIVEN   Animal pages fetched into memory
+    WHEN    extracting their image URLs with the parse pool from concurrent threads
+    THEN    the pages are parsed in worker processes through shared memory, with the in process image URLs
+    """
+    @unittest.skipIf(ppp.shared_memory is None, 'shared memory is not available')
+    def test_extract_from_shared_memory(self):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            image_urls = list(executor.map(lambda content: self._page_parse_pool.extract_image_url(content=content),
+                                           self._page_contents * 4))
+        self.assertEqual(self._expected_image_urls * 4, image_urls)
+        self.assertFalse(self._page_parse_pool.is_in_process())
+
+    """
+    GIVEN   Animal pages stored as files (as the on disk http cache stores them)
+    WHEN    extracting their image URLs with the parse pool from the file paths
+    THEN    the workers read the memory mapped files and return the in process image URLs
+    """
+    def test_extract_from_body_file(self):
+        image_urls = [self._page_parse_pool.extract_image_url(content=b'', body_path=os.path.abspath(page_path))
+                      for page_path in (PAGE_WITH_IMAGE_IN_MAIN_TABLE_PATH, PAGE_WITHOUT_IMAGE_IN_MAIN_TABLE_PATH)]
+        self.assertEqual(self._expected_image_urls, image_urls)
+
+    """
+    GIVEN   A body file that has been removed (e.g. evicted from the http cache)
+    WHEN    extracting the image URL with the parse pool
+    THEN    the page content is parsed in process instead
+    """
+    def test_missing_body_file_falls_back_to_in_process(self):
+        image_url = self._page_parse_pool.extract_image_url(content=self._page_contents[0],
+                                                            body_path=os.path.abspath('mocks/missing_page.txt'))
+        self.assertEqual(self._expected_image_urls[0], image_url)
+
+    """
+    GIVEN   A parse pool without workers
+    WHEN    extracting an image URL
+    THEN    the page is parsed in process
+    """
+    def test_in_process_parse(self):
+        page_parse_pool = ppp.create_page_parse_pool(workers=0, image_width=200)
+        self.assertTrue(page_parse_pool.is_in_process())
+        self.assertEqual(self._expected_image_urls[1],
+                         page_parse_pool.extract_image_url(content=self._page_contents[1]))
+        with self.assertRaises(ValueError):
+            ppp.create_page_parse_pool(workers=-1)
@@ -0,0 +1,88 @@
+#! /usr/bin/env python3
+# coding: utf-8
+# Author:  Ohad ELiyahou
+# Date:    September 2024
+# Summary:
+import os
+import tempfile
+import typing as t
+from unittest import TestCase
+import core.common as co
+import extractors.table_layout_cache as tlc
+import extractors.animals_wiki_extractor as awe
+
+
+class TestTableLayoutCache(TestCase):
+
+    def setUp(self):
+        with open('mocks/animals_page.txt', 'r') as file:
+            self._valid_animal_page = file.read()
+        self._cache_dir = tempfile.TemporaryDirectory()
+        self._cache_path = os.path.join(self._cache_dir.name, 'animal_table_layout.json')
+
+    def tearDown(self):
+        self._cache_dir.cleanup()
+
+    """
+    GIVEN   A layout cache filled by a first extraction of the animals page
+    WHEN    extracting the same page layout again, from a new cache loaded from the same file
+    THEN    the table is resolved from the cached layout and the animals are the same as without the cache
+    """
+    def test_cached_layout_extract(self):
+        expected_animals = self._to_tuples(awe.create_wiki_animal_extractor(
+            webpage=self._valid_animal_page).extract_animals(extended=True).get_list_of_animals())
+        awe.create_wiki_animal_extractor(webpage=self._valid_animal_page,
+                                         layout_cache=tlc.create_table_layout_cache(path=self._cache_path))
+        layout_cache = tlc.create_table_layout_cache(path=self._cache_path)
+        extractor = awe.create_wiki_animal_extractor(webpage=self._valid_animal_page, layout_cache=layout_cache)
+        self.assertIsNotNone(extractor._resolve_table_from_layout_cache())
+        self.assertEqual(expected_animals,
+                         self._to_tuples(extractor.extract_animals(extended=True).get_list_of_animals()))
+
+    """
+    GIVEN   A cached layout of the animals page
+    WHEN    the columns of the animals table are reordered while the tables stay the same
+    THEN    the drift is detected, the table is resolved from the whole page and the cached layout is replaced
+    """
+    def test_layout_drift(self):
+        layout_cache = tlc.create_table_layout_cache(path=self._cache_path)
+        awe.create_wiki_animal_extractor(webpage=self._valid_animal_page, layout_cache=layout_cache)
+        layout_key = tlc.compute_layout_key(table_tags=tlc.scan_table_tags(webpage=self._valid_animal_page))
+        layout = layout_cache.get_layout(layout_key=layout_key)
+        drifted_layout = tlc.TableLayout(table_ordinal=layout.get_table_ordinal(), table_tag=layout.get_table_tag(),
+                                         headers=['Collateral adjective', 'Animal'])
+        layout_cache.save_layout(layout_key=layout_key, layout=drifted_layout)
+        extractor = awe.create_wiki_animal_extractor(webpage=self._valid_animal_page, layout_cache=layout_cache)
+        animals = extractor.extract_animals().get_list_of_animals()
+        self.assertEqual('Aardvark', animals[0].get_name())
+        replaced_layout = layout_cache.get_layout(layout_key=layout_key)
+        self.assertIsNot(drifted_layout, replaced_layout)
+        self.assertEqual(0, replaced_layout.get_header_index(header='Animal'))
+
+    """
+    GIVEN   A page with a table nested in the animals table
+    WHEN    resolving the span of the animals table
+    THEN    the span ends at the closing tag of the animals table
+    """
+    def test_resolve_nested_table_span(self):
+        webpage = '<p><table class="a"><tr><td><table><tr><td>x</td></tr></table></td></tr></table><table></table>'
+        table_offset = tlc.scan_table_tags(webpage=webpage)[0][0]
+        start, end = tlc.resolve_table_span(webpage=webpage, table_offset=table_offset)
+        self.assertEqual('<table class="a"><tr><td><table><tr><td>x</td></tr></table></td></tr></table>',
+                         webpage[start:end])
+
+    """
+    GIVEN   A corrupt layout cache file
+    WHEN    loading the layout cache
+    THEN    the cache starts empty
+    """
+    def test_corrupt_cache_file(self):
+        with open(self._cache_path, 'w') as file:
+            file.write('{"broken":')
+        layout_cache = tlc.create_table_layout_cache(path=self._cache_path)
+        self.assertIsNone(layout_cache.get_layout(layout_key='broken'))
+
+    @staticmethod
+    def _to_tuples(animals: t.List[co.Animal]) -> t.List[tuple]:
+        return [(animal.get_name(), animal.get_collateral_adjectives_list(), animal.get_page_url())
+                for animal in animals]